@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from datetime import timedelta
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 import sys
 import dj_database_url
@@ -243,6 +244,45 @@ CACHES = {
     }
 }
 
+# Per-process memo of the active fiscal year (core/fiscal_years.py). Disabled in
+# tests, whose rolled-back fiscal years never signal a change.
+ACTIVE_FISCAL_YEAR_CACHE_SECONDS = 0 if TESTING else 60
+
+# Dashboard/report responses, shared by all worker processes (core/report_cache.py).
+# REPORT_CACHE_URL selects the backend:
+#   redis://host:6379/1  Redis (requires the redis package)
+#   db                   DatabaseCache; run `python manage.py createcachetable` once
+#   <directory>          file-based cache (default)
+REPORT_CACHE_URL = os.getenv(
+    'REPORT_CACHE_URL', os.path.join(tempfile.gettempdir(), 'bms_report_cache'))
+
+if TESTING:
+    CACHES['reports'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'reports',
+        'TIMEOUT': None,
+    }
+elif REPORT_CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES['reports'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REPORT_CACHE_URL,
+        'TIMEOUT': None,
+    }
+elif REPORT_CACHE_URL == 'db':
+    CACHES['reports'] = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'bms_report_cache',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+else:
+    CACHES['reports'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': REPORT_CACHE_URL,
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+
 ROOT_URLCONF = 'capstone.urls'
 
 
@@ -0,0 +1,40 @@
+"""
+TransactionAudit rows for expense changes, shared by the Expense post_save
+receiver and bulk paths that write audits with bulk_create.
+"""
+from .models import TransactionAudit
+
+
+def expense_audit_user(instance):
+    """
+    (user_id, username) the audit is attributed to: the approver when the expense
+    was approved, otherwise the submitter. (None, None) without a user context.
+    """
+    if instance.status == 'APPROVED' and instance.approved_by_user_id:
+        return instance.approved_by_user_id, instance.approved_by_username
+    if instance.submitted_by_user_id:
+        return instance.submitted_by_user_id, instance.submitted_by_username
+    return None, None
+
+
+def expense_audit(instance, action):
+    """Unsaved TransactionAudit for an Expense, or None without a user context."""
+    user_id, username = expense_audit_user(instance)
+    if not (user_id or username):
+        return None
+    return TransactionAudit(
+        transaction_type='EXPENSE',
+        transaction_id_ref=instance.id,  # Uses the PK of the Expense instance
+        user_id=user_id,
+        user_username=username,
+        action=action,
+        details={
+            'amount': str(instance.amount),
+            'description': instance.description,
+            'status': instance.status,
+            'department_id': instance.department_id,
+            'budget_allocation_id': instance.budget_allocation_id,
+            'project_id': instance.project_id,
+            'vendor': instance.vendor,
+        }
+    )
@@ -0,0 +1,145 @@
+"""
+Running balances on BudgetAllocation.
+
+Every allocation carries `spent_amount` (sum of its APPROVED expenses) and
+`committed_amount` (sum of its SUBMITTED expenses). The Expense signals in
+core/signals.py feed each change through expenses_changed(), which applies the
+difference with F() updates in the caller's transaction, so overspend checks
+read one locked row instead of aggregating the expense table.
+
+Code paths that bypass model signals (queryset.update(), bulk_update(), ...)
+must call expenses_changed() themselves; reconcile_balances() finds (and can
+repair) any drift.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+
+from .models import BudgetAllocation, Expense
+
+
+ZERO = Decimal('0.00')
+
+BALANCE_FIELDS = ('spent_amount', 'committed_amount')
+BALANCE_STATUSES = {'APPROVED': 0, 'SUBMITTED': 1}
+
+
+def _as_decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _cents(value):
+    # SQLite returns sums without the column's scale
+    return (value or ZERO).quantize(ZERO)
+
+
+def _balance_contribution(state):
+    """(allocation_id, index into BALANCE_FIELDS, amount) of an expense state, or None."""
+    if not state or state['status'] not in BALANCE_STATUSES:
+        return None
+    return (
+        state['budget_allocation_id'],
+        BALANCE_STATUSES[state['status']],
+        _as_decimal(state['amount'])
+    )
+
+
+def expenses_changed(changes):
+    """
+    Takes (previous_state, current_state) pairs as built by
+    snapshots.expense_state() and applies their net effect on the allocations'
+    running balances, one F() update per allocation in primary key order.
+    """
+    deltas = defaultdict(lambda: [ZERO, ZERO])
+    for previous, current in changes:
+        before = _balance_contribution(previous)
+        after = _balance_contribution(current)
+        if before == after:
+            continue
+        if before:
+            deltas[before[0]][before[1]] -= before[2]
+        if after:
+            deltas[after[0]][after[1]] += after[2]
+
+    with transaction.atomic():
+        for allocation_id in sorted(deltas):
+            spent_delta, committed_delta = deltas[allocation_id]
+            if not spent_delta and not committed_delta:
+                continue
+            BudgetAllocation.objects.filter(pk=allocation_id).update(
+                spent_amount=F('spent_amount') + spent_delta,
+                committed_amount=F('committed_amount') + committed_delta
+            )
+
+
+def lock_allocations(allocation_ids):
+    """
+    Locks the given allocation rows (in primary key order, so concurrent callers
+    cannot deadlock) and returns them keyed by ID. Must run inside a transaction.
+    """
+    return BudgetAllocation.objects.select_for_update().order_by('pk').in_bulk(sorted(set(allocation_ids)))
+
+
+def lock_allocation(allocation_id):
+    return lock_allocations([allocation_id]).get(allocation_id)
+
+
+def available_amount(allocation, include_committed=False):
+    """Budget left on an allocation; optionally net of submitted (pending) expenses."""
+    used = allocation.spent_amount
+    if include_committed:
+        used += allocation.committed_amount
+    return allocation.amount - used
+
+
+# --- Reconciliation ---
+
+def expected_balances(allocation_ids=None):
+    """{allocation_id: (spent, committed)} recomputed from the expense table."""
+    expenses = Expense.objects.all()
+    if allocation_ids is not None:
+        expenses = expenses.filter(budget_allocation_id__in=allocation_ids)
+    rows = expenses.values('budget_allocation_id').annotate(
+        spent=Sum('amount', filter=Q(status='APPROVED')),
+        committed=Sum('amount', filter=Q(status='SUBMITTED'))
+    ).order_by()
+    return {
+        row['budget_allocation_id']: (_cents(row['spent']), _cents(row['committed']))
+        for row in rows
+    }
+
+
+def reconcile_balances(fix=False):
+    """
+    Compares every allocation's running balances with the expense table.
+    Returns the drifted allocations as dicts ({'id', 'spent_amount', 'expected_spent',
+    'committed_amount', 'expected_committed'}); with fix=True they are corrected.
+    """
+    expected = expected_balances()
+    drift = []
+    stored = BudgetAllocation.objects.values_list('id', *BALANCE_FIELDS).order_by('id')
+    for allocation_id, spent, committed in stored.iterator(chunk_size=2000):
+        expected_spent, expected_committed = expected.get(allocation_id, (ZERO, ZERO))
+        if (spent, committed) != (expected_spent, expected_committed):
+            drift.append({
+                'id': allocation_id,
+                'spent_amount': spent,
+                'expected_spent': expected_spent,
+                'committed_amount': committed,
+                'expected_committed': expected_committed,
+            })
+
+    if fix and drift:
+        with transaction.atomic():
+            locked = lock_allocations([row['id'] for row in drift])
+            # Recompute under the lock so concurrent approvals are not overwritten
+            expected = expected_balances(list(locked))
+            for allocation in locked.values():
+                allocation.spent_amount, allocation.committed_amount = expected.get(
+                    allocation.id, (ZERO, ZERO))
+            BudgetAllocation.objects.bulk_update(
+                locked.values(), list(BALANCE_FIELDS), batch_size=1000)
+
+    return drift
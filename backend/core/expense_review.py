@@ -0,0 +1,111 @@
+"""
+Bulk approval / rejection of submitted expenses.
+
+The expenses (and, for approvals, their allocations) are locked once, remaining
+balances are checked against the allocations' running balances, and the
+updates, audits, snapshot and balance deltas and journal postings are written in
+bulk, so a month-end queue costs a handful of queries instead of a few per expense.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import balances, report_cache, snapshots
+from .audits import expense_audit
+from .models import Expense, TransactionAudit
+from .posting import post_expenses
+
+
+BULK_REVIEW_MAX = 500
+
+REVIEW_FIELDS = ['status', 'notes', 'approved_by_user_id', 'approved_by_username', 'approved_at']
+
+
+def review_note(reviewer, notes, existing):
+    return f"Review Note ({reviewer.username} on {timezone.now().strftime('%Y-%m-%d')}): {notes}\n---\n{existing or ''}"
+
+
+def locked_expenses(queryset, expense_ids):
+    """
+    The listed expenses of `queryset`, locked in id order. Only the expense rows
+    are locked: the queryset may select_related() a nullable relation, and
+    PostgreSQL refuses FOR UPDATE on the nullable side of an outer join.
+    """
+    return queryset.filter(id__in=expense_ids).select_for_update(of=('self',)).order_by('id')
+
+
+def bulk_review_expenses(queryset, expense_ids, new_status, reviewer, notes=None):
+    """
+    Applies `new_status` ('APPROVED' or 'REJECTED') to the SUBMITTED expenses of
+    `queryset` listed in `expense_ids`. Approvals that would overdraw their
+    allocation are refused individually. Returns one result dict per requested
+    ID, in request order: {'id', 'status'} on success, {'id', 'error'} otherwise.
+    """
+    expense_ids = list(dict.fromkeys(expense_ids))
+    results = {}
+    now = timezone.now()
+
+    with transaction.atomic():
+        expenses = {
+            expense.id: expense
+            for expense in locked_expenses(queryset, expense_ids)
+        }
+
+        reviewable = []
+        for expense_id in expense_ids:
+            expense = expenses.get(expense_id)
+            if expense is None:
+                results[expense_id] = {'id': expense_id, 'error': "Expense not found."}
+            elif expense.status != 'SUBMITTED':
+                results[expense_id] = {
+                    'id': expense_id,
+                    'error': f"This expense is already in '{expense.status}' status and cannot be reviewed again."
+                }
+            else:
+                reviewable.append(expense)
+
+        accepted = reviewable
+        if new_status == 'APPROVED' and reviewable:
+            allocations = balances.lock_allocations(
+                expense.budget_allocation_id for expense in reviewable)
+            remaining = {
+                allocation_id: balances.available_amount(allocation)
+                for allocation_id, allocation in allocations.items()
+            }
+
+            accepted = []
+            for expense in reviewable:
+                allocation_id = expense.budget_allocation_id
+                if expense.amount > remaining[allocation_id]:
+                    results[expense.id] = {
+                        'id': expense.id,
+                        'error': f"This expense of {expense.amount} would exceed the remaining budget of {remaining[allocation_id]}."
+                    }
+                    continue
+                remaining[allocation_id] -= expense.amount
+                accepted.append(expense)
+
+        previous = {expense.id: snapshots.expense_state(expense) for expense in accepted}
+        for expense in accepted:
+            expense.status = new_status
+            if notes:
+                expense.notes = review_note(reviewer, notes, expense.notes)
+            if new_status == 'APPROVED':
+                expense.approved_by_user_id = reviewer.id
+                expense.approved_by_username = reviewer.username
+                expense.approved_at = now
+            results[expense.id] = {'id': expense.id, 'status': new_status}
+
+        if accepted:
+            # bulk_update skips the Expense signals, so do their work in bulk here
+            Expense.objects.bulk_update(accepted, REVIEW_FIELDS, batch_size=BULK_REVIEW_MAX)
+            audits = [expense_audit(expense, 'UPDATED') for expense in accepted]
+            TransactionAudit.objects.bulk_create([audit for audit in audits if audit])
+            changes = [(previous[expense.id], snapshots.expense_state(expense)) for expense in accepted]
+            # Allocation rows before snapshot cells (see snapshots.apply_deltas)
+            balances.expenses_changed(changes)
+            snapshots.expenses_changed(changes)
+            report_cache.expenses_changed(changes)
+            if new_status == 'APPROVED':
+                post_expenses(accepted)
+
+    return [results[expense_id] for expense_id in expense_ids]
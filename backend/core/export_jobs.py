@@ -0,0 +1,140 @@
+"""
+Background report exports.
+
+An export is queued as an ExportJob row; the `process_export_jobs` worker claims
+queued rows with a conditional UPDATE (so several workers can run side by side
+without a message broker), renders the file with the same helpers the
+synchronous export views use, and stores it under MEDIA_ROOT.
+"""
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+
+from .exports import LEDGER_EXPORT_HEADER, build_variance_workbook, iter_csv, iter_ledger_rows
+from .ledger import LEDGER_FILTER_PARAMS, ledger_lines_queryset
+from .models import ExportJob, FiscalYear
+
+
+logger = logging.getLogger(__name__)
+
+# A RUNNING job whose worker died is handed out again after this long
+STALE_JOB_TIMEOUT = timedelta(minutes=30)
+
+
+class ExportParameterError(ValueError):
+    """Raised when an export is requested with invalid parameters."""
+
+
+def _clean_ledger_parameters(raw):
+    return {key: str(raw[key]) for key in LEDGER_FILTER_PARAMS if raw.get(key) not in (None, '')}
+
+
+def _clean_variance_parameters(raw):
+    fiscal_year_id = raw.get('fiscal_year_id')
+    if not fiscal_year_id:
+        raise ExportParameterError("fiscal_year_id is required")
+    try:
+        fiscal_year_id = int(fiscal_year_id)
+        month = int(raw['month']) if raw.get('month') else None
+        if month and (month < 1 or month > 12):
+            raise ValueError()
+    except (ValueError, TypeError):
+        raise ExportParameterError(
+            "Invalid fiscal_year_id or month. Month must be an integer between 1 and 12.")
+    if not FiscalYear.objects.filter(id=fiscal_year_id).exists():
+        raise ExportParameterError("Fiscal Year not found")
+    return {'fiscal_year_id': fiscal_year_id, 'month': month}
+
+
+def _render_ledger_csv(job, handle):
+    queryset = ledger_lines_queryset(
+        job.parameters,
+        bms_role=job.requested_by_role,
+        department_id=job.requested_by_department_id)
+    lines = 0
+    for line in iter_csv(LEDGER_EXPORT_HEADER, iter_ledger_rows(queryset)):
+        handle.write(line.encode('utf-8'))
+        lines += 1
+    return 'ledger_export.csv', lines - 1
+
+
+def _render_variance_xlsx(job, handle):
+    fiscal_year = FiscalYear.objects.get(id=job.parameters['fiscal_year_id'])
+    workbook, filename = build_variance_workbook(fiscal_year, job.parameters.get('month'))
+    workbook.save(handle)
+    return filename, None
+
+
+EXPORT_TYPES = {
+    'LEDGER_CSV': (_clean_ledger_parameters, _render_ledger_csv),
+    'BUDGET_VARIANCE_XLSX': (_clean_variance_parameters, _render_variance_xlsx),
+}
+
+
+def enqueue_export(user, export_type, parameters):
+    """Validates the parameters and queues an export for `user` (a JWT CustomUser)."""
+    if export_type not in EXPORT_TYPES:
+        raise ExportParameterError(
+            f"Unknown export_type. Choose one of: {', '.join(EXPORT_TYPES)}")
+    clean, _ = EXPORT_TYPES[export_type]
+    return ExportJob.objects.create(
+        export_type=export_type,
+        parameters=clean(parameters or {}),
+        requested_by_user_id=user.id,
+        requested_by_username=getattr(user, 'username', 'N/A'),
+        requested_by_role=getattr(user, 'roles', {}).get('bms'),
+        requested_by_department_id=getattr(user, 'department_id', None),
+    )
+
+
+def claim_next_job():
+    """
+    Marks the oldest queued (or stale running) job as RUNNING and returns it,
+    or None when there is nothing to do. The UPDATE re-checks the job's state,
+    so only one worker wins a given job.
+    """
+    claimable = ExportJob.objects.filter(
+        Q(status='QUEUED') |
+        Q(status='RUNNING', started_at__lt=timezone.now() - STALE_JOB_TIMEOUT)
+    )
+    for job_id in claimable.order_by('created_at', 'id').values_list('id', flat=True)[:10]:
+        if claimable.filter(pk=job_id).update(status='RUNNING', started_at=timezone.now()):
+            return ExportJob.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    """Renders a claimed job's file and records the outcome on the job."""
+    _, render = EXPORT_TYPES[job.export_type]
+    try:
+        with tempfile.TemporaryFile() as handle:
+            filename, row_count = render(job, handle)
+            handle.seek(0)
+            job.file.save(filename, File(handle), save=False)
+        job.filename = filename
+        job.row_count = row_count
+        job.status = 'COMPLETED'
+        job.error = ''
+    except Exception as e:
+        logger.exception("Export job %s failed", job.id)
+        job.status = 'FAILED'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def process_pending_jobs(max_jobs=None):
+    """Runs queued jobs until the queue is empty (or `max_jobs` ran). Returns the count."""
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
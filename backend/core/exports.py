@@ -0,0 +1,289 @@
+"""
+Streaming export helpers shared by the report/export views.
+
+CSV exports are produced row by row from `values_list(...).iterator(chunk_size=...)`
+querysets, so memory stays flat no matter how many rows are written.
+
+XLSX exports use openpyxl's write-only mode: rows are flushed to the worksheet's
+temp file as they are appended, formats are registered once per workbook as named
+styles, and the finished file is served from a spooled temporary file.
+"""
+import csv
+import tempfile
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle
+from openpyxl.utils import get_column_letter
+
+from django.http import FileResponse, StreamingHttpResponse
+
+from .rollups import category_variance_tree
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    """Yields CSV-encoded lines: the header first, then one line per row."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def streaming_csv_response(filename, header, rows):
+    response = StreamingHttpResponse(
+        iter_csv(header, rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# --- Ledger ---
+
+LEDGER_EXPORT_HEADER = ['Reference ID', 'Date', 'Category',
+                        'Description', 'Account', 'Amount (PHP)']
+
+LEDGER_EXPORT_FIELDS = (
+    'journal_entry__entry_id',
+    'journal_entry__date',
+    'journal_entry__category',
+    'description',
+    'account__name',
+    'amount',
+)
+
+
+def iter_ledger_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Formatted ledger export rows, fetched as tuples in chunks (no model instances)."""
+    values = queryset.values_list(*LEDGER_EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for entry_id, entry_date, category, description, account_name, amount in values:
+        yield (
+            entry_id,
+            entry_date.strftime('%Y-%m-%d'),
+            category,
+            description.replace('\n', ' ').strip(),
+            account_name,
+            "{:,.2f}".format(amount)
+        )
+
+
+# --- XLSX ---
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Finished workbooks stay in memory up to this size, then spill to disk
+XLSX_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+NAMED_STYLES = {
+    'bms_title': {'font': Font(bold=True, size=12)},
+    'bms_bold': {'font': Font(bold=True)},
+    'bms_currency': {'number_format': '#,##0.00'},
+}
+
+
+def new_workbook():
+    """Write-only workbook with the shared named styles registered."""
+    workbook = openpyxl.Workbook(write_only=True)
+    for name, attributes in NAMED_STYLES.items():
+        style = NamedStyle(name=name)
+        for attribute, value in attributes.items():
+            setattr(style, attribute, value)
+        workbook.add_named_style(style)
+    return workbook
+
+
+class SheetWriter:
+    """
+    Appends rows to a write-only worksheet. Column widths must be known up front
+    because write-only sheets cannot be revisited once rows are written.
+    """
+
+    def __init__(self, workbook, title, widths=None):
+        self.worksheet = workbook.create_sheet(title=title)
+        for index, width in enumerate(widths or [], start=1):
+            self.worksheet.column_dimensions[get_column_letter(index)].width = width
+        self.row = 0
+
+    def append(self, values, styles=None):
+        """
+        Writes one row and returns its 1-based row number. `styles` is a named
+        style for every cell, or {0-based column index: named style}.
+        """
+        if styles:
+            if isinstance(styles, str):
+                styles = {index: styles for index in range(len(values))}
+            values = [self._cell(value, styles.get(index)) for index, value in enumerate(values)]
+        self.worksheet.append(values)
+        self.row += 1
+        return self.row
+
+    def merge(self, cell_range):
+        self.worksheet.merged_cells.add(cell_range)
+
+    def _cell(self, value, style):
+        if style is None:
+            return value
+        cell = WriteOnlyCell(self.worksheet, value=value)
+        cell.style = style
+        return cell
+
+
+def column_widths(rows, minimum=12, padding=2):
+    """Auto-size widths from the longest value in each column."""
+    widths = []
+    for row in rows:
+        for index, value in enumerate(row):
+            length = len(str(value)) if value is not None else 0
+            if index == len(widths):
+                widths.append(minimum)
+            widths[index] = max(widths[index], length + padding)
+    return widths
+
+
+def sheet_title(text, used):
+    """Excel-safe unique sheet title (max 31 chars, no []:*?/\\)."""
+    cleaned = ''.join(' ' if char in '[]:*?/\\' else char for char in text).strip() or "Sheet"
+    title = cleaned[:31]
+    suffix = 2
+    while title.lower() in used:
+        tail = f" ({suffix})"
+        title = cleaned[:31 - len(tail)] + tail
+        suffix += 1
+    used.add(title.lower())
+    return title
+
+
+def xlsx_response(workbook, filename):
+    """Saves the workbook to a spooled temp file and streams it back."""
+    buffer = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE)
+    workbook.save(buffer)
+    buffer.seek(0)
+    return FileResponse(
+        buffer, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+
+# --- Budget proposal workbook ---
+
+PROPOSAL_HEADER_LABELS = [
+    "Title", "Project Summary", "Project Description",
+    "Performance Start", "Performance End", "Performance Notes",
+    "Department", "Submitted By", "Status"
+]
+PROPOSAL_TABLE_HEADER = ["Account", "Cost Element",
+                         "Description", "Estimated Cost", "Notes"]
+
+
+def write_proposal_sheet(workbook, proposal, title="Budget Proposal"):
+    """
+    Writes one proposal (header block, line items and total) as its own sheet.
+    Expects `department` and `items__account` to be loaded on the proposal.
+    """
+    header_values = [
+        proposal.title,
+        proposal.project_summary,
+        proposal.project_description,
+        proposal.performance_start_date.strftime("%Y-%m-%d"),
+        proposal.performance_end_date.strftime("%Y-%m-%d"),
+        getattr(proposal, 'performance_notes', ''),
+        proposal.department.name,
+        proposal.submitted_by_name or "N/A",
+        proposal.status
+    ]
+
+    items = []
+    total_cost = 0
+    for item in proposal.items.all():
+        items.append([
+            item.account.name if item.account else "N/A",
+            item.cost_element,
+            item.description,
+            float(item.estimated_cost),
+            item.notes or ""
+        ])
+        total_cost += item.estimated_cost
+    total_row = ["", "", "Total", float(total_cost)]
+
+    header_rows = [[label, value] for label, value in zip(PROPOSAL_HEADER_LABELS, header_values)]
+    sheet = SheetWriter(workbook, title, widths=column_widths(
+        header_rows + [PROPOSAL_TABLE_HEADER] + items + [total_row]))
+
+    # Header section, labels in bold
+    for row in header_rows:
+        sheet.append(row, styles={0: 'bms_bold'})
+    sheet.append([])
+
+    # Table header and line items; the Description column is bold throughout
+    sheet.append(PROPOSAL_TABLE_HEADER, styles='bms_bold')
+    for row in items:
+        sheet.append(row, styles={2: 'bms_bold'})
+
+    sheet.append([])
+    sheet.append(total_row, styles={2: 'bms_bold', 3: 'bms_bold'})
+    return sheet
+
+
+# --- Budget variance workbook ---
+
+def write_variance_sheet(workbook, title_text, report_data):
+    """Hierarchical budget variance rows with indented category names."""
+    sheet = SheetWriter(workbook, "Budget Variance Report", widths=[30, 15, 15, 15])
+    sheet.append([title_text], styles='bms_title')
+    sheet.merge('A1:D1')
+    sheet.append([])
+    sheet.append(["Category", "Budget", "Actual", "Available"], styles='bms_bold')
+
+    currency = {1: 'bms_currency', 2: 'bms_currency', 3: 'bms_currency'}
+
+    def write_rows(nodes, indent=0):
+        for node in nodes:
+            sheet.append([
+                f"{' ' * indent * 4}{node['name']}",
+                node['budget'],
+                node['actual'],
+                node['available']
+            ], styles=currency)
+            if node.get('children'):
+                write_rows(node['children'], indent + 1)
+
+    write_rows(report_data)
+    return sheet
+
+
+def variance_export_rows(tree):
+    """Category variance tree (see rollups.category_variance_tree) as sheet rows."""
+    return [
+        {
+            "name": node['category'].name,
+            "budget": node['budget'],
+            "actual": node['actual'],
+            "available": node['available'],
+            "children": variance_export_rows(node['children'])
+        }
+        for node in tree
+    ]
+
+
+def build_variance_workbook(fiscal_year, month=None):
+    """
+    Variance report workbook and its filename. Shared by the synchronous export
+    and export jobs so both produce the same file.
+    """
+    report_data = variance_export_rows(category_variance_tree(fiscal_year, month=month))
+
+    workbook = new_workbook()
+    if month:
+        title = f"Budget Variance Report - {fiscal_year.name} (Month: {month})"
+        filename = f"budget_variance_report_{fiscal_year.name}_month{month}.xlsx"
+    else:
+        title = f"Budget Variance Report - {fiscal_year.name} (Full Year)"
+        filename = f"budget_variance_report_{fiscal_year.name}.xlsx"
+    write_variance_sheet(workbook, title, report_data)
+    return workbook, filename
@@ -0,0 +1,58 @@
+"""
+Resolution of the active fiscal year (the active FiscalYear containing today).
+
+Views call active_fiscal_year(request) instead of querying FiscalYear. The
+result is memoized on the request, and per process for
+ACTIVE_FISCAL_YEAR_CACHE_SECONDS; the process memo is keyed by today's date so
+it rolls over at midnight, and FiscalYear saves/deletes clear it (see
+signals.py). The timeout bounds staleness for processes that did not see the
+invalidating signal.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from .models import FiscalYear
+
+
+DEFAULT_CACHE_SECONDS = 60
+
+# (date, expires_at, fiscal_year); a None fiscal year is memoized too
+_memo = None
+
+
+def _cache_seconds():
+    return getattr(settings, 'ACTIVE_FISCAL_YEAR_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)
+
+
+def _lookup(today):
+    return FiscalYear.objects.filter(
+        start_date__lte=today, end_date__gte=today, is_active=True
+    ).first()
+
+
+def _process_active_fiscal_year():
+    global _memo
+    now = timezone.now()
+    today = now.date()
+    memo = _memo
+    if memo is not None and memo[0] == today and memo[1] > now.timestamp():
+        return memo[2]
+    fiscal_year = _lookup(today)
+    _memo = (today, now.timestamp() + _cache_seconds(), fiscal_year)
+    return fiscal_year
+
+
+def active_fiscal_year(request=None):
+    """The active fiscal year containing today, or None."""
+    if request is None:
+        return _process_active_fiscal_year()
+    # DRF's Request wraps the HttpRequest; memoize on the one shared by both
+    request = getattr(request, '_request', request)
+    if not hasattr(request, '_active_fiscal_year'):
+        request._active_fiscal_year = _process_active_fiscal_year()
+    return request._active_fiscal_year
+
+
+def invalidate_active_fiscal_year():
+    global _memo
+    _memo = None
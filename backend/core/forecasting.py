@@ -0,0 +1,175 @@
+"""
+Monthly spend forecasting.
+
+The approved spend history is read as one month series with a single grouped
+query (rollups.monthly_actuals). Several models are fitted to it with NumPy:
+
+- seasonal naive: each month repeats the same month of the last year;
+- simple exponential smoothing;
+- additive Holt-Winters (level, trend and a 12-month season);
+- linear trend (least squares).
+
+Smoothing parameters are picked from a grid, with every grid point fitted at
+once as a vector, so the cost is one pass over the series per model. The model
+with the lowest mean absolute error on a holdout of the last year (backtest)
+is refitted on the whole series and produces the forecast. Models that need
+more history than there is are skipped.
+"""
+import calendar
+import itertools
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+
+from .models import Expense, Forecast, ForecastDataPoint
+from .rollups import iter_months, monthly_actuals
+from .snapshots import month_start
+
+
+SEASON = 12
+# Months held out to score the models; shorter series hold out a quarter of their length
+BACKTEST_MONTHS = 12
+
+ALPHAS = np.array([0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+BETAS = np.array([0.01, 0.05, 0.1, 0.2])
+GAMMAS = np.array([0.05, 0.1, 0.3, 0.5])
+
+
+# --- Models ---
+# Each takes the history (1-D float array) and a horizon, and returns `horizon` values.
+
+def seasonal_naive(history, horizon):
+    last_season = history[-SEASON:]
+    return last_season[np.arange(horizon) % SEASON]
+
+
+def exponential_smoothing(history, horizon):
+    level = np.full(ALPHAS.shape, history[0])
+    errors = np.zeros(ALPHAS.shape)
+    for value in history[1:]:
+        errors += (value - level) ** 2
+        level = level + ALPHAS * (value - level)
+    return np.full(horizon, level[np.argmin(errors)])
+
+
+def holt_winters(history, horizon):
+    """Additive Holt-Winters, initialized from the first two seasons."""
+    grid = np.array(list(itertools.product(ALPHAS, BETAS, GAMMAS)))
+    alpha, beta, gamma = grid[:, 0], grid[:, 1], grid[:, 2]
+    first, second = history[:SEASON], history[SEASON:2 * SEASON]
+    level = np.full(len(grid), first.mean())
+    trend = np.full(len(grid), (second.mean() - first.mean()) / SEASON)
+    season = np.tile(first - first.mean(), (len(grid), 1))
+    errors = np.zeros(len(grid))
+
+    for t, value in enumerate(history):
+        index = t % SEASON
+        errors += (value - (level + trend + season[:, index])) ** 2
+        previous_level = level
+        level = alpha * (value - season[:, index]) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous_level) + (1 - beta) * trend
+        season[:, index] = gamma * (value - level) + (1 - gamma) * season[:, index]
+
+    best = np.argmin(errors)
+    steps = np.arange(1, horizon + 1)
+    return level[best] + steps * trend[best] + season[best, (len(history) + steps - 1) % SEASON]
+
+
+def linear_trend(history, horizon):
+    t = np.arange(len(history))
+    slope, intercept = np.polyfit(t, history, 1)
+    return intercept + slope * np.arange(len(history), len(history) + horizon)
+
+
+# (Forecast.algorithm_used, model, minimum months of history); ties go to the earlier model
+MODELS = [
+    ('SEASONAL_NAIVE', seasonal_naive, SEASON),
+    ('EXPONENTIAL_SMOOTHING', exponential_smoothing, 1),
+    ('LINEAR_TREND', linear_trend, 2),
+    ('HOLT_WINTERS', holt_winters, 2 * SEASON),
+]
+
+
+def backtest_errors(history):
+    """{algorithm: mean absolute error on the holdout} for every model the history supports."""
+    holdout = min(BACKTEST_MONTHS, len(history) // 4)
+    if holdout == 0:
+        return {}
+    train, test = history[:-holdout], history[-holdout:]
+    return {
+        name: float(np.abs(model(train, holdout) - test).mean())
+        for name, model, minimum in MODELS
+        if len(train) >= minimum
+    }
+
+
+def select_model(history):
+    """(algorithm, model) with the lowest backtest error; smoothing when nothing can be scored."""
+    errors = backtest_errors(history)
+    if not errors:
+        return MODELS[1][:2]
+    best = min(errors, key=lambda name: errors[name])
+    return next((name, model) for name, model, _ in MODELS if name == best)
+
+
+def forecast_series(history, horizon):
+    """(algorithm, forecast) for `horizon` months after the history. Spend is never negative."""
+    history = np.asarray(history, dtype=float)
+    if horizon <= 0:
+        return select_model(history)[0], np.zeros(0)
+    if len(history) == 0:
+        return MODELS[1][0], np.zeros(horizon)
+    name, model = select_model(history)
+    return name, np.clip(model(history, horizon), 0, None)
+
+
+# --- Fiscal year forecasts ---
+
+def monthly_spend_history(before):
+    """
+    Approved spend per month for every month before `before` (a month start),
+    from the first month with spend; months without spend are zero. One query.
+    """
+    actuals = monthly_actuals(Expense.objects.filter(status='APPROVED', date__lt=before))
+    if not actuals:
+        return [], np.zeros(0)
+    months = [
+        month for month in iter_months(date(*min(actuals), 1), before)
+        if month < (before.year, before.month)
+    ]
+    return months, np.array([float(actuals.get(month, 0)) for month in months])
+
+
+def forecast_fiscal_year(fiscal_year, today):
+    """
+    Replaces the fiscal year's forecast with a new one: twelve cumulative
+    monthly points, with actual spend for the months before today's month and
+    the selected model's forecast from there on.
+    """
+    # Months before the cutoff are closed; a past fiscal year is all actuals
+    cutoff = month_start(min(today, fiscal_year.end_date + timedelta(days=1)))
+    months, history = monthly_spend_history(cutoff)
+    actuals = dict(zip(months, history))
+    # Forecast from the cutoff, so a future fiscal year also covers the months before it starts
+    open_months = list(iter_months(cutoff, fiscal_year.end_date))
+    algorithm, predicted = forecast_series(history, len(open_months))
+    forecasts = dict(zip(open_months, predicted))
+
+    with transaction.atomic():
+        Forecast.objects.filter(fiscal_year=fiscal_year).delete()
+        forecast = Forecast.objects.create(fiscal_year=fiscal_year, algorithm_used=algorithm)
+        points = []
+        running_total = Decimal('0.00')
+        for year, month in iter_months(fiscal_year.start_date, fiscal_year.end_date):
+            value = forecasts.get((year, month), actuals.get((year, month), 0.0))
+            running_total += Decimal(f"{value:.2f}")
+            points.append(ForecastDataPoint(
+                forecast=forecast,
+                month=month,
+                month_name=calendar.month_name[month],
+                forecasted_value=running_total
+            ))
+        ForecastDataPoint.objects.bulk_create(points)
+    return forecast
@@ -0,0 +1,132 @@
+"""
+Ledger line queryset shared by the ledger list, its CSV export and export jobs,
+and maintenance of the ledger classification columns.
+
+Every journal entry and line stores its resolved CapEx/OpEx classification and
+sub-category, so the ledger reads and filters plain columns instead of joining
+ExpenseCategory or scanning sibling lines. A categorized line takes its own
+category's; an entry takes its first categorized line's, falling back to a hint
+from the entry category; an uncategorized line takes its entry's.
+
+classify_journal_entries() recomputes the columns, and the lines' search_text
+(see core/search.py). The JournalEntry, JournalEntryLine and ExpenseCategory
+signals call it (see signals.py); code that bulk-creates lines must call it
+itself.
+"""
+from django.db.models import Case, CharField, Exists, OuterRef, Subquery, Value, When
+
+from .models import (
+    LEDGER_DEFAULT_CLASSIFICATION, LEDGER_DEFAULT_SUB_CATEGORY, ExpenseCategory, JournalEntry,
+    JournalEntryLine
+)
+from .search import index_ledger_lines, ledger_search_q
+
+
+# Classification of an entry with no categorized line, by entry category
+ENTRY_CATEGORY_CLASSIFICATIONS = {
+    'EXPENSES': 'OPEX',  # Expenses are typically OpEx
+    'ASSETS': 'CAPEX',  # Assets are typically CapEx
+}
+
+
+def classify_journal_entries(entry_ids=None):
+    """
+    Recomputes classification and sub_category of the given journal entries
+    (every entry when None) and their lines, then the lines' search_text, in
+    three UPDATE statements.
+    """
+    entries = JournalEntry.objects.all()
+    lines = JournalEntryLine.objects.all()
+    if entry_ids is not None:
+        entry_ids = {pk for pk in entry_ids if pk is not None}
+        if not entry_ids:
+            return
+        entries = entries.filter(pk__in=entry_ids)
+        lines = lines.filter(journal_entry_id__in=entry_ids)
+
+    categorized = JournalEntryLine.objects.filter(
+        journal_entry=OuterRef('pk'), expense_category__isnull=False)
+    first_categorized = categorized.order_by('pk')
+    entries.update(
+        classification=Case(
+            When(Exists(categorized), then=Subquery(
+                first_categorized.values('expense_category__classification')[:1])),
+            *[When(category=category, then=Value(classification))
+              for category, classification in ENTRY_CATEGORY_CLASSIFICATIONS.items()],
+            default=Value(LEDGER_DEFAULT_CLASSIFICATION), output_field=CharField()),
+        sub_category=Case(
+            When(Exists(categorized), then=Subquery(
+                first_categorized.values('expense_category__name')[:1])),
+            default=Value(LEDGER_DEFAULT_SUB_CATEGORY), output_field=CharField()),
+    )
+
+    category = ExpenseCategory.objects.filter(pk=OuterRef('expense_category_id'))
+    entry = JournalEntry.objects.filter(pk=OuterRef('journal_entry_id'))
+    lines.update(
+        classification=Case(
+            When(expense_category__isnull=False, then=Subquery(category.values('classification'))),
+            default=Subquery(entry.values('classification'))),
+        sub_category=Case(
+            When(expense_category__isnull=False, then=Subquery(category.values('name'))),
+            default=Subquery(entry.values('sub_category'))),
+    )
+    index_ledger_lines(lines)
+
+
+def classify_category_entries(category_ids):
+    """Reclassifies the journal entries that have lines in the given expense categories."""
+    classify_journal_entries(JournalEntryLine.objects.filter(
+        expense_category_id__in=category_ids).values_list('journal_entry_id', flat=True).distinct())
+
+
+LEDGER_FILTER_PARAMS = ('search', 'category', 'transaction_type', 'department_id', 'department')
+
+
+def ledger_lines_queryset(params, bms_role=None, department_id=None):
+    """
+    Expense ledger lines filtered by the ledger page query params.
+
+    `bms_role`/`department_id` are the requesting user's, so the same
+    data isolation applies whether the caller is a view or a background job.
+    """
+    # Category and sub-category are read from the line's own columns
+    queryset = JournalEntryLine.objects.select_related(
+        'journal_entry',
+        'account',
+        'journal_entry__department',
+    )
+
+    queryset = queryset.filter(expense_category__isnull=False)
+
+    # --- DATA ISOLATION LOGIC ---
+    if bms_role == 'GENERAL_USER':
+        if department_id:
+            # Filter lines where the parent Journal Entry belongs to the user's department
+            queryset = queryset.filter(
+                journal_entry__department_id=department_id)
+        else:
+            return JournalEntryLine.objects.none()
+
+    search = params.get('search')
+    category = params.get('category')
+    transaction_type = params.get('transaction_type')
+    department_filter = params.get('department_id') or params.get('department')
+
+    if search:
+        queryset = queryset.filter(ledger_search_q(search))
+
+    if category:
+        if category.upper() in ['CAPEX', 'OPEX']:
+            queryset = queryset.filter(classification=category.upper())
+        else:
+            queryset = queryset.filter(sub_category__icontains=category)
+
+    if transaction_type:
+        queryset = queryset.filter(
+            journal_transaction_type__iexact=transaction_type)
+
+    if department_filter:
+        queryset = queryset.filter(
+            journal_entry__department_id=department_filter)
+
+    return queryset.order_by('-journal_entry__date', 'journal_entry__entry_id')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from core.ledger import classify_journal_entries
+from core.models import JournalEntry
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the classification and sub-category columns of journal entries and their lines, '
+            'and the lines\' search text.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entry', type=int, action='append', dest='entry_ids',
+            help='Only reclassify this journal entry (ID); repeatable. Defaults to every entry.')
+
+    def handle(self, *args, **options):
+        entry_ids = options.get('entry_ids')
+        scope = f"{len(entry_ids)} journal entries" if entry_ids else "all journal entries"
+        self.stdout.write(f"Classifying ledger lines of {scope}...")
+
+        classify_journal_entries(entry_ids)
+
+        count = JournalEntry.objects.filter(pk__in=entry_ids).count() if entry_ids else JournalEntry.objects.count()
+        self.stdout.write(self.style.SUCCESS(f"Classified {count} journal entries."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Expense
+from core.posting import POSTING_BATCH_SIZE, post_expenses
+
+
+class Command(BaseCommand):
+    help = 'Posts journal entries for APPROVED expenses that have not been posted yet (e.g. bulk imports).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=POSTING_BATCH_SIZE,
+            help=f'Expenses per bulk insert (default: {POSTING_BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending_ids = list(Expense.objects.filter(
+            status='APPROVED', posting_date__isnull=True).order_by('id').values_list('id', flat=True))
+
+        self.stdout.write(f"Posting {len(pending_ids)} approved expenses...")
+
+        posted = 0
+        for start in range(0, len(pending_ids), batch_size):
+            batch = Expense.objects.filter(id__in=pending_ids[start:start + batch_size]).order_by('id')
+            posted += len(post_expenses(list(batch), batch_size))
+
+        self.stdout.write(self.style.SUCCESS(f"Created {posted} journal entries."))
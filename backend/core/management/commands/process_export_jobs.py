@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.export_jobs import process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Renders queued report exports (ExportJob rows) to MEDIA_ROOT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain the queue once and exit instead of polling forever.')
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Seconds to sleep between polls when the queue is empty (default: 2).')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed = process_pending_jobs()
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} export jobs."))
+            return
+
+        self.stdout.write("Export worker started, waiting for jobs...")
+        while True:
+            close_old_connections()
+            if process_pending_jobs(max_jobs=1):
+                continue
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from core import report_cache
+from core.models import FiscalYear
+from core.snapshots import rebuild_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the BudgetActualSnapshot table from allocations and approved expenses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fiscal-year', type=int, dest='fiscal_year_id',
+            help='Only rebuild the cells of this fiscal year (ID). Defaults to every fiscal year.')
+
+    def handle(self, *args, **options):
+        fiscal_year = None
+        fiscal_year_id = options.get('fiscal_year_id')
+        if fiscal_year_id:
+            try:
+                fiscal_year = FiscalYear.objects.get(id=fiscal_year_id)
+            except FiscalYear.DoesNotExist:
+                raise CommandError(f"Fiscal year {fiscal_year_id} not found.")
+
+        scope = fiscal_year.name if fiscal_year else "all fiscal years"
+        self.stdout.write(f"Rebuilding budget vs actual snapshots for {scope}...")
+
+        cells = rebuild_snapshots(fiscal_year)
+        report_cache.fiscal_years_changed(
+            [fiscal_year.id] if fiscal_year else FiscalYear.objects.values_list('id', flat=True))
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {cells} snapshot cells."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.balances import reconcile_balances
+
+
+class Command(BaseCommand):
+    help = 'Compares the running spent/committed balances of budget allocations with their expenses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Rewrite drifted balances from the expense table.')
+
+    def handle(self, *args, **options):
+        fix = options['fix']
+        self.stdout.write("Reconciling budget allocation balances...")
+
+        drift = reconcile_balances(fix=fix)
+
+        for row in drift:
+            self.stdout.write(
+                f"Allocation {row['id']}: spent {row['spent_amount']} (expected {row['expected_spent']}), "
+                f"committed {row['committed_amount']} (expected {row['expected_committed']})")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All allocation balances match their expenses."))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f"Corrected {len(drift)} allocation balances."))
+        else:
+            raise CommandError(f"{len(drift)} allocation balances have drifted; rerun with --fix to correct them.")
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 19:46
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_budgetproposalitem_category_journalentry_department_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetActualSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(blank=True, help_text='First day of the month for actuals. NULL for the budget row.', null=True)),
+                ('budget_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('actual_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='core.expensecategory')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='core.department')),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='core.fiscalyear')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='core.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fiscal_year', 'month'], name='snapshot_fy_month_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('month__isnull', True)), fields=('fiscal_year', 'department', 'category', 'project'), name='unique_snapshot_budget_cell'), models.UniqueConstraint(condition=models.Q(('month__isnull', False)), fields=('fiscal_year', 'department', 'category', 'project', 'month'), name='unique_snapshot_actual_cell')],
+            },
+        ),
+    ]
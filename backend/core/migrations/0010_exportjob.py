@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 19:57
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_budgetactualsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('export_type', models.CharField(choices=[('LEDGER_CSV', 'Ledger CSV'), ('BUDGET_VARIANCE_XLSX', 'Budget Variance XLSX')], max_length=30)),
+                ('parameters', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='QUEUED', max_length=20)),
+                ('requested_by_user_id', models.IntegerField(help_text='ID of user from Auth Service who requested the export')),
+                ('requested_by_username', models.CharField(max_length=150)),
+                ('requested_by_role', models.CharField(blank=True, help_text='BMS role at the time of the request', max_length=50, null=True)),
+                ('requested_by_department_id', models.IntegerField(blank=True, null=True)),
+                ('file', models.FileField(blank=True, null=True, upload_to=core.models.export_job_upload_to)),
+                ('filename', models.CharField(blank=True, max_length=255)),
+                ('row_count', models.IntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='exportjob_status_idx'), models.Index(fields=['requested_by_user_id', '-created_at'], name='exportjob_user_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-18 20:02
+
+import re
+
+from django.db import migrations, models
+
+
+# Expense postings were written as "Expense Recorded: ... (Ref: TXN-...)"
+EXPENSE_REF = re.compile(r'\(Ref: ([^)\s]+)\)\s*$')
+
+
+def link_expense_entries(apps, schema_editor):
+    Expense = apps.get_model('core', 'Expense')
+    JournalEntry = apps.get_model('core', 'JournalEntry')
+
+    linked = set()
+    pending = []
+    entries = JournalEntry.objects.filter(
+        category='EXPENSES', description__contains='(Ref: ').order_by('id')
+    for entry_id, description in entries.values_list('id', 'description').iterator(chunk_size=2000):
+        match = EXPENSE_REF.search(description)
+        if match:
+            pending.append((entry_id, match.group(1)))
+        if len(pending) >= 2000:
+            _link(Expense, JournalEntry, pending, linked)
+            pending = []
+    _link(Expense, JournalEntry, pending, linked)
+
+
+def _link(Expense, JournalEntry, pending, linked):
+    expense_ids = dict(Expense.objects.filter(
+        transaction_id__in={ref for _, ref in pending}).values_list('transaction_id', 'id'))
+    updates = []
+    for entry_id, ref in pending:
+        expense_id = expense_ids.get(ref)
+        # The oldest entry wins if an expense was ever posted twice
+        if expense_id is not None and expense_id not in linked:
+            linked.add(expense_id)
+            updates.append(JournalEntry(id=entry_id, source_type='EXPENSE', source_id=expense_id))
+    JournalEntry.objects.bulk_update(updates, ['source_type', 'source_id'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_documentsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='source_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='source_type',
+            field=models.CharField(blank=True, choices=[('EXPENSE', 'Expense'), ('BUDGET_TRANSFER', 'Budget Transfer')], max_length=30, null=True),
+        ),
+        migrations.RunPython(link_expense_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('source_type__isnull', False)), fields=('source_type', 'source_id'), name='unique_journal_entry_source'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 20:08
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def backfill_balances(apps, schema_editor):
+    BudgetAllocation = apps.get_model('core', 'BudgetAllocation')
+    Expense = apps.get_model('core', 'Expense')
+
+    rows = Expense.objects.values('budget_allocation_id').annotate(
+        spent=Sum('amount', filter=Q(status='APPROVED')),
+        committed=Sum('amount', filter=Q(status='SUBMITTED'))
+    ).order_by()
+    allocations = [
+        BudgetAllocation(
+            id=row['budget_allocation_id'],
+            spent_amount=row['spent'] or Decimal('0.00'),
+            committed_amount=row['committed'] or Decimal('0.00'))
+        for row in rows
+    ]
+    BudgetAllocation.objects.bulk_update(
+        allocations, ['spent_amount', 'committed_amount'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_journalentry_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetallocation',
+            name='committed_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of SUBMITTED (pending) expenses charged to this allocation.', max_digits=15),
+        ),
+        migrations.AddField(
+            model_name='budgetallocation',
+            name='spent_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of APPROVED expenses charged to this allocation.', max_digits=15),
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-18 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_budgetallocation_balances'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budgetallocation',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['fiscal_year', 'department', 'category'], name='alloc_active_fy_dept_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='budgetallocation',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['fiscal_year', 'category'], name='alloc_active_fy_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(condition=models.Q(('status', 'APPROVED')), fields=['budget_allocation', 'date'], name='expense_approved_alloc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(condition=models.Q(('status', 'APPROVED')), fields=['department', 'date'], name='expense_approved_dept_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(condition=models.Q(('status', 'APPROVED')), fields=['date'], name='expense_approved_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['status', 'department', '-date'], name='expense_status_dept_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['-date', 'entry_id'], name='journalentry_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['department', '-date'], name='journalentry_dept_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentryline',
+            index=models.Index(condition=models.Q(('expense_category__isnull', False)), fields=['journal_entry'], name='jeline_categorized_idx'),
+        ),
+    ]
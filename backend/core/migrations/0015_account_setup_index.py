@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budgetallocation',
+            index=models.Index(fields=['account', 'fiscal_year', 'is_active', 'created_at'], name='alloc_account_fy_created_idx'),
+        ),
+    ]
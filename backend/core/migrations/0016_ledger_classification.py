@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-18 20:31
+
+from django.db import migrations, models
+from django.db.models import Case, CharField, Exists, OuterRef, Subquery, Value, When
+
+
+def backfill_classification(apps, schema_editor):
+    # Same resolution as core.ledger.classify_journal_entries()
+    ExpenseCategory = apps.get_model('core', 'ExpenseCategory')
+    JournalEntry = apps.get_model('core', 'JournalEntry')
+    JournalEntryLine = apps.get_model('core', 'JournalEntryLine')
+
+    categorized = JournalEntryLine.objects.filter(
+        journal_entry=OuterRef('pk'), expense_category__isnull=False)
+    first_categorized = categorized.order_by('pk')
+    JournalEntry.objects.update(
+        classification=Case(
+            When(Exists(categorized), then=Subquery(
+                first_categorized.values('expense_category__classification')[:1])),
+            When(category='EXPENSES', then=Value('OPEX')),
+            When(category='ASSETS', then=Value('CAPEX')),
+            default=Value('N/A'), output_field=CharField()),
+        sub_category=Case(
+            When(Exists(categorized), then=Subquery(
+                first_categorized.values('expense_category__name')[:1])),
+            default=Value('General'), output_field=CharField()),
+    )
+
+    category = ExpenseCategory.objects.filter(pk=OuterRef('expense_category_id'))
+    entry = JournalEntry.objects.filter(pk=OuterRef('journal_entry_id'))
+    JournalEntryLine.objects.update(
+        classification=Case(
+            When(expense_category__isnull=False, then=Subquery(category.values('classification'))),
+            default=Subquery(entry.values('classification'))),
+        sub_category=Case(
+            When(expense_category__isnull=False, then=Subquery(category.values('name'))),
+            default=Subquery(entry.values('sub_category'))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_account_setup_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='classification',
+            field=models.CharField(blank=True, default='N/A', help_text='CapEx/OpEx classification of the first categorized line, or a hint from the category.', max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='sub_category',
+            field=models.CharField(default='General', help_text='Expense category name of the first categorized line.', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='journalentryline',
+            name='classification',
+            field=models.CharField(blank=True, default='N/A', max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='journalentryline',
+            name='sub_category',
+            field=models.CharField(default='General', max_length=100),
+        ),
+        migrations.RunPython(backfill_classification, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-18 20:34
+
+from django.db import migrations, models
+from django.db.models import CharField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+
+def backfill_search_text(apps, schema_editor):
+    # Same expression as core.search.search_text_expression()
+    Account = apps.get_model('core', 'Account')
+    JournalEntry = apps.get_model('core', 'JournalEntry')
+    JournalEntryLine = apps.get_model('core', 'JournalEntryLine')
+
+    entry = JournalEntry.objects.filter(pk=OuterRef('journal_entry_id'))
+    account = Account.objects.filter(pk=OuterRef('account_id'))
+    parts = [
+        Subquery(entry.values('entry_id')),
+        Subquery(entry.values('description')),
+        F('description'),
+        F('sub_category'),
+        Subquery(account.values('name')),
+        Subquery(account.values('code')),
+    ]
+    separated = []
+    for part in parts:
+        separated += [Coalesce(part, Value(''), output_field=CharField()), Value(' ')]
+    JournalEntryLine.objects.update(
+        search_text=Lower(Concat(*separated[:-1], output_field=CharField())))
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS jeline_search_trgm_idx '
+        'ON core_journalentryline USING gin (search_text gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS jeline_search_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_ledger_classification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentryline',
+            name='search_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_ledger_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['-date', 'id'], name='expense_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['department', '-date', 'id'], name='expense_dept_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='forecast',
+            name='algorithm_used',
+            field=models.CharField(choices=[('LINEAR_PROJECTION', 'Linear Projection'), ('SEASONAL_BASELINE', 'Seasonal Baseline'), ('SEASONAL_NAIVE', 'Seasonal Naive'), ('EXPONENTIAL_SMOOTHING', 'Exponential Smoothing'), ('LINEAR_TREND', 'Linear Trend'), ('HOLT_WINTERS', 'Holt-Winters')], default='LINEAR_PROJECTION', max_length=50),
+        ),
+    ]
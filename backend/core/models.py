@@ -1,6 +1,7 @@
+import uuid
 from datetime import timezone
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db.models.signals import post_save
@@ -19,23 +20,12 @@ class Department(models.Model):
 
     def get_budget_summary(self, fiscal_year):
         """Get budget vs actual summary for this department"""
-        allocations = BudgetAllocation.objects.filter(
-            department=self,
-            fiscal_year=fiscal_year,
-            is_active=True
-        )
-
-        total_budget = allocations.aggregate(
-            total=models.Sum('amount'))['total'] or 0
-
-        # Get all approved expenses for these allocations
-        expenses = Expense.objects.filter(
-            budget_allocation__in=allocations,
-            status='APPROVED'
-        )
+        from .rollups import department_budget_rollup
 
-        total_spent = expenses.aggregate(
-            total=models.Sum('amount'))['total'] or 0
+        totals = department_budget_rollup(
+            fiscal_year, department_ids=[self.id])[self.id]
+        total_budget = totals['budget']
+        total_spent = totals['spent']
 
         return {
             'total_budget': total_budget,
@@ -495,6 +485,14 @@ class BudgetAllocation(models.Model):
         default=True,
         help_text="If True, this allocation requires Finance Manager approval before use."
     )
+
+    # Running balances maintained by core/balances.py (never written by save())
+    spent_amount = models.DecimalField(
+        max_digits=15, decimal_places=2, default=Decimal('0.00'),
+        help_text='Sum of APPROVED expenses charged to this allocation.')
+    committed_amount = models.DecimalField(
+        max_digits=15, decimal_places=2, default=Decimal('0.00'),
+        help_text='Sum of SUBMITTED (pending) expenses charged to this allocation.')
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -504,8 +502,28 @@ class BudgetAllocation(models.Model):
     def __str__(self):
         return f"{self.department.name} - {self.account.name} - {self.amount}"
 
+    def save(self, *args, **kwargs):
+        # A stale instance must not overwrite the balances updated with F() since
+        # it was loaded, so plain updates leave them out.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('spent_amount', 'committed_amount')
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['department', 'account']
+        indexes = [
+            # Budget totals/variance by fiscal year, optionally per department and category
+            models.Index(fields=['fiscal_year', 'department', 'category'],
+                         condition=models.Q(is_active=True), name='alloc_active_fy_dept_cat_idx'),
+            models.Index(fields=['fiscal_year', 'category'],
+                         condition=models.Q(is_active=True), name='alloc_active_fy_cat_idx'),
+            # Account setup page: is an account allocated in a fiscal year, and since when
+            models.Index(fields=['account', 'fiscal_year', 'is_active', 'created_at'],
+                         name='alloc_account_fy_created_idx'),
+        ]
 
     def get_total_expenses(self):
         """Calculate total approved expenses for this allocation"""
@@ -570,12 +588,22 @@ class BudgetTransfer(models.Model):
         self): return f"Transfer of {self.amount} from {self.source_allocation.department.name} to {self.destination_allocation.department.name}"
 
 
+# Ledger classification of entries and lines that have no expense category to go by
+LEDGER_DEFAULT_CLASSIFICATION = 'N/A'
+LEDGER_DEFAULT_SUB_CATEGORY = 'General'
+
+
 class JournalEntry(models.Model):
     STATUS_CHOICES = [
         ('DRAFT', 'Draft'),
         ('POSTED', 'Posted'),
     ]
 
+    SOURCE_TYPE_CHOICES = [
+        ('EXPENSE', 'Expense'),
+        ('BUDGET_TRANSFER', 'Budget Transfer'),
+    ]
+
     entry_id = models.CharField(max_length=50, unique=True, editable=False)
     category = models.CharField(max_length=100, choices=[
         ('EXPENSES', 'Expenses'),
@@ -598,6 +626,17 @@ class JournalEntry(models.Model):
         help_text="The department associated with this journal entry."
     )
     # MODIFICATION END
+    # Document this entry was posted from (NULL for manual entries and adjustments)
+    source_type = models.CharField(
+        max_length=30, choices=SOURCE_TYPE_CHOICES, null=True, blank=True)
+    source_id = models.BigIntegerField(null=True, blank=True)
+    # Ledger classification resolved from the entry's lines (see core/ledger.py)
+    classification = models.CharField(
+        max_length=10, null=True, blank=True, default=LEDGER_DEFAULT_CLASSIFICATION,
+        help_text="CapEx/OpEx classification of the first categorized line, or a hint from the category.")
+    sub_category = models.CharField(
+        max_length=100, default=LEDGER_DEFAULT_SUB_CATEGORY,
+        help_text="Expense category name of the first categorized line.")
     created_by_user_id = models.IntegerField(
         help_text="ID of user from Auth Service")
     created_by_username = models.CharField(
@@ -605,21 +644,29 @@ class JournalEntry(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # One posting per source document; also the index behind posting lookups
+            models.UniqueConstraint(
+                fields=['source_type', 'source_id'],
+                condition=models.Q(source_type__isnull=False),
+                name='unique_journal_entry_source'
+            ),
+        ]
+        indexes = [
+            # Ledger ordering, overall and per department
+            models.Index(fields=['-date', 'entry_id'], name='journalentry_date_idx'),
+            models.Index(fields=['department', '-date'], name='journalentry_dept_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.entry_id} - {self.description}"
 
     def save(self, *args, **kwargs):
         if not self.entry_id:
-            # Generate a unique entry ID format
-            year = self.date.year
-            last_entry = JournalEntry.objects.filter(
-                entry_id__startswith=f'JE-{year}-').order_by('-entry_id').first()
-            if last_entry:
-                last_number = int(last_entry.entry_id.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            self.entry_id = f'JE-{year}-{new_number:05d}'
+            # Next number of the year's JE series (see core/sequences.py)
+            from .sequences import journal_entry_ids
+            self.entry_id = journal_entry_ids(self.date.year)[0]
         super().save(*args, **kwargs)
 
 
@@ -649,6 +696,15 @@ class JournalEntryLine(models.Model):
     )
     # MODIFICATION END
 
+    # Copied from expense_category, or from the journal entry for uncategorized
+    # lines, so the ledger needs no category join (see core/ledger.py)
+    classification = models.CharField(
+        max_length=10, null=True, blank=True, default=LEDGER_DEFAULT_CLASSIFICATION)
+    sub_category = models.CharField(max_length=100, default=LEDGER_DEFAULT_SUB_CATEGORY)
+    # Lowercased entry reference/description, line description, sub-category and
+    # account name/code; trigram-indexed on PostgreSQL (see core/search.py)
+    search_text = models.TextField(blank=True, default='')
+
     description = models.TextField()
     transaction_type = models.CharField(
         max_length=10, choices=TRANSACTION_TYPE_CHOICES)
@@ -657,6 +713,13 @@ class JournalEntryLine(models.Model):
     amount = models.DecimalField(
         max_digits=15, decimal_places=2, validators=[MinValueValidator(Decimal('0'))])
 
+    class Meta:
+        indexes = [
+            # The ledger only lists categorized lines
+            models.Index(fields=['journal_entry'], condition=models.Q(expense_category__isnull=False),
+                         name='jeline_categorized_idx'),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type} {self.amount} to {self.account.name}"
 
@@ -721,6 +784,23 @@ class Expense(models.Model):
     category = models.ForeignKey(ExpenseCategory, on_delete=models.PROTECT,
                                  related_name='expenses')
 
+    class Meta:
+        indexes = [
+            # Approved spend per allocation (rollups, balance checks) and per month
+            models.Index(fields=['budget_allocation', 'date'],
+                         condition=models.Q(status='APPROVED'), name='expense_approved_alloc_idx'),
+            # Department dashboards and month ranges
+            models.Index(fields=['department', 'date'],
+                         condition=models.Q(status='APPROVED'), name='expense_approved_dept_idx'),
+            models.Index(fields=['date'],
+                         condition=models.Q(status='APPROVED'), name='expense_approved_date_idx'),
+            # Review queues and expense tracking lists
+            models.Index(fields=['status', 'department', '-date'], name='expense_status_dept_idx'),
+            # Keyset pagination of the expense lists, overall and per department (see core/pagination.py)
+            models.Index(fields=['-date', 'id'], name='expense_date_id_idx'),
+            models.Index(fields=['department', '-date', 'id'], name='expense_dept_date_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.description} - {self.date}"
 
@@ -730,12 +810,17 @@ class Expense(models.Model):
         if self.status != 'APPROVED':
             return
 
-        # Check if this expense would exceed the budget allocation
-        allocated = self.budget_allocation.amount
-        spent = Expense.objects.filter(
-            budget_allocation=self.budget_allocation,
-            status='APPROVED'
-        ).exclude(pk=self.pk).aggregate(total=models.Sum('amount'))['total'] or 0
+        # Check if this expense would exceed the budget allocation, reading the
+        # allocation's running balance under a row lock (see core/balances.py)
+        from .balances import lock_allocation
+        with transaction.atomic():
+            allocation = lock_allocation(self.budget_allocation_id)
+            allocated = allocation.amount
+            spent = allocation.spent_amount
+            # The balance already includes this expense if it is stored as approved
+            spent -= Expense.objects.filter(
+                pk=self.pk, status='APPROVED', budget_allocation_id=allocation.id
+            ).values_list('amount', flat=True).first() or 0
 
         if spent + self.amount > allocated:
             raise ValidationError({
@@ -744,14 +829,9 @@ class Expense(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.transaction_id:
-            date_part = timezone.now().strftime("%Y%m%d")
-            last_expense = Expense.objects.filter(
-                transaction_id__startswith=f"TXN-{date_part}").order_by('transaction_id').last()
-            if last_expense and last_expense.transaction_id:
-                last_number = int(last_expense.transaction_id.split("-")[-1])
-            else:
-                last_number = 0
-            self.transaction_id = f"TXN-{date_part}-{last_number + 1:04d}"
+            # Next number of today's TXN series (see core/sequences.py)
+            from .sequences import expense_transaction_ids
+            self.transaction_id = expense_transaction_ids()[0]
         if self.status == 'APPROVED' and not self.approved_at:
             self.approved_at = timezone.now()
         super().save(*args, **kwargs)
@@ -977,7 +1057,12 @@ class Forecast(models.Model):
     """
     ALGORITHM_CHOICES = [
         ('LINEAR_PROJECTION', 'Linear Projection'),
-        # You can add more complex algorithms here in the future
+        ('SEASONAL_BASELINE', 'Seasonal Baseline'),
+        # Models selected by backtest (see core/forecasting.py)
+        ('SEASONAL_NAIVE', 'Seasonal Naive'),
+        ('EXPONENTIAL_SMOOTHING', 'Exponential Smoothing'),
+        ('LINEAR_TREND', 'Linear Trend'),
+        ('HOLT_WINTERS', 'Holt-Winters'),
     ]
     
     id = models.AutoField(primary_key=True)
@@ -1013,6 +1098,116 @@ class ForecastDataPoint(models.Model):
         return f"{self.month_name}: {self.forecasted_value}"
 
 
+class BudgetActualSnapshot(models.Model):
+    """
+    Pre-aggregated budget vs actual cell used by the dashboards.
+
+    One row per (fiscal_year, department, category, project, month). The row with
+    month=NULL carries the allocated budget; rows with a month carry the approved
+    spend booked in that month. Cells are keyed by the dimensions of the budget
+    allocation an expense is charged to, and are maintained incrementally by the
+    Expense/BudgetAllocation signals (see core/snapshots.py).
+    """
+    fiscal_year = models.ForeignKey(FiscalYear, on_delete=models.CASCADE, related_name='snapshots')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='snapshots')
+    category = models.ForeignKey(ExpenseCategory, on_delete=models.CASCADE, related_name='snapshots')
+    project = models.ForeignKey('Project', on_delete=models.CASCADE, related_name='snapshots')
+    month = models.DateField(
+        null=True, blank=True,
+        help_text="First day of the month for actuals. NULL for the budget row.")
+    budget_amount = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    actual_amount = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fiscal_year', 'department', 'category', 'project'],
+                condition=models.Q(month__isnull=True),
+                name='unique_snapshot_budget_cell'
+            ),
+            models.UniqueConstraint(
+                fields=['fiscal_year', 'department', 'category', 'project', 'month'],
+                condition=models.Q(month__isnull=False),
+                name='unique_snapshot_actual_cell'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['fiscal_year', 'month'], name='snapshot_fy_month_idx'),
+        ]
+
+    def __str__(self):
+        period = self.month.strftime('%Y-%m') if self.month else 'budget'
+        return f"{self.fiscal_year.name} / {self.department.code} / {self.category.code} / {period}"
+
+
+def export_job_upload_to(instance, filename):
+    # Random directory so finished exports cannot be guessed from the media URL
+    return f"exports/{uuid.uuid4().hex}/{filename}"
+
+
+class ExportJob(models.Model):
+    """
+    A report export rendered in the background by the `process_export_jobs`
+    worker. The requester's role and department are stored with the job so the
+    worker applies the same data isolation as the synchronous export views.
+    """
+    EXPORT_TYPE_CHOICES = [
+        ('LEDGER_CSV', 'Ledger CSV'),
+        ('BUDGET_VARIANCE_XLSX', 'Budget Variance XLSX'),
+    ]
+
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+
+    export_type = models.CharField(max_length=30, choices=EXPORT_TYPE_CHOICES)
+    parameters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='QUEUED')
+
+    requested_by_user_id = models.IntegerField(
+        help_text="ID of user from Auth Service who requested the export")
+    requested_by_username = models.CharField(max_length=150)
+    requested_by_role = models.CharField(
+        max_length=50, null=True, blank=True, help_text="BMS role at the time of the request")
+    requested_by_department_id = models.IntegerField(null=True, blank=True)
+
+    file = models.FileField(upload_to=export_job_upload_to, null=True, blank=True)
+    filename = models.CharField(max_length=255, blank=True)
+    row_count = models.IntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_idx'),
+            models.Index(fields=['requested_by_user_id', '-created_at'], name='exportjob_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_export_type_display()} #{self.id} ({self.status})"
+
+
+class DocumentSequence(models.Model):
+    """
+    Counter behind generated document numbers such as JournalEntry.entry_id.
+    One row per number series (e.g. 'JE-2025'); see core/sequences.py.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+
 """
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, username, password=None, **extra_fields):
@@ -1,7 +1,17 @@
 # backend\core\pagination.py
 
+import base64
+import functools
+import json
+import operator
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -71,4 +81,199 @@ class SixResultsSetPagination(PageNumberPagination):
             'previous': self.get_previous_link(),
             'page_size': self.get_page_size(self.request), # ADDED
             'results': data
-        })
\ No newline at end of file
+        })
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Cursor (keyset) pagination over a stable composite `ordering`, with the same
+    count/next/previous/page_size envelope as the page-number classes above.
+
+    A page after a cursor is fetched with a range predicate on the ordering
+    columns (served by an index on them) instead of an OFFSET, so deep pages
+    cost the same as the first. next/previous are cursor links.
+
+    Requests with a `page` parameter (and no `cursor`) keep page-number
+    behaviour, ordered the same way, so page-number clients are unaffected.
+
+    `count` is exact in page-number mode. In cursor mode it is estimated from
+    the planner statistics on PostgreSQL (exact elsewhere); `count=exact`,
+    `count=estimate` and `count=none` override that.
+    """
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    # Must end with a unique field so every row has a distinct position
+    ordering = ('-id',)
+
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = queryset.order_by(*self.ordering)
+        self.cursor_mode = (self.cursor_query_param in request.query_params
+                            or self.page_query_param not in request.query_params)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset, request, default='estimate')
+        position, reverse = self.decode_cursor(request)
+        if position is not None:
+            queryset = self.filter_after(queryset, position, reverse)
+        if reverse:
+            queryset = queryset.reverse()
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.first_position = self.position(rows[0]) if rows else None
+        self.last_position = self.position(rows[-1]) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count if self.cursor_mode else self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'page_size': self.get_page_size(self.request),
+            'results': data
+        })
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.cursor_query_param, 'required': False, 'in': 'query',
+                'description': 'Cursor from a previous next/previous link (replaces page).',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.count_query_param, 'required': False, 'in': 'query',
+                'description': 'exact, estimate or none.',
+                'schema': {'type': 'string', 'enum': ['exact', 'estimate', 'none']},
+            },
+        ]
+
+    # --- Count ---
+
+    def get_count(self, queryset, request, default):
+        mode = request.query_params.get(self.count_query_param, default)
+        if mode == 'none':
+            return None
+        if mode == 'estimate':
+            return estimated_count(queryset)
+        return queryset.count()
+
+    # --- Cursor ---
+
+    def position(self, row):
+        """The row's values of the ordering fields."""
+        values = []
+        for field in self.ordering:
+            value = row
+            for attribute in field.lstrip('-').split('__'):
+                value = getattr(value, attribute)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def after(self, position, reverse=False):
+        """Rows past `position` in the ordering (before it when reverse)."""
+        conditions = []
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            conditions.append(equal & Q(**{f"{name}__{'lt' if descending else 'gt'}": value}))
+            equal &= Q(**{name: value})
+        return functools.reduce(operator.or_, conditions)
+
+    def filter_after(self, queryset, position, reverse):
+        """
+        queryset.filter(after(position)) with the cursor values converted and
+        validated by their ordering fields, so a tampered cursor is a 404.
+        """
+        try:
+            values = []
+            for field_name, value in zip(self.ordering, position):
+                field = ordering_field(queryset.model, field_name)
+                value = field.to_python(value)
+                field.run_validators(value)
+                values.append(value)
+            return queryset.filter(self.after(values, reverse))
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def cursor_link(self, position, reverse):
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.cursor_link(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.cursor_link(self.first_position, reverse=True)
+
+
+def ordering_field(model, ordering):
+    """The model field an ordering such as '-journal_entry__date' sorts on."""
+    *relations, name = ordering.lstrip('-').split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def estimated_count(queryset):
+    """Row count estimated by the PostgreSQL planner; an exact COUNT elsewhere."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class LedgerPagination(KeysetPagination):
+    ordering = ('-journal_entry__date', 'journal_entry__entry_id', 'id')
+
+
+class ExpensePagination(KeysetPagination):
+    ordering = ('-date', 'id')
+
+
+class JournalEntryPagination(KeysetPagination):
+    ordering = ('-date', '-entry_id')
@@ -0,0 +1,173 @@
+"""
+Journal postings for source documents.
+
+A posted document is linked to its JournalEntry through (source_type, source_id),
+which is uniquely indexed, so "already posted?" is an index probe and a second
+posting of the same document is rejected by the database. The cash / accounts
+payable credit accounts are resolved once and cached; Account and AccountType
+changes invalidate the cache (see signals.py).
+
+Expenses are posted in batches (post_expenses); the post_save signal posts a
+batch of one, and bulk approval/import paths pass their whole batch.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import ledger, report_cache
+from .models import Account, Expense, JournalEntry, JournalEntryLine
+from .sequences import assign_journal_entry_ids
+
+
+CASH_ACCOUNT_CODE = '1010'
+PAYABLE_ACCOUNT_CODE = '2010'
+# Expenses above this are credited to Accounts Payable instead of Cash
+PAYABLE_THRESHOLD = Decimal('50000')
+
+POSTING_BATCH_SIZE = 1000
+
+CREDIT_ACCOUNTS_CACHE_KEY = 'posting:credit-accounts'
+# Bounds staleness for processes that did not see the invalidating signal
+CREDIT_ACCOUNTS_CACHE_TIMEOUT = 300
+
+
+def credit_accounts():
+    """Cached {'1010': id, '2010': id, 'fallback': id}; missing accounts are None."""
+    accounts = cache.get(CREDIT_ACCOUNTS_CACHE_KEY)
+    if accounts is None:
+        by_code = dict(Account.objects.filter(
+            code__in=[CASH_ACCOUNT_CODE, PAYABLE_ACCOUNT_CODE]).values_list('code', 'id'))
+        accounts = {
+            CASH_ACCOUNT_CODE: by_code.get(CASH_ACCOUNT_CODE),
+            PAYABLE_ACCOUNT_CODE: by_code.get(PAYABLE_ACCOUNT_CODE),
+            # Any Asset or Liability account keeps the entry balanced if 1010/2010 are missing
+            'fallback': Account.objects.filter(
+                account_type__name__in=['Asset', 'Liability']
+            ).order_by('id').values_list('id', flat=True).first(),
+        }
+        cache.set(CREDIT_ACCOUNTS_CACHE_KEY, accounts, CREDIT_ACCOUNTS_CACHE_TIMEOUT)
+    return accounts
+
+
+def invalidate_credit_accounts():
+    cache.delete(CREDIT_ACCOUNTS_CACHE_KEY)
+
+
+def expense_credit_account_id(amount):
+    accounts = credit_accounts()
+    code = PAYABLE_ACCOUNT_CODE if amount > PAYABLE_THRESHOLD else CASH_ACCOUNT_CODE
+    return accounts[code] or accounts['fallback']
+
+
+def posted_source_ids(source_type, source_ids):
+    return set(JournalEntry.objects.filter(
+        source_type=source_type, source_id__in=source_ids).values_list('source_id', flat=True))
+
+
+def _expense_entry(expense):
+    return JournalEntry(
+        date=expense.date,
+        category='EXPENSES',
+        description=f"Expense Recorded: {expense.description} (Ref: {expense.transaction_id})",
+        total_amount=expense.amount,
+        status='POSTED',
+        department_id=expense.department_id,
+        source_type='EXPENSE',
+        source_id=expense.pk,
+        created_by_user_id=expense.submitted_by_user_id,
+        created_by_username=expense.submitted_by_username
+    )
+
+
+def _expense_lines(expense, je, credit_account_id):
+    return [
+        # Debit line (the expense)
+        JournalEntryLine(
+            journal_entry=je,
+            account_id=expense.account_id,
+            expense_category_id=expense.category_id,
+            description=expense.description,
+            transaction_type='DEBIT',
+            journal_transaction_type='OPERATIONAL_EXPENDITURE',
+            amount=expense.amount
+        ),
+        # Credit line (cash / payable); carries no expense category
+        JournalEntryLine(
+            journal_entry=je,
+            account_id=credit_account_id,
+            expense_category=None,
+            description=f"Payment for {expense.transaction_id}",
+            transaction_type='CREDIT',
+            journal_transaction_type='OPERATIONAL_EXPENDITURE',
+            amount=expense.amount
+        ),
+    ]
+
+
+def _post_expense_batch(expenses):
+    posted = posted_source_ids('EXPENSE', [e.pk for e in expenses])
+    to_post = []
+    for expense in expenses:
+        if expense.pk in posted:
+            continue
+        posted.add(expense.pk)  # Also drops duplicates within the batch
+        credit_account_id = expense_credit_account_id(expense.amount)
+        if credit_account_id is None:
+            print("Error: Could not find credit account for Expense Journal Entry.")
+            continue
+        to_post.append((expense, credit_account_id))
+    if not to_post:
+        return []
+
+    try:
+        with transaction.atomic():
+            entries = JournalEntry.objects.bulk_create(assign_journal_entry_ids(
+                [_expense_entry(expense) for expense, _ in to_post]))
+            lines = []
+            for (expense, credit_account_id), je in zip(to_post, entries):
+                lines.extend(_expense_lines(expense, je, credit_account_id))
+            JournalEntryLine.objects.bulk_create(lines)
+            # Mark the expenses as posted
+            Expense.objects.filter(
+                pk__in=[expense.pk for expense, _ in to_post]
+            ).update(posting_date=F('date'))
+            # bulk_create skips the JournalEntry and JournalEntryLine signals
+            ledger.classify_journal_entries(entry.pk for entry in entries)
+            report_cache.journal_entries_changed(entry.date for entry in entries)
+    except IntegrityError:
+        # A concurrent save posted some of these first; retry with what is left
+        if posted_source_ids('EXPENSE', [expense.pk for expense, _ in to_post]):
+            return _post_expense_batch([expense for expense, _ in to_post])
+        raise
+
+    for expense, _ in to_post:
+        expense.posting_date = expense.date
+    return entries
+
+
+def post_expenses(expenses, batch_size=POSTING_BATCH_SIZE):
+    """
+    Posts approved expenses in one transaction, `batch_size` at a time: one query
+    to skip the already posted ones, one entry ID block per year, bulk inserts of
+    the entries and their lines, and one posting_date update per batch.
+    Expenses that are not APPROVED, already posted, or have no credit account
+    are skipped. Returns the created entries.
+    """
+    candidates = [e for e in expenses if e.status == 'APPROVED' and e.pk is not None]
+    entries = []
+    with transaction.atomic():
+        for start in range(0, len(candidates), batch_size):
+            entries.extend(_post_expense_batch(candidates[start:start + batch_size]))
+    return entries
+
+
+def post_expense(expense):
+    """
+    Posts one approved expense: DEBIT its account, CREDIT cash or payables.
+    Returns the new JournalEntry, or None if it was already posted or no
+    credit account exists (nothing is written in that case).
+    """
+    entries = post_expenses([expense])
+    return entries[0] if entries else None
@@ -0,0 +1,154 @@
+"""
+Shared cache for the dashboard and report endpoints.
+
+Responses are stored in the 'reports' cache alias (file-, database- or
+Redis-backed, see REPORT_CACHE_URL in settings), so every worker process shares
+them. A cache key is scoped by endpoint, the caller's BMS role and department,
+the full request URL, and two generation tokens:
+
+- one per fiscal year, bumped by the Expense, BudgetAllocation, JournalEntry,
+  BudgetProposal and Forecast signals in core/signals.py;
+- one for reference data (fiscal years, departments, categories, projects)
+  that reports read across fiscal years.
+
+Entries never expire; a bump makes every key built on the old token
+unreachable, and the backend's culling drops them. Tokens are random rather
+than counters, so a token lost to culling or a cache flush can never bring an
+old entry back.
+
+Code paths that bypass model signals (bulk_update(), bulk_create(), ...) must
+call the matching *_changed() function themselves.
+"""
+import functools
+import hashlib
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .fiscal_years import active_fiscal_year
+from .models import BudgetAllocation, FiscalYear
+
+
+REPORT_CACHE_ALIAS = 'reports'
+REFERENCE_SCOPE = 'reference'
+
+KEY_PREFIX = 'bms:report'
+
+
+def report_cache():
+    return caches[REPORT_CACHE_ALIAS]
+
+
+def _generation_key(scope):
+    return f"{KEY_PREFIX}:generation:{scope}"
+
+
+def generations(*scopes):
+    """Current generation token of each scope, creating missing ones."""
+    cache = report_cache()
+    keys = [_generation_key(scope) for scope in scopes]
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            # add() so concurrent first readers agree on one token
+            cache.add(key, uuid.uuid4().hex, None)
+            tokens[key] = cache.get(key)
+    return [tokens[key] for key in keys]
+
+
+def _bump_now(scopes):
+    report_cache().set_many({_generation_key(scope): uuid.uuid4().hex for scope in scopes}, None)
+
+
+def bump(*scopes):
+    """
+    Invalidates every report built on the given scopes. The bump happens right
+    away and again after the current transaction commits: a request that read
+    the old rows while the transaction was open may have cached them under the
+    first new token, and the second bump discards that entry.
+    """
+    scopes = sorted({str(scope) for scope in scopes if scope is not None})
+    if not scopes:
+        return
+    _bump_now(scopes)
+    transaction.on_commit(lambda: _bump_now(scopes))
+
+
+def fiscal_years_changed(fiscal_year_ids):
+    bump(*fiscal_year_ids)
+
+
+def reference_data_changed():
+    bump(REFERENCE_SCOPE)
+
+
+def allocations_changed(allocation_ids):
+    """Bumps the fiscal years of the given allocations."""
+    allocation_ids = {pk for pk in allocation_ids if pk is not None}
+    if allocation_ids:
+        fiscal_years_changed(
+            BudgetAllocation.objects.filter(pk__in=allocation_ids)
+            .values_list('fiscal_year_id', flat=True).distinct())
+
+
+def expenses_changed(changes):
+    """Takes (previous_state, current_state) pairs as built by snapshots.expense_state()."""
+    allocations_changed(
+        state['budget_allocation_id'] for change in changes for state in change if state)
+
+
+def journal_entries_changed(dates):
+    """Bumps the fiscal years containing the given entry dates."""
+    dates = {value for value in dates if value}
+    if dates:
+        covering = Q()
+        for value in dates:
+            covering |= Q(start_date__lte=value, end_date__gte=value)
+        fiscal_years_changed(FiscalYear.objects.filter(covering).values_list('id', flat=True))
+
+
+# --- Cached views ---
+
+def report_cache_key(name, request, fiscal_year_id):
+    user = request.user
+    role = getattr(user, 'roles', {}).get('bms')
+    department_id = getattr(user, 'department_id', None)
+    fiscal_year_token, reference_token = generations(fiscal_year_id, REFERENCE_SCOPE)
+    url = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+    # Period filters (this month, this quarter) are relative to today
+    today = timezone.now().date().isoformat()
+    return ':'.join(str(part) for part in (
+        KEY_PREFIX, name, role, department_id, fiscal_year_id, fiscal_year_token, reference_token,
+        today, url))
+
+
+def cached_report(name, fiscal_year_param='fiscal_year_id'):
+    """
+    Caches a GET view's successful responses in the report cache. The report's
+    fiscal year is the `fiscal_year_param` query parameter, or the active fiscal
+    year when it is absent (or fiscal_year_param is None, for views that always
+    report on the active year). Wrap DRF function views below @api_view, and
+    view methods with method_decorator.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            fiscal_year_id = fiscal_year_param and request.query_params.get(fiscal_year_param)
+            if not fiscal_year_id:
+                fiscal_year = active_fiscal_year(request)
+                fiscal_year_id = fiscal_year.id if fiscal_year else None
+            key = report_cache_key(name, request, fiscal_year_id)
+            data = report_cache().get(key)
+            if data is not None:
+                return Response(data)
+            response = view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                report_cache().set(key, response.data, None)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,320 @@
+"""
+Set-based budget rollups shared by the dashboard views and the model helpers.
+
+Budget vs actual totals are read from the BudgetActualSnapshot fact table (see
+core/snapshots.py), so they cost one grouped query over O(cells) rows instead of
+a scan of the Expense table. Spend is resolved at month granularity: a date range
+selects every month it touches.
+
+The allocation and month helpers further down work on the source tables with
+one grouped query (or one correlated subquery) per measure.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import DecimalField, Exists, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .models import (
+    BudgetActualSnapshot, BudgetAllocation, BudgetProposalItem, Expense, ExpenseCategory, ProposalComment,
+    ProposalHistory
+)
+from .snapshots import month_start
+
+
+ZERO = Decimal('0.00')
+
+
+def _snapshot_cells(fiscal_year=None, department_ids=None):
+    cells = BudgetActualSnapshot.objects.all()
+    if fiscal_year is not None:
+        cells = cells.filter(fiscal_year=fiscal_year)
+    if department_ids is not None:
+        cells = cells.filter(department_id__in=list(department_ids))
+    return cells
+
+
+def _snapshot_measures(start_date=None, end_date=None):
+    """Sum() expressions for budget and (optionally period-restricted) spent."""
+    spent_filter = Q(month__isnull=False)
+    if start_date and end_date:
+        spent_filter &= Q(month__gte=month_start(start_date), month__lte=end_date)
+    return {
+        'budget': Coalesce(Sum('budget_amount'), Value(ZERO)),
+        'spent': Coalesce(Sum('actual_amount', filter=spent_filter), Value(ZERO)),
+    }
+
+
+def budget_actual_totals(fiscal_year=None, department_ids=None, start_date=None, end_date=None):
+    """
+    Returns {'budget': Decimal, 'spent': Decimal} summed over the selected cells.
+
+    - budget: active allocations of the fiscal year (all fiscal years when None).
+    - spent: approved expenses booked against them, optionally restricted to
+      the months within [start_date, end_date].
+    """
+    return _snapshot_cells(fiscal_year, department_ids).aggregate(
+        **_snapshot_measures(start_date, end_date))
+
+
+def department_budget_rollup(fiscal_year, department_ids=None, start_date=None, end_date=None):
+    """
+    Returns {department_id: {'budget': Decimal, 'spent': Decimal}} for the fiscal year
+    in a single grouped query. See budget_actual_totals() for the measures.
+
+    Departments with no allocations are still returned (with zeros) when they are
+    listed in department_ids, so callers can zip the result with their own queryset.
+    """
+    if department_ids is not None:
+        department_ids = list(department_ids)
+
+    rollup = {dept_id: {'budget': ZERO, 'spent': ZERO} for dept_id in (department_ids or [])}
+
+    rows = _snapshot_cells(fiscal_year, department_ids).values('department_id').annotate(
+        **_snapshot_measures(start_date, end_date)
+    ).order_by()
+    for row in rows:
+        rollup[row['department_id']] = {'budget': row['budget'], 'spent': row['spent']}
+
+    return rollup
+
+
+def category_budget_rollup(fiscal_year, department_ids=None):
+    """
+    Returns {category_id: {'budget': Decimal, 'spent': Decimal}} for the fiscal year
+    in two grouped queries. The budget comes from the snapshot cells (active
+    allocations). Spend is approved expenses booked against the fiscal year,
+    grouped by the expense's own category, which can differ from its
+    allocation's, and including spend on deactivated allocations.
+    """
+    rollup = defaultdict(lambda: {'budget': ZERO, 'spent': ZERO})
+
+    budget_rows = _snapshot_cells(fiscal_year, department_ids).values('category_id').annotate(
+        budget=Coalesce(Sum('budget_amount'), Value(ZERO))
+    ).order_by()
+    for row in budget_rows:
+        rollup[row['category_id']]['budget'] = row['budget']
+
+    expenses = Expense.objects.filter(status='APPROVED', budget_allocation__fiscal_year=fiscal_year)
+    if department_ids is not None:
+        expenses = expenses.filter(department_id__in=list(department_ids))
+    spent_rows = expenses.values('category_id').annotate(spent=Sum('amount')).order_by()
+    for row in spent_rows:
+        rollup[row['category_id']]['spent'] = row['spent'] or ZERO
+
+    return dict(rollup)
+
+
+def approved_spent_subquery(outer_ref='pk'):
+    """
+    Correlated subquery returning the approved spend of the allocation referenced
+    by outer_ref (0 when there are no approved expenses).
+    """
+    spent = Expense.objects.filter(
+        budget_allocation=OuterRef(outer_ref),
+        status='APPROVED'
+    ).values('budget_allocation').annotate(
+        total=Sum('amount')
+    ).values('total')
+    return Coalesce(
+        Subquery(spent, output_field=DecimalField(max_digits=15, decimal_places=2)),
+        Value(ZERO),
+        output_field=DecimalField(max_digits=15, decimal_places=2)
+    )
+
+
+def approved_expense_totals(fiscal_year, today, department_id=None):
+    """
+    Returns {'spent', 'this_month'} from the Expense table in one query: approved
+    spend booked against the fiscal year's allocations, and approved spend dated
+    in today's month. Unlike the snapshot totals, spend on inactive allocations
+    counts, and department_id selects the expense's own department.
+    """
+    expenses = Expense.objects.filter(status='APPROVED')
+    if department_id is not None:
+        expenses = expenses.filter(department_id=department_id)
+    return expenses.aggregate(
+        spent=Coalesce(Sum('amount', filter=Q(budget_allocation__fiscal_year=fiscal_year)), Value(ZERO)),
+        this_month=Coalesce(
+            Sum('amount', filter=Q(date__year=today.year, date__month=today.month)), Value(ZERO)),
+    )
+
+
+def annotate_allocation_spent(allocations):
+    """Annotates each allocation in the queryset with its approved `spent` total."""
+    return allocations.annotate(spent=approved_spent_subquery())
+
+
+def annotate_account_accomplishment(accounts, fiscal_year):
+    """
+    Annotates each account with `fiscal_year_accomplished` (it has an active
+    allocation in fiscal_year) and `fiscal_year_accomplishment_date` (when the
+    first one was created). Account's own accomplished/accomplishment_date
+    fields are not fiscal-year specific.
+    """
+    allocations = BudgetAllocation.objects.filter(
+        account=OuterRef('pk'), fiscal_year=fiscal_year, is_active=True)
+    first_created = allocations.order_by().values('account').annotate(
+        first=Min('created_at')
+    ).values('first')
+    return accounts.annotate(
+        fiscal_year_accomplished=Exists(allocations),
+        fiscal_year_accomplishment_date=Subquery(first_created)
+    )
+
+
+def annotate_proposal_summaries(proposals):
+    """
+    Annotates each proposal with the per-row values of the proposal list and
+    detail serializers: `items_total` (sum of the items' estimated costs), the
+    first item's category (`first_item_classification`, `first_item_category_name`)
+    and `latest_review_comment_id`, the reviewer's first comment at or after the
+    latest approval or rejection.
+    """
+    items = BudgetProposalItem.objects.filter(proposal=OuterRef('pk'))
+    items_total = items.order_by().values('proposal').annotate(
+        total=Sum('estimated_cost')
+    ).values('total')
+    first_item = items.order_by('pk')
+    latest_review = ProposalHistory.objects.filter(
+        proposal=OuterRef('pk'), action__in=['APPROVED', 'REJECTED']
+    ).order_by('-action_at')
+    review_comment = ProposalComment.objects.filter(
+        proposal=OuterRef('pk'),
+        user_username=OuterRef('latest_review_by'),
+        created_at__gte=OuterRef('latest_review_at')
+    ).order_by('created_at')
+    return proposals.annotate(
+        items_total=Subquery(items_total, output_field=DecimalField(max_digits=15, decimal_places=2)),
+        first_item_classification=Subquery(first_item.values('category__classification')[:1]),
+        first_item_category_name=Subquery(first_item.values('category__name')[:1]),
+        latest_review_at=Subquery(latest_review.values('action_at')[:1]),
+        latest_review_by=Subquery(latest_review.values('action_by_name')[:1]),
+    ).annotate(
+        latest_review_comment_id=Subquery(review_comment.values('pk')[:1])
+    )
+
+
+def iter_months(start_date, end_date):
+    """
+    Yields (year, month) for every calendar month touched by [start_date, end_date],
+    in order. Works for ranges that cross one or more calendar years.
+    """
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        yield year, month
+        if month == 12:
+            year, month = year + 1, 1
+        else:
+            month += 1
+
+
+def monthly_actuals(expenses):
+    """
+    Returns {(year, month): total} for the expense queryset using a single
+    TruncMonth-grouped query. Months without expenses are simply absent.
+    """
+    rows = expenses.annotate(
+        bucket=TruncMonth('date')
+    ).values('bucket').annotate(
+        total=Sum('amount')
+    ).order_by()
+    return {
+        (row['bucket'].year, row['bucket'].month): row['total'] or ZERO
+        for row in rows
+    }
+
+
+def monthly_budget_vs_actual(expenses, start_date, end_date, total_budget):
+    """
+    Builds the month-by-month budget vs actual series for [start_date, end_date].
+
+    The budget is spread evenly across the months of the range and merged with the
+    actuals from monthly_actuals(), so the whole series costs one query.
+    """
+    months = list(iter_months(start_date, end_date))
+    if not months:
+        return []
+
+    monthly_budget = (total_budget or ZERO) / Decimal(len(months))
+
+    first_year, first_month = months[0]
+    last_year, last_month = months[-1]
+    actuals = monthly_actuals(expenses.filter(
+        date__gte=date(first_year, first_month, 1),
+        date__lte=date(last_year, last_month, calendar.monthrange(last_year, last_month)[1])
+    ))
+
+    return [
+        {
+            'month': month,
+            'month_name': calendar.month_name[month],
+            'budget': monthly_budget,
+            'actual': actuals.get((year, month), ZERO)
+        }
+        for year, month in months
+    ]
+
+
+def category_variance_tree(fiscal_year, department_id=None, month=None):
+    """
+    Budget vs actual for the whole ExpenseCategory tree in three queries.
+
+    Loads every category once, fetches budget (active allocations of the fiscal
+    year) and actual (approved expenses, optionally for one calendar month) sums
+    grouped by category_id, then rolls the totals up in memory. A parent node's
+    totals are the sum of its children; leaves use their own sums.
+
+    Returns one node per active level-1 category:
+    {'category': ExpenseCategory, 'budget', 'actual', 'available', 'children': [...]}
+    """
+    categories = list(ExpenseCategory.objects.order_by('id'))
+    children_of = defaultdict(list)
+    for category in categories:
+        if category.parent_category_id:
+            children_of[category.parent_category_id].append(category)
+
+    allocations = BudgetAllocation.objects.filter(fiscal_year=fiscal_year, is_active=True)
+    expenses = Expense.objects.filter(status='APPROVED', budget_allocation__fiscal_year=fiscal_year)
+    if department_id:
+        allocations = allocations.filter(department_id=department_id)
+        expenses = expenses.filter(department_id=department_id)
+    if month:
+        expenses = expenses.filter(date__month=month)
+
+    budgets = {
+        row['category_id']: row['total']
+        for row in allocations.values('category_id').annotate(total=Sum('amount')).order_by()
+    }
+    actuals = {
+        row['category_id']: row['total']
+        for row in expenses.values('category_id').annotate(total=Sum('amount')).order_by()
+    }
+
+    def build(category, path):
+        children = [
+            build(child, path | {child.id})
+            for child in children_of[category.id]
+            if child.id not in path
+        ]
+        if children:
+            budget = sum((child['budget'] for child in children), ZERO)
+            actual = sum((child['actual'] for child in children), ZERO)
+        else:
+            budget = budgets.get(category.id) or ZERO
+            actual = actuals.get(category.id) or ZERO
+        return {
+            'category': category,
+            'budget': budget,
+            'actual': actual,
+            'available': budget - actual,
+            'children': children,
+        }
+
+    return [
+        build(category, {category.id})
+        for category in categories
+        if category.level == 1 and category.is_active
+    ]
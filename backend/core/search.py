@@ -0,0 +1,78 @@
+"""
+Ledger search.
+
+Every JournalEntryLine stores a lowercased search_text: its entry's reference
+and description, its own description and sub-category, and its account's name
+and code. A search term is one LIKE '%term%' over that column instead of an OR
+of icontains predicates across four joined tables. On PostgreSQL the column has
+a pg_trgm GIN index (migration 0017), which serves those LIKE patterns; other
+databases scan the single column.
+
+Date-shaped terms (2025, 2025-03, 2025-03-04) also match entries dated in that
+year, month or day through a range on journal_entry__date, which the date
+indexes serve, instead of casting dates to text.
+
+index_ledger_lines() refreshes the column. ledger.classify_journal_entries()
+calls it for every entry it touches; account changes reindex their lines (see
+signals.py).
+"""
+import calendar
+import re
+from datetime import date
+
+from django.db.models import CharField, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+from .models import Account, JournalEntry
+
+
+# A year, a year and month, or a full ISO date
+DATE_TERM = re.compile(r'^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$')
+
+
+def date_range(term):
+    """(first, last) date covered by a date-shaped term, or None."""
+    match = DATE_TERM.match(term.strip())
+    if not match:
+        return None
+    year, month, day = (int(part) if part else None for part in match.groups())
+    try:
+        if day:
+            return date(year, month, day), date(year, month, day)
+        if month:
+            return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+        return date(year, 1, 1), date(year, 12, 31)
+    except ValueError:
+        return None
+
+
+def search_text_expression():
+    """The search_text of a JournalEntryLine row, for use in UPDATE statements."""
+    entry = JournalEntry.objects.filter(pk=OuterRef('journal_entry_id'))
+    account = Account.objects.filter(pk=OuterRef('account_id'))
+    parts = [
+        Subquery(entry.values('entry_id')),
+        Subquery(entry.values('description')),
+        F('description'),
+        F('sub_category'),
+        Subquery(account.values('name')),
+        Subquery(account.values('code')),
+    ]
+    separated = []
+    for part in parts:
+        separated += [Coalesce(part, Value(''), output_field=CharField()), Value(' ')]
+    return Lower(Concat(*separated[:-1], output_field=CharField()))
+
+
+def index_ledger_lines(lines):
+    """Recomputes search_text of the given JournalEntryLine queryset."""
+    lines.update(search_text=search_text_expression())
+
+
+def ledger_search_q(search):
+    """Filter for JournalEntryLine rows matching a ledger search string."""
+    q = Q(search_text__contains=search.strip().lower())
+    covered = date_range(search)
+    if covered:
+        q |= Q(journal_entry__date__range=covered)
+    return q
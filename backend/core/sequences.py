@@ -0,0 +1,111 @@
+"""
+Document number allocation for journal entry and expense transaction IDs.
+
+Numbers come from a DocumentSequence row that is bumped with a single
+`UPDATE ... SET last_value = last_value + n ... RETURNING last_value`. The
+UPDATE takes the row lock, so concurrent writers in any number of processes
+are serialized on that one row instead of racing on `MAX(entry_id) + 1`.
+
+When the reservation runs inside the caller's transaction (e.g. inside
+`transaction.atomic()` around an approval), a rollback also rolls the counter
+back, so the series stays gap-free. Bulk inserts reserve a whole block with one
+statement via `count`.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import DocumentSequence, Expense, JournalEntry
+
+
+def reserve(name, count=1, initial=None):
+    """
+    Reserves `count` consecutive numbers of the series `name` and returns the
+    first one. `initial` is called (once, when the series row does not exist
+    yet) to get the last number already in use, so new series continue from
+    data that predates the counter.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    table = connection.ops.quote_name(DocumentSequence._meta.db_table)
+    sql = f"UPDATE {table} SET last_value = last_value + %s WHERE name = %s RETURNING last_value"
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [count, name])
+            row = cursor.fetchone()
+            if row is None:
+                _create_series(name, initial() if initial else 0)
+                cursor.execute(sql, [count, name])
+                row = cursor.fetchone()
+    return row[0] - count + 1
+
+
+def _create_series(name, last_value):
+    try:
+        with transaction.atomic():
+            DocumentSequence.objects.create(name=name, last_value=last_value)
+    except IntegrityError:
+        # Another writer created the series first; its row is used as is
+        pass
+
+
+def _max_suffix(values):
+    numbers = [int(value.rsplit('-', 1)[-1]) for value in values
+               if value.rsplit('-', 1)[-1].isdigit()]
+    return max(numbers, default=0)
+
+
+def _document_ids(prefix, width, count, model, field):
+    """
+    `count` new IDs of the form {prefix}{n:0{width}d}. The series is named after
+    the prefix and seeded from the highest `model.field` already using it.
+    """
+    def existing():
+        return _max_suffix(model.objects.filter(
+            **{f'{field}__startswith': prefix}).values_list(field, flat=True))
+
+    first = reserve(prefix.rstrip('-'), count, initial=existing)
+    return [f'{prefix}{number:0{width}d}' for number in range(first, first + count)]
+
+
+# --- Journal entries: JE-{year}-{n:05d} ---
+
+def journal_entry_ids(year, count=1):
+    """`count` new journal entry IDs for `year`."""
+    return _document_ids(f'JE-{year}-', 5, count, JournalEntry, 'entry_id')
+
+
+def assign_journal_entry_ids(entries):
+    """
+    Fills in entry_id on unsaved JournalEntry objects (e.g. before bulk_create),
+    reserving one block per year.
+    """
+    by_year = {}
+    for entry in entries:
+        if not entry.entry_id:
+            by_year.setdefault(entry.date.year, []).append(entry)
+    for year, year_entries in by_year.items():
+        for entry, entry_id in zip(year_entries, journal_entry_ids(year, len(year_entries))):
+            entry.entry_id = entry_id
+    return entries
+
+
+# --- Expenses: TXN-{YYYYMMDD}-{n:04d} ---
+
+def expense_transaction_ids(count=1, day=None):
+    """
+    `count` new expense transaction IDs for `day` (default: today). Numbers
+    widen past 4 digits instead of wrapping once a day exceeds 9999 expenses.
+    """
+    day = day or timezone.now()
+    return _document_ids(f"TXN-{day:%Y%m%d}-", 4, count, Expense, 'transaction_id')
+
+
+def assign_expense_transaction_ids(expenses, day=None):
+    """Fills in transaction_id on unsaved Expense objects with one reserved block."""
+    pending = [expense for expense in expenses if not expense.transaction_id]
+    if pending:
+        for expense, transaction_id in zip(pending, expense_transaction_ids(len(pending), day)):
+            expense.transaction_id = transaction_id
+    return expenses
@@ -1,10 +1,12 @@
 from decimal import Decimal
 from .models import (
-    Account, AccountType, BudgetAllocation, BudgetProposal, BudgetProposalItem, Department, Expense,
+    Account, AccountType, BudgetAllocation, BudgetProposal, BudgetTransfer, BudgetProposalItem, Department,
     FiscalYear, JournalEntry, JournalEntryLine, ProposalComment, ProposalHistory
 )
 from rest_framework import serializers
-from django.db.models import Sum
+from .balances import available_amount
+from .transfers import TRANSFER_LEGS_MAX
+from django.db.models import Q, Sum
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 
@@ -15,6 +17,27 @@ class BudgetProposalSummarySerializer(serializers.Serializer):
     total_budget = serializers.DecimalField(max_digits=15, decimal_places=2)
 
 
+# The proposal serializers read the values annotated by
+# rollups.annotate_proposal_summaries() and only query per row without them.
+
+def _items_total(obj):
+    if hasattr(obj, 'items_total'):
+        return obj.items_total or 0
+    return obj.items.aggregate(total=Sum('estimated_cost'))['total'] or 0
+
+
+def _first_item_category(obj):
+    """(classification, name) of the first item's category, or None."""
+    if hasattr(obj, 'first_item_category_name'):
+        if obj.first_item_category_name is None:
+            return None
+        return obj.first_item_classification, obj.first_item_category_name
+    first_item = obj.items.first()
+    if first_item and first_item.category:
+        return first_item.category.classification, first_item.category.name
+    return None
+
+
 class BudgetProposalListSerializer(serializers.ModelSerializer):
     submitted_by = serializers.CharField(
         source='submitted_by_name', read_only=True)
@@ -40,21 +63,21 @@ class BudgetProposalListSerializer(serializers.ModelSerializer):
         ]
 
     def get_amount(self, obj):
-        return obj.items.aggregate(total=Sum('estimated_cost'))['total'] or 0
+        return _items_total(obj)
 
      # MODIFIED: Updated to fetch category name from the new relationship
     def get_category(self, obj):
         # Returns the Main Classification (CapEx/OpEx)
-        first_item = obj.items.first()
-        if first_item and first_item.category:
-            return first_item.category.classification  # e.g., 'OPEX'
+        category = _first_item_category(obj)
+        if category:
+            return category[0]  # e.g., 'OPEX'
         return "Uncategorized"
 
     def get_sub_category(self, obj):
         # Returns the Specific Sub-category Name
-        first_item = obj.items.first()
-        if first_item and first_item.category:
-            return first_item.category.name  # e.g., 'Server Hosting'
+        category = _first_item_category(obj)
+        if category:
+            return category[1]  # e.g., 'Server Hosting'
         return "General"
 
 
@@ -105,21 +128,21 @@ class BudgetProposalDetailSerializer(serializers.ModelSerializer):
             'finance_operator_name', 'signature'
         ]
 
-    def get_total_cost(self, obj): return obj.items.aggregate(
-        total=Sum('estimated_cost'))['total'] or 0
+    def get_total_cost(self, obj):
+        return _items_total(obj)
 
     def get_category(self, obj):
         # MODIFIED: Return Classification (CapEx/OpEx) instead of Name
-        first_item = obj.items.first()
-        if first_item and first_item.category:
-            return first_item.category.classification
+        category = _first_item_category(obj)
+        if category:
+            return category[0]
         return "General"
 
     def get_sub_category(self, obj):
         # MODIFIED: Return specific Category Name (e.g. Server Hosting)
-        first_item = obj.items.first()
-        if first_item and first_item.category:
-            return first_item.category.name
+        category = _first_item_category(obj)
+        if category:
+            return category[1]
         return "N/A"
 
     def get_last_reviewed_at(self, obj):
@@ -130,6 +153,11 @@ class BudgetProposalDetailSerializer(serializers.ModelSerializer):
         return None
 
     def get_latest_review_comment(self, obj):
+        if hasattr(obj, 'latest_review_comment_id'):
+            comment = next(
+                (c for c in obj.comments.all() if c.pk == obj.latest_review_comment_id), None
+            ) if obj.latest_review_comment_id else None
+            return ProposalCommentSerializer(comment, context=self.context).data if comment else None
         review_history = obj.history.filter(
             action__in=['APPROVED', 'REJECTED']).order_by('-action_at').first()
         if not review_history:
@@ -163,10 +191,14 @@ class ProposalHistorySerializer(serializers.ModelSerializer):
         fields = ['id', 'proposal_pk', 'proposal_id', 'proposal', 'category', 'subcategory', 'department',
                   'last_modified', 'last_modified_by', 'status']
 
+    def _first_item(self, obj):
+        # items.first() would bypass the view's prefetch and query per row
+        return min(obj.proposal.items.all(), key=lambda item: item.pk, default=None)
+
     def get_category(self, obj):
         """Get the Main Classification (CapEx/OpEx)"""
         try:
-            first_item = obj.proposal.items.first()
+            first_item = self._first_item(obj)
             if first_item and first_item.category:
                 return first_item.category.classification
             # Fallback to old AccountType logic if category is missing (migration safety)
@@ -179,7 +211,7 @@ class ProposalHistorySerializer(serializers.ModelSerializer):
     def get_subcategory(self, obj):
         """Get the Specific Category Name (e.g., Server Hosting)"""
         try:
-            first_item = obj.proposal.items.first()
+            first_item = self._first_item(obj)
             if first_item and first_item.category:
                 return first_item.category.name
             # Fallback
@@ -209,7 +241,12 @@ class AccountSetupSerializer(serializers.ModelSerializer):
     def get_fiscal_year(self):
         return self.context.get('fiscal_year')
 
+    # The list view annotates the fiscal year values
+    # (rollups.annotate_account_accomplishment); other callers query per row.
+
     def get_accomplished(self, obj):
+        if hasattr(obj, 'fiscal_year_accomplished'):
+            return obj.fiscal_year_accomplished
         fiscal_year = self.get_fiscal_year()
         if not fiscal_year:
             return False
@@ -219,6 +256,8 @@ class AccountSetupSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_accomplishment_date(self, obj):
+        if hasattr(obj, 'fiscal_year_accomplishment_date'):
+            return obj.fiscal_year_accomplishment_date
         fiscal_year = self.get_fiscal_year()
         if not fiscal_year:
             return None
@@ -234,8 +273,10 @@ class LedgerViewSerializer(serializers.ModelSerializer):
         source='journal_entry.entry_id', read_only=True)
     date = serializers.DateField(source='journal_entry.date', read_only=True)
 
-    category = serializers.SerializerMethodField()
-    sub_category = serializers.SerializerMethodField()
+    # Main classification (CapEx or OpEx) and specific category name (e.g.
+    # 'Hardware', 'Travel'), resolved when the entry is posted (see core/ledger.py)
+    category = serializers.CharField(source='classification', read_only=True)
+    sub_category = serializers.CharField(read_only=True)
 
     account = serializers.CharField(source='account.name', read_only=True)
     department = serializers.CharField(
@@ -248,47 +289,6 @@ class LedgerViewSerializer(serializers.ModelSerializer):
         fields = ['reference_id', 'date', 'department', 'category', 'sub_category',
                   'description', 'account', 'amount']
 
-    def get_category(self, obj):
-        """
-        Returns the main classification: CapEx or OpEx
-        """
-        # 1. Check this line's expense_category
-        if obj.expense_category:
-            return obj.expense_category.classification  # 'CAPEX' or 'OPEX'
-
-        # 2. Check sibling lines (e.g., if this is the Credit side, find the Debit side)
-        sibling_lines = obj.journal_entry.lines.all()
-        for line in sibling_lines:
-            if line.expense_category:
-                return line.expense_category.classification
-
-        # 3. Fallback: Use Journal Entry category as a hint
-        je_cat = obj.journal_entry.category
-        if je_cat == 'EXPENSES':
-            return 'OPEX'  # Expenses are typically OpEx
-        if je_cat == 'ASSETS':
-            return 'CAPEX'  # Assets are typically CapEx
-
-        # 4. Default for unknown
-        return 'N/A'
-
-    def get_sub_category(self, obj):
-        """
-        Returns the specific category name (e.g., 'Hardware', 'Travel', 'Utilities')
-        """
-        # 1. Check this line's expense_category
-        if obj.expense_category:
-            return obj.expense_category.name
-
-        # 2. Check sibling lines
-        sibling_lines = obj.journal_entry.lines.all()
-        for line in sibling_lines:
-            if line.expense_category:
-                return line.expense_category.name
-
-        # 3. Default
-        return "General"
-
 # MODIFICATION START: Updated to split Debit/Credit accounts for the Table
 
 
@@ -314,17 +314,21 @@ class JournalEntryListSerializer(serializers.ModelSerializer):
                   'debit_account', 'credit_account', 'description',
                   'amount', 'created_by_username']
 
+    def _first_line(self, obj, predicate):
+        # Scan the prefetched lines instead of filtering (a query per entry)
+        return next((line for line in obj.lines.all() if predicate(line)), None)
+
     def get_debit_account(self, obj):
         """
         Find the account name associated with the DEBIT line.
         If an expense category is linked, append it for clarity.
         """
-        debit_line = obj.lines.filter(transaction_type='DEBIT').first()
+        debit_line = self._first_line(obj, lambda line: line.transaction_type == 'DEBIT')
         if debit_line:
             account_name = debit_line.account.name
             # If there's a specific sub-category (expense_category), show that instead of generic GL account
-            if debit_line.expense_category:
-                return debit_line.expense_category.name
+            if debit_line.expense_category_id:
+                return debit_line.sub_category
             return account_name
         return "N/A"
 
@@ -332,19 +336,19 @@ class JournalEntryListSerializer(serializers.ModelSerializer):
         """
         Find the account name associated with the CREDIT line.
         """
-        credit_line = obj.lines.filter(transaction_type='CREDIT').first()
+        credit_line = self._first_line(obj, lambda line: line.transaction_type == 'CREDIT')
         if credit_line:
             account_name = credit_line.account.name
-            if credit_line.expense_category:
-                 return credit_line.expense_category.name
+            if credit_line.expense_category_id:
+                 return credit_line.sub_category
             return account_name
         return "N/A"
 
     def get_category(self, obj):
         # 1. Try to get classification from lines (CapEx/OpEx)
-        line = obj.lines.filter(expense_category__isnull=False).first()
-        if line and line.expense_category:
-            classification = line.expense_category.classification
+        line = self._first_line(obj, lambda line: line.expense_category_id is not None)
+        if line:
+            classification = line.classification
             if classification == 'CAPEX':
                 return 'CapEx'
             if classification == 'OPEX':
@@ -552,19 +556,17 @@ class BudgetProposalMessageSerializer(serializers.ModelSerializer):
         # 3. Calculate Currently Available Funds
         # (Sum of Allocations) - (Sum of Approved Expenses)
         # Note: This checks the Department's TOTAL budget availability.
-
-        total_allocation = BudgetAllocation.objects.filter(
+        # Spend comes from the allocations' running balances (core/balances.py),
+        # so this is one aggregate over the department's allocations.
+        totals = BudgetAllocation.objects.filter(
             department=department,
-            fiscal_year=fiscal_year,
-            is_active=True
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-        # Calculate total spent (Expenses)
-        total_spent = Expense.objects.filter(
-            department=department,
-            budget_allocation__fiscal_year=fiscal_year,
-            status='APPROVED'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+            fiscal_year=fiscal_year
+        ).aggregate(
+            total_allocation=Sum('amount', filter=Q(is_active=True)),
+            total_spent=Sum('spent_amount')
+        )
+        total_allocation = totals['total_allocation'] or Decimal('0.00')
+        total_spent = totals['total_spent'] or Decimal('0.00')
 
         available_funds = total_allocation - total_spent
 
@@ -672,6 +674,14 @@ class ProposalReviewBudgetOverviewSerializer(serializers.Serializer):
         max_digits=15, decimal_places=2)
 
 
+def check_source_funds(source_alloc, amount):
+    available_funds = available_amount(source_alloc)
+    if amount > available_funds:
+        raise serializers.ValidationError(
+            f"Insufficient funds in source account. Available: {available_funds:,.2f}, Requested: {amount:,.2f}"
+        )
+
+
 # MODIFICATION START: Update BudgetAdjustmentSerializer to handle UI inputs (names)
 class BudgetAdjustmentSerializer(serializers.Serializer):
     date = serializers.DateField()
@@ -719,18 +729,9 @@ class BudgetAdjustmentSerializer(serializers.Serializer):
             ).first()
 
             # 4. Validate that source has enough funds
+            # (BudgetAdjustmentView repeats this with the allocation row locked)
             if source_alloc:
-                total_expenses = Expense.objects.filter(
-                    budget_allocation=source_alloc,
-                    status='APPROVED'
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-                available_funds = source_alloc.amount - total_expenses
-
-                if data['amount'] > available_funds:
-                    raise serializers.ValidationError(
-                        f"Insufficient funds in source account. Available: {available_funds:,.2f}, Requested: {data['amount']:,.2f}"
-                    )
+                check_source_funds(source_alloc, data['amount'])
 
             # Store resolved objects
             data['department'] = department
@@ -745,6 +746,35 @@ class BudgetAdjustmentSerializer(serializers.Serializer):
         return data
 
 
+class BudgetTransferLegSerializer(serializers.Serializer):
+    source_allocation_id = serializers.IntegerField()
+    destination_allocation_id = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2, validators=[
+                                      MinValueValidator(Decimal('0.01'))])
+
+    def validate(self, data):
+        if data['source_allocation_id'] == data['destination_allocation_id']:
+            raise serializers.ValidationError(
+                "Source and destination allocations must differ.")
+        return data
+
+
+class BudgetTransferBatchSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    reason = serializers.CharField()
+    legs = BudgetTransferLegSerializer(
+        many=True, allow_empty=False, max_length=TRANSFER_LEGS_MAX)
+
+
+class BudgetTransferSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BudgetTransfer
+        fields = [
+            'id', 'fiscal_year', 'source_allocation', 'destination_allocation', 'amount',
+            'reason', 'status', 'transferred_by_username', 'transferred_at'
+        ]
+
+
 class ExpenseCategoryVarianceSerializer(serializers.Serializer):
     category = serializers.CharField()
     code = serializers.CharField()
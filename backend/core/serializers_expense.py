@@ -1,7 +1,7 @@
-from decimal import Decimal
 from core.models import Account, BudgetAllocation, Department, Expense, ExpenseAttachment, ExpenseCategory, FiscalYear, Project
 from rest_framework import serializers
-from django.db.models import Sum
+from core.balances import available_amount, lock_allocation
+from core.expense_review import BULK_REVIEW_MAX
 from django.utils import timezone
 from django.db import transaction
 
@@ -124,6 +124,27 @@ class ExpenseReviewSerializer(serializers.Serializer):
 # MODIFICATION END
 
 
+class ExpenseBulkReviewSerializer(ExpenseReviewSerializer):
+    """
+    Input for approving or rejecting several submitted expenses at once.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=BULK_REVIEW_MAX,
+        help_text=f"IDs of the expenses to review (max {BULK_REVIEW_MAX}).")
+
+
+class ExpenseBulkReviewResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.CharField(required=False)
+    error = serializers.CharField(required=False)
+
+
+class ExpenseBulkReviewResponseSerializer(serializers.Serializer):
+    reviewed = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    results = ExpenseBulkReviewResultSerializer(many=True)
+
+
 class ExpenseDetailForModalSerializer(serializers.ModelSerializer):
     proposal_id = serializers.IntegerField(source='project.budget_proposal.id', read_only=True)
     vendor = serializers.CharField(read_only=True)  # ADD THIS LINE
@@ -224,20 +245,10 @@ class ExpenseCreateSerializer(serializers.ModelSerializer):
                 f'No active budget found for Project "{project.name}" and Category "{sub_category.name}".'
             )
 
-        # Calculate funds (Logic remains same, just scoped to project allocation now)
+        # Calculate funds (approved + pending) from the allocation's running balance;
+        # create() repeats the check with the row locked.
         allocation_to_charge = allocations.first()
-        total_budget = allocation_to_charge.amount
-        total_spent = Expense.objects.filter(
-            budget_allocation=allocation_to_charge,
-            status__in=['APPROVED', 'SUBMITTED']
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-        remaining_budget = total_budget - total_spent
-
-        if expense_amount > remaining_budget:
-            raise serializers.ValidationError(
-                {'amount': f'Insufficient funds. Remaining budget for this item is ₱{remaining_budget:,.2f}'}
-            )
+        self._check_funds(allocation_to_charge, expense_amount)
 
         data['department_obj'] = department
         data['category_obj'] = sub_category
@@ -247,6 +258,13 @@ class ExpenseCreateSerializer(serializers.ModelSerializer):
 
         return data
 
+    def _check_funds(self, allocation, expense_amount):
+        remaining_budget = available_amount(allocation, include_committed=True)
+        if expense_amount > remaining_budget:
+            raise serializers.ValidationError(
+                {'amount': f'Insufficient funds. Remaining budget for this item is ₱{remaining_budget:,.2f}'}
+            )
+
     def create(self, validated_data):
         # Extract objects
         department = validated_data.pop('department_obj')
@@ -263,6 +281,9 @@ class ExpenseCreateSerializer(serializers.ModelSerializer):
         request_user = self.context['request'].user
 
         with transaction.atomic():
+            # Concurrent submissions against the same allocation queue up here
+            self._check_funds(lock_allocation(allocation.id), validated_data['amount'])
+
             expense = Expense.objects.create(
                 project=project,
                 budget_allocation=allocation,
@@ -0,0 +1,25 @@
+from rest_framework import serializers
+from django.urls import reverse
+
+from core.models import ExportJob
+
+
+class ExportJobRequestSerializer(serializers.Serializer):
+    export_type = serializers.ChoiceField(choices=ExportJob.EXPORT_TYPE_CHOICES)
+    parameters = serializers.DictField(required=False, default=dict)
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'export_type', 'parameters', 'status', 'filename', 'row_count',
+            'error', 'created_at', 'started_at', 'finished_at', 'download_url'
+        ]
+
+    def get_download_url(self, obj):
+        if obj.status != 'COMPLETED':
+            return None
+        return reverse('export-job-download', args=[obj.id])
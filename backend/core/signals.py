@@ -1,6 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
-from core.models import Expense, TransactionAudit, JournalEntry, JournalEntryLine, Account
+from core.models import (
+    Expense, Account, AccountType, BudgetAllocation, BudgetProposal, Department, ExpenseCategory,
+    FiscalYear, Forecast, JournalEntry, JournalEntryLine, Project
+)
+from core import balances, fiscal_years, ledger, posting, report_cache, search, snapshots
+from core.audits import expense_audit
 
 
 @receiver(post_save, sender=Expense)
@@ -8,64 +13,20 @@ def expense_audit_log(sender, instance: Expense, created: bool, **kwargs): # Add
     """Create audit entry when an Expense is created or updated."""
     
     action = 'CREATED' if created else 'UPDATED'
-    
-    # Determine the relevant user for this audit event based on the Expense instance
-    audit_user_id = None
-    audit_user_username = None
-
-    # Logic to determine which user context is most relevant for the audit:
-    # - If the expense was just approved, the approver is key.
-    # If it was just created/submitted, the submitter is key.
-    # For other updates, it might be the submitter or a system action.
-
-    if instance.status == 'APPROVED' and instance.approved_by_user_id:
-        # If the action leading to this save was an approval, use the approver's details.
-        # This assumes that when an expense is approved, approved_by_user_id/username are set.
-        audit_user_id = instance.approved_by_user_id
-        audit_user_username = instance.approved_by_username
-    elif instance.submitted_by_user_id:
-        # For creation or general updates where an approver isn't yet involved or isn't the primary actor.
-        audit_user_id = instance.submitted_by_user_id
-        audit_user_username = instance.submitted_by_username
-    else:
-        # Fallback: If no user context can be clearly determined from the Expense instance.
-        # This might happen if an expense is updated by a system process without a user context.
-        # Log this with a special system user ID or skip the audit.
-        print(f"Warning: Could not determine user context for auditing Expense ID {instance.id}. Action: {action}.")
-        # To avoid creating an audit entry without a user, return here:
-        # return
-        # Or, assign a system/placeholder if that's the rule:
-        # audit_user_id = 0 # Example placeholder for system
-        # audit_user_username = "System"
-        if not (audit_user_id or audit_user_username): # If still no user, skip
-             print(f"Skipping audit for Expense ID {instance.id} due to missing user context for action: {action}.")
-             return
 
+    # The approver is the relevant user once an expense is approved, the submitter
+    # otherwise (see core/audits.py).
+    audit = expense_audit(instance, action)
+    if audit is None:
+        # No user context (e.g. an update by a system process): skip the audit.
+        print(f"Warning: Could not determine user context for auditing Expense ID {instance.id}. Action: {action}.")
+        print(f"Skipping audit for Expense ID {instance.id} due to missing user context for action: {action}.")
+        return
 
     # Create transaction audit record
-    TransactionAudit.objects.create(
-        transaction_type='EXPENSE',
-        transaction_id_ref=instance.id,  # Correct: Uses the PK of the Expense instance
-        user_id=audit_user_id,
-        user_username=audit_user_username,
-        action=action,
-        details={
-            'amount': str(instance.amount),
-            'description': instance.description,
-            'status': instance.status,
-            'department_id': instance.department_id, # Assumes department is a local FK
-            'budget_allocation_id': instance.budget_allocation_id, # Assumes budget_allocation is local FK
-            'project_id': instance.project_id if instance.project else None,
-            'vendor': instance.vendor,
-        }
-    )
-    # print(f"Audit log created for Expense ID {instance.id}, Action: {action}, User: {audit_user_username or audit_user_id}")
-    
-    
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from django.db import transaction
-from core.models import Expense, TransactionAudit, JournalEntry, JournalEntryLine, Account
+    audit.save()
+    # print(f"Audit log created for Expense ID {instance.id}, Action: {action}, User: {audit.user_username or audit.user_id}")
+
 
 @receiver(post_save, sender=Expense)
 def create_journal_entry_for_expense(sender, instance: Expense, created: bool, **kwargs):
@@ -73,61 +34,166 @@ def create_journal_entry_for_expense(sender, instance: Expense, created: bool, *
     Automatically create a Journal Entry when an Expense is APPROVED.
     This ensures the Ledger View is populated.
     """
-    # Only create JE if status is APPROVED and it hasn't been posted yet
+    # Only create JE if status is APPROVED and it hasn't been posted yet.
+    # post_expense skips expenses that already have an entry (indexed source link).
     if instance.status == 'APPROVED' and not instance.posting_date:
-        
-        # Prevent duplicate JEs for the same expense (idempotency check)
-        if JournalEntry.objects.filter(description__contains=instance.transaction_id).exists():
-            return
-
-        with transaction.atomic():
-            # 1. Create the Parent Journal Entry
-            je = JournalEntry.objects.create(
-                date=instance.date,
-                category='EXPENSES', 
-                description=f"Expense Recorded: {instance.description} (Ref: {instance.transaction_id})",
-                total_amount=instance.amount,
-                status='POSTED',
-                department=instance.department, # Populate the new Department field
-                created_by_user_id=instance.submitted_by_user_id,
-                created_by_username=instance.submitted_by_username
-            )
-
-            # 2. Create Debit Line (The Expense)
-            JournalEntryLine.objects.create(
-                journal_entry=je,
-                account=instance.account,
-                expense_category=instance.category, # Populate the new Category field
-                description=instance.description,
-                transaction_type='DEBIT',
-                journal_transaction_type='OPERATIONAL_EXPENDITURE',
-                amount=instance.amount
-            )
-
-            # 3. Create Credit Line (Cash/Payable)
-            # Logic: If amount > 50,000, assume Accounts Payable (2010). Else Cash (1010).
-            credit_account_code = '2010' if instance.amount > 50000 else '1010'
-            credit_account = Account.objects.filter(code=credit_account_code).first()
-            
-            if not credit_account:
-                # Fallback: Find ANY Asset or Liability account to balance the ledger
-                credit_account = Account.objects.filter(account_type__name__in=['Asset', 'Liability']).first()
-            
-            if not credit_account:
-                 # Last resort: Do not create the JE to avoid error, log warning
-                 print("Error: Could not find credit account for Expense Journal Entry.")
-                 return 
-
-            JournalEntryLine.objects.create(
-                journal_entry=je,
-                account=credit_account,
-                expense_category=None, # Credit side usually doesn't have the expense category
-                description=f"Payment for {instance.transaction_id}",
-                transaction_type='CREDIT',
-                journal_transaction_type='OPERATIONAL_EXPENDITURE',
-                amount=instance.amount
-            )
-
-            # Update expense to mark it as posted
-            Expense.objects.filter(pk=instance.pk).update(posting_date=instance.date)
-            # print(f"Journal Entry created for Expense {instance.transaction_id}")
\ No newline at end of file
+        posting.post_expense(instance)
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+@receiver(post_save, sender=AccountType)
+@receiver(post_delete, sender=AccountType)
+def invalidate_posting_accounts(sender, **kwargs):
+    """The cached 1010/2010 credit accounts depend on account codes and types."""
+    posting.invalidate_credit_accounts()
+
+
+# Ledger search matches account names and codes (see core/search.py)
+
+@receiver(pre_save, sender=Account)
+def account_search_remember(sender, instance: Account, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._search_previous = Account.objects.filter(pk=instance.pk).values_list('name', 'code').first()
+
+
+@receiver(post_save, sender=Account)
+def account_search_reindex(sender, instance: Account, raw=False, **kwargs):
+    previous = getattr(instance, '_search_previous', None)
+    instance._search_previous = None
+    if raw or previous is None or previous == (instance.name, instance.code):
+        return
+    search.index_ledger_lines(JournalEntryLine.objects.filter(account=instance))
+
+
+# --- BudgetActualSnapshot and allocation balance maintenance ---
+# pre_save remembers the stored row so post_save can apply the difference.
+
+@receiver(pre_save, sender=Expense)
+def expense_snapshot_remember(sender, instance: Expense, raw=False, **kwargs):
+    if raw:
+        return
+    instance._snapshot_previous = snapshots.stored_expense_state(instance.pk)
+
+
+@receiver(post_save, sender=Expense)
+def expense_snapshot_update(sender, instance: Expense, raw=False, **kwargs):
+    if raw:
+        return
+    change = (getattr(instance, '_snapshot_previous', None), snapshots.expense_state(instance))
+    # Allocation row before snapshot cells, the lock order of every writer
+    balances.expenses_changed([change])
+    snapshots.expense_changed(*change)
+    report_cache.expenses_changed([change])
+    instance._snapshot_previous = None
+
+
+@receiver(post_delete, sender=Expense)
+def expense_snapshot_delete(sender, instance: Expense, **kwargs):
+    change = (snapshots.expense_state(instance), None)
+    # Allocation row before snapshot cells, the lock order of every writer
+    balances.expenses_changed([change])
+    snapshots.expense_changed(*change)
+    report_cache.expenses_changed([change])
+
+
+@receiver(pre_save, sender=BudgetAllocation)
+def allocation_snapshot_remember(sender, instance: BudgetAllocation, raw=False, **kwargs):
+    if raw:
+        return
+    instance._snapshot_previous = snapshots.stored_allocation_state(instance.pk)
+
+
+@receiver(post_save, sender=BudgetAllocation)
+def allocation_snapshot_update(sender, instance: BudgetAllocation, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_snapshot_previous', None)
+    current = snapshots.allocation_state(instance)
+    snapshots.allocation_changed(instance.pk, previous, current)
+    report_cache.fiscal_years_changed(state['fiscal_year_id'] for state in (previous, current) if state)
+    instance._snapshot_previous = None
+
+
+@receiver(post_delete, sender=BudgetAllocation)
+def allocation_snapshot_delete(sender, instance: BudgetAllocation, **kwargs):
+    snapshots.allocation_changed(instance.pk, snapshots.allocation_state(instance), None)
+    report_cache.fiscal_years_changed([instance.fiscal_year_id])
+
+
+# --- Ledger classification columns (see core/ledger.py) ---
+
+@receiver(post_save, sender=JournalEntry)
+def journal_entry_classify(sender, instance: JournalEntry, created: bool, raw=False, **kwargs):
+    # A new entry has no lines yet; they classify it as they are saved
+    if raw or created:
+        return
+    ledger.classify_journal_entries([instance.pk])
+
+
+@receiver(post_save, sender=JournalEntryLine)
+@receiver(post_delete, sender=JournalEntryLine)
+def journal_entry_line_classify(sender, instance: JournalEntryLine, raw=False, **kwargs):
+    if raw:
+        return
+    ledger.classify_journal_entries([instance.journal_entry_id])
+
+
+@receiver(post_save, sender=ExpenseCategory)
+def expense_category_classify(sender, instance: ExpenseCategory, created: bool, raw=False, **kwargs):
+    if raw or created:
+        return
+    ledger.classify_category_entries([instance.pk])
+
+
+@receiver(pre_delete, sender=ExpenseCategory)
+def expense_category_remember_entries(sender, instance: ExpenseCategory, **kwargs):
+    # The lines lose their category on delete (SET_NULL); remember their entries first
+    instance._ledger_entry_ids = list(JournalEntryLine.objects.filter(
+        expense_category=instance).values_list('journal_entry_id', flat=True).distinct())
+
+
+@receiver(post_delete, sender=ExpenseCategory)
+def expense_category_delete_classify(sender, instance: ExpenseCategory, **kwargs):
+    ledger.classify_journal_entries(getattr(instance, '_ledger_entry_ids', []))
+
+
+# --- Report cache invalidation (see core/report_cache.py) ---
+
+@receiver(post_save, sender=JournalEntry)
+@receiver(post_delete, sender=JournalEntry)
+def journal_entry_report_invalidate(sender, instance: JournalEntry, raw=False, **kwargs):
+    if raw:
+        return
+    report_cache.journal_entries_changed([instance.date])
+
+
+@receiver(post_save, sender=BudgetProposal)
+@receiver(post_delete, sender=BudgetProposal)
+@receiver(post_save, sender=Forecast)
+@receiver(post_delete, sender=Forecast)
+def fiscal_year_report_invalidate(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    report_cache.fiscal_years_changed([instance.fiscal_year_id])
+
+
+@receiver(post_save, sender=FiscalYear)
+@receiver(post_delete, sender=FiscalYear)
+def invalidate_active_fiscal_year(sender, **kwargs):
+    fiscal_years.invalidate_active_fiscal_year()
+
+
+@receiver(post_save, sender=FiscalYear)
+@receiver(post_delete, sender=FiscalYear)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=ExpenseCategory)
+@receiver(post_delete, sender=ExpenseCategory)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def reference_report_invalidate(sender, raw=False, **kwargs):
+    if raw:
+        return
+    report_cache.reference_data_changed()
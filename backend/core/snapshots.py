@@ -0,0 +1,275 @@
+"""
+Maintenance of the BudgetActualSnapshot fact table.
+
+The table holds one budget row (month=NULL) and one row per month of approved
+spend for every (fiscal_year, department, category, project) of an active budget
+allocation. The signals in core/signals.py feed every Expense and BudgetAllocation
+change through expense_changed()/allocation_changed(), which turn the change into
++/- deltas and apply them with F() updates, so a save touches O(1) cells.
+
+Code paths that bypass model signals (queryset.update(), bulk_create(), ...) must
+call apply_deltas() or rebuild_snapshots() themselves.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import BudgetActualSnapshot, BudgetAllocation, Expense
+
+
+ZERO = Decimal('0.00')
+
+ALLOCATION_DIMENSIONS = ('fiscal_year_id', 'department_id', 'category_id', 'project_id')
+EXPENSE_STATE_FIELDS = ('status', 'amount', 'date', 'budget_allocation_id')
+ALLOCATION_STATE_FIELDS = ALLOCATION_DIMENSIONS + ('amount', 'is_active')
+
+_date_field = models.DateField()
+
+
+def _as_date(value):
+    # Instances created with date strings keep the raw string until reloaded
+    return _date_field.to_python(value)
+
+
+def _as_decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def month_start(value):
+    return _as_date(value).replace(day=1)
+
+
+def new_deltas():
+    """Accumulator of {(fy, dept, category, project, month): [budget_delta, actual_delta]}."""
+    return defaultdict(lambda: [ZERO, ZERO])
+
+
+def _cell_order(item):
+    *dimensions, month = item[0]
+    return (*dimensions, month is not None, month or date.min)
+
+
+def apply_deltas(deltas):
+    """
+    Applies accumulated deltas to the snapshot table with one F() update per cell.
+    Cells are only created for positive deltas; a negative delta always targets
+    a cell that already holds the amount (or was removed by a cascade).
+
+    Cells are touched in key order (the budget cell before the month cells), so
+    two transactions updating overlapping cells lock them in the same order and
+    queue up instead of deadlocking. Callers that also write budget allocations
+    (transfers, expense reviews, the Expense signals) update the allocation rows
+    first, so every writer takes allocation rows before snapshot cells.
+    """
+    for key, (budget_delta, actual_delta) in sorted(deltas.items(), key=_cell_order):
+        if not budget_delta and not actual_delta:
+            continue
+        fiscal_year_id, department_id, category_id, project_id, month = key
+        cell_filter = {
+            'fiscal_year_id': fiscal_year_id,
+            'department_id': department_id,
+            'category_id': category_id,
+            'project_id': project_id,
+            'month': month,
+        }
+        with transaction.atomic():
+            if budget_delta > 0 or actual_delta > 0:
+                BudgetActualSnapshot.objects.get_or_create(**cell_filter)
+            BudgetActualSnapshot.objects.filter(**cell_filter).update(
+                budget_amount=F('budget_amount') + budget_delta,
+                actual_amount=F('actual_amount') + actual_delta
+            )
+
+
+def _allocation_key(allocation):
+    return tuple(allocation[field] for field in ALLOCATION_DIMENSIONS)
+
+
+# --- Expense changes ---
+
+def expense_state(instance):
+    """The fields of an Expense that affect the snapshot."""
+    if instance is None:
+        return None
+    return {field: getattr(instance, field) for field in EXPENSE_STATE_FIELDS}
+
+
+def stored_expense_state(pk):
+    if pk is None:
+        return None
+    return Expense.objects.filter(pk=pk).values(*EXPENSE_STATE_FIELDS).first()
+
+
+def _expense_contribution(state):
+    """(allocation_id, month, amount) counted by the snapshot, or None."""
+    if not state or state['status'] != 'APPROVED':
+        return None
+    return (
+        state['budget_allocation_id'],
+        month_start(state['date']),
+        _as_decimal(state['amount'])
+    )
+
+
+def add_expense_deltas(deltas, contributions):
+    """
+    Adds (allocation_id, month, signed_amount) contributions to deltas, resolving
+    the allocation dimensions in one query. Inactive allocations are skipped.
+    """
+    allocation_ids = {allocation_id for allocation_id, _, _ in contributions}
+    if not allocation_ids:
+        return deltas
+    allocations = {
+        row['id']: row
+        for row in BudgetAllocation.objects.filter(
+            id__in=allocation_ids, is_active=True
+        ).values('id', *ALLOCATION_DIMENSIONS)
+    }
+    for allocation_id, month, amount in contributions:
+        allocation = allocations.get(allocation_id)
+        if allocation is None:
+            continue
+        deltas[_allocation_key(allocation) + (month,)][1] += amount
+    return deltas
+
+
+def expense_changed(previous, current):
+    """Moves an expense's approved amount from its previous cell to its current one."""
+    expenses_changed([(previous, current)])
+
+
+def expenses_changed(changes):
+    """
+    Batch form of expense_changed() for paths that bypass the signals: takes
+    (previous_state, current_state) pairs and applies their net deltas.
+    """
+    contributions = []
+    for previous, current in changes:
+        before = _expense_contribution(previous)
+        after = _expense_contribution(current)
+        if before == after:
+            continue
+        if before:
+            contributions.append((before[0], before[1], -before[2]))
+        if after:
+            contributions.append(after)
+    if contributions:
+        apply_deltas(add_expense_deltas(new_deltas(), contributions))
+
+
+# --- BudgetAllocation changes ---
+
+def allocation_state(instance):
+    if instance is None:
+        return None
+    state = {field: getattr(instance, field) for field in ALLOCATION_STATE_FIELDS}
+    if hasattr(state['amount'], 'resolve_expression'):
+        # Saved with an F() expression: read back the stored value
+        state['amount'] = BudgetAllocation.objects.filter(
+            pk=instance.pk).values_list('amount', flat=True).first()
+    return state
+
+
+def stored_allocation_state(pk):
+    if pk is None:
+        return None
+    return BudgetAllocation.objects.filter(pk=pk).values(*ALLOCATION_STATE_FIELDS).first()
+
+
+def allocation_amounts_changed(changes):
+    """
+    Batch form of allocation_changed() for paths that only move allocation amounts
+    and bypass the signals: takes (allocation, signed_amount) pairs and applies
+    their budget deltas together. Inactive allocations have no budget cell.
+    """
+    deltas = new_deltas()
+    for allocation, amount in changes:
+        if allocation.is_active:
+            key = tuple(getattr(allocation, field) for field in ALLOCATION_DIMENSIONS)
+            deltas[key + (None,)][0] += _as_decimal(amount)
+    apply_deltas(deltas)
+
+
+def allocation_changed(allocation_id, previous, current):
+    """
+    Moves an allocation's budget between cells. When its dimensions or active flag
+    change, the approved spend already booked against it moves along with it.
+    """
+    deltas = new_deltas()
+    old_key = _allocation_key(previous) if previous else None
+    new_key = _allocation_key(current) if current else None
+    old_active = bool(previous and previous['is_active'])
+    new_active = bool(current and current['is_active'])
+
+    if old_active:
+        deltas[old_key + (None,)][0] -= _as_decimal(previous['amount'])
+    if new_active:
+        deltas[new_key + (None,)][0] += _as_decimal(current['amount'])
+
+    if previous and (old_key != new_key or old_active != new_active):
+        monthly_spent = Expense.objects.filter(
+            budget_allocation_id=allocation_id, status='APPROVED'
+        ).annotate(bucket=TruncMonth('date')).values('bucket').annotate(
+            total=Sum('amount')
+        ).order_by()
+        for row in monthly_spent:
+            if old_active:
+                deltas[old_key + (row['bucket'],)][1] -= row['total']
+            if new_active:
+                deltas[new_key + (row['bucket'],)][1] += row['total']
+
+    apply_deltas(deltas)
+
+
+# --- Full rebuild ---
+
+def rebuild_snapshots(fiscal_year=None):
+    """
+    Recomputes the snapshot table (or one fiscal year's slice of it) from the
+    source tables with two grouped queries and a bulk insert.
+    Returns the number of cells written.
+    """
+    allocations = BudgetAllocation.objects.filter(is_active=True)
+    expenses = Expense.objects.filter(status='APPROVED', budget_allocation__is_active=True)
+    snapshots = BudgetActualSnapshot.objects.all()
+    if fiscal_year is not None:
+        allocations = allocations.filter(fiscal_year=fiscal_year)
+        expenses = expenses.filter(budget_allocation__fiscal_year=fiscal_year)
+        snapshots = snapshots.filter(fiscal_year=fiscal_year)
+
+    cells = new_deltas()
+
+    budget_rows = allocations.values(*ALLOCATION_DIMENSIONS).annotate(
+        total=Sum('amount')
+    ).order_by()
+    for row in budget_rows:
+        cells[_allocation_key(row) + (None,)][0] += row['total']
+
+    expense_dimensions = tuple(f"budget_allocation__{field}" for field in ALLOCATION_DIMENSIONS)
+    actual_rows = expenses.annotate(bucket=TruncMonth('date')).values(
+        *expense_dimensions, 'bucket'
+    ).annotate(total=Sum('amount')).order_by()
+    for row in actual_rows:
+        key = tuple(row[field] for field in expense_dimensions)
+        cells[key + (row['bucket'],)][1] += row['total']
+
+    with transaction.atomic():
+        snapshots.delete()
+        BudgetActualSnapshot.objects.bulk_create([
+            BudgetActualSnapshot(
+                fiscal_year_id=key[0],
+                department_id=key[1],
+                category_id=key[2],
+                project_id=key[3],
+                month=key[4],
+                budget_amount=budget,
+                actual_amount=actual
+            )
+            for key, (budget, actual) in cells.items()
+        ], batch_size=1000)
+
+    return len(cells)
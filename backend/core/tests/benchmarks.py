@@ -0,0 +1,29 @@
+"""
+Opt-in benchmarks shared by the test modules.
+
+Benchmark test cases seed large datasets, so they are skipped unless the suite
+runs with BMS_RUN_BENCHMARKS=1. They report their timings through the
+'core.benchmarks' logger, which writes to stderr when benchmarks are enabled.
+"""
+import logging
+import os
+import sys
+import unittest
+
+
+RUN_BENCHMARKS = os.environ.get('BMS_RUN_BENCHMARKS') == '1'
+
+logger = logging.getLogger('core.benchmarks')
+
+if RUN_BENCHMARKS and not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('\n%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def benchmark(test_case):
+    """Class decorator that skips a benchmark test case unless BMS_RUN_BENCHMARKS=1."""
+    return unittest.skipUnless(
+        RUN_BENCHMARKS, "Set BMS_RUN_BENCHMARKS=1 to run benchmarks.")(test_case)
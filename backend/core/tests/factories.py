@@ -0,0 +1,178 @@
+"""
+Small object builders shared by the test modules.
+
+They fill in every NOT NULL column with sensible defaults so tests only spell out
+the fields they actually care about.
+"""
+from datetime import date
+from decimal import Decimal
+from itertools import count
+
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..authentication import CustomUser
+from ..models import (
+    Account, AccountType, BudgetAllocation, BudgetProposal, Department,
+    Expense, ExpenseCategory, FiscalYear, JournalEntry, JournalEntryLine, Project
+)
+
+
+_seq = count(1)
+
+
+def _next():
+    return next(_seq)
+
+
+def make_current_fiscal_year(**kwargs):
+    """Active fiscal year covering today's calendar year."""
+    today = timezone.now().date()
+    defaults = {
+        'name': f"FY{today.year}",
+        'start_date': date(today.year, 1, 1),
+        'end_date': date(today.year, 12, 31),
+        'is_active': True,
+    }
+    defaults.update(kwargs)
+    return FiscalYear.objects.create(**defaults)
+
+
+def make_department(**kwargs):
+    n = _next()
+    defaults = {'name': f"Department {n}", 'code': f"DEPT-{n}"}
+    defaults.update(kwargs)
+    return Department.objects.create(**defaults)
+
+
+def make_account(**kwargs):
+    n = _next()
+    if 'account_type' not in kwargs:
+        kwargs['account_type'] = AccountType.objects.get_or_create(name="Expense")[0]
+    defaults = {
+        'code': f"5{n:04d}",
+        'name': f"Account {n}",
+        'created_by_user_id': 1,
+    }
+    defaults.update(kwargs)
+    return Account.objects.create(**defaults)
+
+
+def make_category(**kwargs):
+    n = _next()
+    defaults = {'name': f"Category {n}", 'code': f"CAT-{n}", 'level': 1}
+    defaults.update(kwargs)
+    return ExpenseCategory.objects.create(**defaults)
+
+
+def make_project(department, fiscal_year, **kwargs):
+    n = _next()
+    proposal = BudgetProposal.objects.create(
+        title=f"Proposal {n}",
+        project_summary="Summary",
+        project_description="Description",
+        department=department,
+        fiscal_year=fiscal_year,
+        external_system_id=f"TEST-{n}",
+        status='APPROVED',
+        performance_start_date=fiscal_year.start_date,
+        performance_end_date=fiscal_year.end_date,
+    )
+    defaults = {
+        'name': f"Project {n}",
+        'description': "Test project",
+        'start_date': fiscal_year.start_date,
+        'end_date': fiscal_year.end_date,
+        'department': department,
+        'budget_proposal': proposal,
+    }
+    defaults.update(kwargs)
+    return Project.objects.create(**defaults)
+
+
+def make_allocation(department, fiscal_year, amount=Decimal('100000.00'), **kwargs):
+    if 'project' not in kwargs:
+        kwargs['project'] = make_project(department, fiscal_year)
+    if 'account' not in kwargs:
+        kwargs['account'] = make_account()
+    if 'category' not in kwargs:
+        kwargs['category'] = make_category()
+    return BudgetAllocation.objects.create(
+        fiscal_year=fiscal_year,
+        department=department,
+        amount=amount,
+        **kwargs
+    )
+
+
+def make_expense(allocation, amount=Decimal('1000.00'), status='APPROVED', **kwargs):
+    defaults = {
+        'budget_allocation': allocation,
+        'project': allocation.project,
+        'department': allocation.department,
+        'account': allocation.account,
+        'category': allocation.category,
+        'amount': amount,
+        'status': status,
+        'date': timezone.now().date(),
+        'vendor': "Test Vendor",
+        'description': "Test Expense",
+        'submitted_by_user_id': 1,
+        'submitted_by_username': "user1",
+    }
+    defaults.update(kwargs)
+    return Expense.objects.create(**defaults)
+
+
+def user_payload(role='FINANCE_HEAD', department=None, user_id=1):
+    """Claims of an auth service JWT."""
+    return {
+        'user_id': user_id,
+        'email': f"user{user_id}@example.com",
+        'username': f"user{user_id}",
+        'first_name': "Test",
+        'last_name': "User",
+        'roles': {'bms': role},
+        'department_id': department.id if department else None,
+        'department_name': department.name if department else None,
+    }
+
+
+def make_user(role='FINANCE_HEAD', department=None, user_id=1):
+    """CustomUser built from a JWT-shaped payload, as the auth layer would."""
+    return CustomUser(user_payload(role, department, user_id))
+
+
+def make_access_token(role='FINANCE_HEAD', department=None, user_id=1):
+    """Signed access token carrying user_payload(), for the Authorization header."""
+    token = AccessToken()
+    for claim, value in user_payload(role, department, user_id).items():
+        token[claim] = value
+    return str(token)
+
+
+def make_journal_entry(department=None, amount=Decimal('100.00'), category='EXPENSES', **kwargs):
+    """Balanced posted entry with one DEBIT line (carrying the expense category) and one CREDIT line."""
+    debit_account = kwargs.pop('debit_account', None) or make_account()
+    credit_account = kwargs.pop('credit_account', None) or make_account()
+    expense_category = kwargs.pop('expense_category', None) or make_category()
+    defaults = {
+        'date': timezone.now().date(),
+        'category': category,
+        'description': "Test journal entry",
+        'total_amount': amount,
+        'status': 'POSTED',
+        'department': department,
+        'created_by_user_id': 1,
+    }
+    defaults.update(kwargs)
+    entry = JournalEntry.objects.create(**defaults)
+    JournalEntryLine.objects.create(
+        journal_entry=entry, account=debit_account, expense_category=expense_category,
+        description="Debit line", transaction_type='DEBIT',
+        journal_transaction_type='OPERATIONAL_EXPENDITURE', amount=amount)
+    JournalEntryLine.objects.create(
+        journal_entry=entry, account=credit_account,
+        description="Credit line", transaction_type='CREDIT',
+        journal_transaction_type='OPERATIONAL_EXPENDITURE', amount=amount)
+    return entry
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from ..models import Account, BudgetAllocation, FiscalYear
+from ..rollups import annotate_account_accomplishment
+from ..serializers_budget import AccountSetupSerializer
+from .factories import make_account, make_allocation, make_current_fiscal_year, make_department, make_user
+
+
+class AccountSetupTestCase(APITestCase):
+    def setUp(self):
+        self.fiscal_year = make_current_fiscal_year()
+        past_year = self.fiscal_year.start_date.year - 1
+        self.past = FiscalYear.objects.create(
+            name=f"FY{past_year}", start_date=date(past_year, 1, 1), end_date=date(past_year, 12, 31))
+        self.department = make_department()
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+
+    def test_annotations_match_per_row_queries(self):
+        allocated, inactive, past_only, unallocated = [make_account() for _ in range(4)]
+        first = make_allocation(self.department, self.fiscal_year, account=allocated)
+        make_allocation(self.department, self.fiscal_year, account=allocated)
+        BudgetAllocation.objects.filter(pk=first.pk).update(created_at=first.created_at - timedelta(days=3))
+        make_allocation(self.department, self.fiscal_year, account=inactive, is_active=False)
+        make_allocation(self.department, self.past, account=past_only)
+
+        accounts = Account.objects.filter(
+            pk__in=[allocated.pk, inactive.pk, past_only.pk, unallocated.pk]).order_by('code')
+        context = {'fiscal_year': self.fiscal_year}
+        annotated = AccountSetupSerializer(
+            annotate_account_accomplishment(accounts, self.fiscal_year), many=True, context=context).data
+
+        self.assertEqual(annotated, AccountSetupSerializer(accounts, many=True, context=context).data)
+        by_code = {row['code']: row for row in annotated}
+        self.assertTrue(by_code[allocated.code]['accomplished'])
+        self.assertEqual(by_code[allocated.code]['accomplishment_date'],
+                         AccountSetupSerializer(allocated, context=context).data['accomplishment_date'])
+        self.assertEqual([by_code[a.code]['accomplished'] for a in (inactive, past_only, unallocated)],
+                         [False, False, False])
+
+    def test_page_costs_a_fixed_number_of_queries(self):
+        url = reverse('account-setup-list')
+        params = {'fiscal_year_id': self.fiscal_year.id}
+        make_allocation(self.department, self.fiscal_year)
+        self.client.get(url, params)
+        with self.assertNumQueries(3):
+            small = self.client.get(url, params)
+        for _ in range(5):
+            make_allocation(self.department, self.fiscal_year)
+        with self.assertNumQueries(3):
+            large = self.client.get(url, params)
+        self.assertEqual(large.data['count'], small.data['count'] + 5)
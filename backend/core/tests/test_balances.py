@@ -0,0 +1,152 @@
+import io
+import threading
+from decimal import Decimal
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..balances import expected_balances, reconcile_balances
+from ..expense_review import bulk_review_expenses
+from ..models import BudgetAllocation, Expense
+from .factories import (
+    make_allocation, make_current_fiscal_year, make_department, make_expense, make_user
+)
+
+
+def balances_of(allocation):
+    return tuple(BudgetAllocation.objects.filter(pk=allocation.pk).values_list(
+        'spent_amount', 'committed_amount').get())
+
+
+class AllocationBalanceTestCase(APITestCase):
+    def setUp(self):
+        self.fiscal_year = make_current_fiscal_year()
+        self.allocation = make_allocation(
+            make_department(), self.fiscal_year, amount=Decimal('1000.00'), is_locked=False)
+
+    def assertMatchesExpenses(self):
+        self.assertEqual(reconcile_balances(), [])
+
+    def test_expense_lifecycle_is_applied_incrementally(self):
+        expense = make_expense(self.allocation, amount=Decimal('300.00'), status='SUBMITTED')
+        self.assertEqual(balances_of(self.allocation), (Decimal('0.00'), Decimal('300.00')))
+
+        expense.status = 'APPROVED'
+        expense.save()
+        self.assertEqual(balances_of(self.allocation), (Decimal('300.00'), Decimal('0.00')))
+
+        other = make_allocation(self.allocation.department, self.fiscal_year)
+        expense.amount = Decimal('250.00')
+        expense.budget_allocation = other
+        expense.save()
+        self.assertEqual(balances_of(self.allocation), (Decimal('0.00'), Decimal('0.00')))
+        self.assertEqual(balances_of(other), (Decimal('250.00'), Decimal('0.00')))
+        self.assertMatchesExpenses()
+
+        expense.delete()
+        self.assertEqual(balances_of(other), (Decimal('0.00'), Decimal('0.00')))
+
+    def test_stale_allocation_save_keeps_the_balances(self):
+        stale = BudgetAllocation.objects.get(pk=self.allocation.pk)
+        make_expense(self.allocation, amount=Decimal('400.00'))
+
+        stale.is_locked = True
+        stale.save()
+
+        self.assertEqual(balances_of(self.allocation), (Decimal('400.00'), Decimal('0.00')))
+
+    def test_review_refuses_overspend_from_running_balance(self):
+        make_expense(self.allocation, amount=Decimal('900.00'))
+        expense = make_expense(self.allocation, amount=Decimal('200.00'), status='SUBMITTED')
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+
+        response = self.client.post(
+            reverse('expense-review', args=[expense.id]), {'status': 'APPROVED'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("remaining budget of 100.00", response.data['error'])
+        self.assertEqual(Expense.objects.get(id=expense.id).status, 'SUBMITTED')
+
+    def test_bulk_review_moves_committed_to_spent(self):
+        expenses = [make_expense(self.allocation, amount=Decimal('100.00'), status='SUBMITTED')
+                    for _ in range(3)]
+
+        bulk_review_expenses(
+            Expense.objects.all(), [e.id for e in expenses], 'APPROVED', make_user('FINANCE_HEAD'))
+
+        self.assertEqual(balances_of(self.allocation), (Decimal('300.00'), Decimal('0.00')))
+        self.assertMatchesExpenses()
+
+    def test_reconcile_command_reports_and_fixes_drift(self):
+        make_expense(self.allocation, amount=Decimal('120.00'))
+        make_expense(self.allocation, amount=Decimal('80.00'), status='SUBMITTED')
+        BudgetAllocation.objects.filter(pk=self.allocation.pk).update(spent_amount=Decimal('5.00'))
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_allocation_balances', stdout=io.StringIO())
+
+        out = io.StringIO()
+        call_command('reconcile_allocation_balances', '--fix', stdout=out)
+        self.assertIn(f"Allocation {self.allocation.pk}: spent 5.00 (expected 120.00)", out.getvalue())
+        self.assertEqual(balances_of(self.allocation), (Decimal('120.00'), Decimal('80.00')))
+        self.assertEqual(expected_balances()[self.allocation.pk], balances_of(self.allocation))
+
+
+    def test_expense_writes_update_the_allocation_before_snapshot_cells(self):
+        expense = make_expense(self.allocation, amount=Decimal('50.00'), status='SUBMITTED')
+
+        def write_order(action):
+            with CaptureQueriesContext(connection) as ctx:
+                action()
+            tables = []
+            for query in ctx.captured_queries:
+                for table in ('core_budgetallocation', 'core_budgetactualsnapshot'):
+                    if query['sql'].startswith(f'UPDATE "{table}"') and table not in tables:
+                        tables.append(table)
+            return tables
+
+        expense.status = 'APPROVED'
+        # Transfers and bulk reviews lock allocations before cells; signals must too
+        self.assertEqual(write_order(expense.save),
+                         ['core_budgetallocation', 'core_budgetactualsnapshot'])
+        self.assertEqual(write_order(expense.delete),
+                         ['core_budgetallocation', 'core_budgetactualsnapshot'])
+
+# SQLite's shared-cache test database fails concurrent writers with "table is
+# locked" instead of waiting, so this runs against PostgreSQL only.
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentApprovalTestCase(TransactionTestCase):
+    WORKERS = 8
+
+    def test_parallel_approvals_never_overdraw(self):
+        allocation = make_allocation(
+            make_department(), make_current_fiscal_year(), amount=Decimal('500.00'))
+        expenses = [make_expense(allocation, amount=Decimal('100.00'), status='SUBMITTED')
+                    for _ in range(self.WORKERS)]
+        reviewer = make_user('FINANCE_HEAD')
+        errors = []
+        barrier = threading.Barrier(self.WORKERS)
+
+        def worker(expense_id):
+            try:
+                barrier.wait()
+                bulk_review_expenses(Expense.objects.all(), [expense_id], 'APPROVED', reviewer)
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(e.id,)) for e in expenses]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Expense.objects.filter(status='APPROVED').count(), 5)
+        self.assertEqual(balances_of(allocation), (Decimal('500.00'), Decimal('300.00')))
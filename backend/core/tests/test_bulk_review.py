@@ -0,0 +1,119 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgreSQLDatabaseWrapper
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..expense_review import locked_expenses
+from ..models import AccountType, Expense, JournalEntry, TransactionAudit
+from ..snapshots import rebuild_snapshots
+from ..views_expense import ExpenseViewSet
+from .factories import (
+    make_account, make_allocation, make_current_fiscal_year, make_department,
+    make_expense, make_user
+)
+from .test_snapshots import snapshot_state
+
+
+class ExpenseBulkReviewTestCase(APITestCase):
+    def setUp(self):
+        make_account(code='1010', name="Cash",
+                     account_type=AccountType.objects.get_or_create(name="Asset")[0])
+        self.fiscal_year = make_current_fiscal_year()
+        self.allocation = make_allocation(
+            make_department(), self.fiscal_year, amount=Decimal('1000.00'))
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD', user_id=7))
+
+    def _submitted(self, count, amount=Decimal('100.00'), allocation=None):
+        return [make_expense(allocation or self.allocation, amount=amount, status='SUBMITTED')
+                for _ in range(count)]
+
+    def _review(self, ids, decision='APPROVED', **extra):
+        return self.client.post(
+            reverse('expense-bulk-review'), {'ids': ids, 'status': decision, **extra}, format='json')
+
+    def test_bulk_approval_updates_audits_snapshots_and_postings(self):
+        expenses = self._submitted(3)
+        audits_before = TransactionAudit.objects.count()
+
+        response = self._review([e.id for e in expenses], notes="Month end")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reviewed'], 3)
+        self.assertEqual([r['status'] for r in response.data['results']], ['APPROVED'] * 3)
+        for expense in Expense.objects.filter(id__in=[e.id for e in expenses]):
+            self.assertEqual(expense.status, 'APPROVED')
+            self.assertEqual(expense.approved_by_user_id, 7)
+            self.assertIsNotNone(expense.posting_date)
+            self.assertTrue(expense.notes.startswith("Review Note (user7"))
+        self.assertEqual(TransactionAudit.objects.count(), audits_before + 3)
+        self.assertEqual(JournalEntry.objects.filter(source_type='EXPENSE').count(), 3)
+
+        incremental = snapshot_state()
+        rebuild_snapshots()
+        self.assertEqual(incremental, snapshot_state())
+
+    def test_remaining_balance_is_checked_across_the_batch(self):
+        make_expense(self.allocation, amount=Decimal('700.00'))
+        expenses = self._submitted(4)
+
+        response = self._review([e.id for e in expenses])
+
+        results = response.data['results']
+        self.assertEqual([r.get('status') for r in results], ['APPROVED', 'APPROVED', 'APPROVED', None])
+        self.assertIn("exceed the remaining budget of 0.00", results[3]['error'])
+        self.assertEqual(Expense.objects.get(id=expenses[3].id).status, 'SUBMITTED')
+
+    def test_per_item_errors_for_missing_and_already_reviewed(self):
+        submitted, approved = self._submitted(2)
+        approved.status = 'APPROVED'
+        approved.save()
+
+        response = self._review([submitted.id, approved.id, 999999], decision='REJECTED')
+
+        self.assertEqual(response.data['reviewed'], 1)
+        self.assertEqual(response.data['failed'], 2)
+        results = response.data['results']
+        self.assertEqual(results[0], {'id': submitted.id, 'status': 'REJECTED'})
+        self.assertIn("already in 'APPROVED'", results[1]['error'])
+        self.assertEqual(results[2], {'id': 999999, 'error': "Expense not found."})
+        self.assertFalse(JournalEntry.objects.filter(source_id=submitted.id).exists())
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def queries_to_approve(count):
+            allocation = make_allocation(
+                make_department(), self.fiscal_year, amount=Decimal('100000.00'))
+            ids = [e.id for e in self._submitted(count, allocation=allocation)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self._review(ids).data['reviewed'], count)
+            return len([q for q in ctx.captured_queries if not q['sql'].startswith('INSERT')])
+
+        queries_to_approve(1)  # warms the credit account cache
+        self.assertEqual(queries_to_approve(2), queries_to_approve(40))
+
+    def test_requires_finance_head(self):
+        expense, = self._submitted(1)
+        self.client.force_authenticate(user=make_user('GENERAL_USER', department=self.allocation.department))
+
+        response = self._review([expense.id])
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_lock_skips_the_nullable_side_of_outer_joins(self):
+        view = ExpenseViewSet()
+        view.request = SimpleNamespace(user=make_user('FINANCE_HEAD'))
+        queryset = locked_expenses(view.get_queryset(), [1, 2])
+
+        # Compile for PostgreSQL (no server needed), where FOR UPDATE is emitted
+        postgresql = PostgreSQLDatabaseWrapper(
+            {**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'}, alias='postgresql')
+        with mock.patch.object(postgresql, 'get_autocommit', return_value=False):
+            sql, _ = queryset.query.get_compiler(connection=postgresql).as_sql()
+
+        self.assertIn('LEFT OUTER JOIN', sql)
+        self.assertTrue(sql.endswith('FOR UPDATE OF "core_expense"'))
@@ -0,0 +1,218 @@
+"""
+Query-count and latency budgets for every GET endpoint in core/urls.py.
+
+Each endpoint is called with a signed JWT for every BMS role on a small seeded
+dataset, the dataset is grown, and the endpoint is called again. The test fails
+when
+- the query count changes with the dataset size (an N+1 loop), unless the
+  endpoint is listed under "grows" in endpoint_budgets.json with a reason;
+- the query count or wall time exceeds the endpoint's budget in
+  endpoint_budgets.json;
+- a GET endpoint has no budget (new endpoints must commit one).
+
+Budgets are recorded with BMS_RECORD_ENDPOINT_BUDGETS=1, which rewrites the
+file from the measured values (keeping "grows"). Set BMS_LATENCY_BUDGET_FACTOR
+to scale the time budgets on slow machines.
+"""
+import json
+import os
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from rest_framework.test import APITestCase
+
+from .. import urls as core_urls
+from ..report_cache import report_cache
+from ..models import (
+    BudgetProposalItem, Expense, ExportJob, ProposalComment, ProposalHistory, Project
+)
+from .factories import (
+    make_account, make_allocation, make_category, make_current_fiscal_year, make_department,
+    make_access_token, make_expense, make_journal_entry, make_project
+)
+
+
+BUDGETS_FILE = Path(__file__).with_name('endpoint_budgets.json')
+RECORD_BUDGETS = os.environ.get('BMS_RECORD_ENDPOINT_BUDGETS') == '1'
+LATENCY_FACTOR = float(os.environ.get('BMS_LATENCY_BUDGET_FACTOR', '1'))
+
+ROLES = ('ADMIN', 'FINANCE_HEAD', 'GENERAL_USER')
+USER_IDS = {'ADMIN': 101, 'FINANCE_HEAD': 102, 'GENERAL_USER': 103}
+
+# Not called by end users with a BMS role
+SKIPPED = {
+    'api-root': "DRF router index",
+    'external-budget-proposals-list': "service-to-service (API key)",
+    'external-budget-proposals-detail': "service-to-service (API key)",
+    'external-expenses-list': "service-to-service (API key)",
+    'external-expenses-detail': "service-to-service (API key)",
+}
+
+# Recorded budgets leave room for slower machines
+QUERY_HEADROOM = 0
+LATENCY_HEADROOM = 4
+MIN_LATENCY_MS = 250
+
+
+def walk_patterns(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from walk_patterns(pattern.url_patterns)
+        else:
+            yield pattern
+
+
+def allows_get(pattern):
+    callback = pattern.callback
+    actions = getattr(callback, 'actions', None)
+    if actions is not None:
+        return 'get' in actions
+    view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+    return view_class is not None and hasattr(view_class, 'get')
+
+
+def get_endpoints():
+    """(url_name, kwarg_names) of every GET route in core/urls.py, format suffixes excluded."""
+    seen = set()
+    for pattern in walk_patterns(core_urls.urlpatterns):
+        kwargs = set(pattern.pattern.regex.groupindex)
+        if 'format' in kwargs or not pattern.name or pattern.name in seen:
+            continue
+        seen.add(pattern.name)
+        if allows_get(pattern):
+            yield pattern.name, kwargs
+
+
+def load_budgets():
+    if not BUDGETS_FILE.exists():
+        return {'grows': {}, 'endpoints': {}}
+    return json.loads(BUDGETS_FILE.read_text())
+
+
+class EndpointBudgetTestCase(APITestCase):
+    SMALL_SCALE = 2
+    LARGE_SCALE = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fiscal_year = make_current_fiscal_year()
+        cls.home = make_department()
+        cls.account = make_account()
+        cls.category = make_category()
+        cls.units = 0
+        cls.seed(cls.SMALL_SCALE)
+
+    @classmethod
+    def seed(cls, units):
+        """Adds `units` slices of data, half of each in the general user's department."""
+        for _ in range(units):
+            cls.units += 1
+            for department in (cls.home, make_department()):
+                project = make_project(department, cls.fiscal_year)
+                proposal = project.budget_proposal
+                BudgetProposalItem.objects.create(
+                    proposal=proposal, category=cls.category, cost_element="Item",
+                    description="Seeded item", estimated_cost=Decimal('500.00'), account=cls.account)
+                ProposalHistory.objects.create(
+                    proposal=proposal, action='SUBMITTED', action_by_name="Seeder", new_status='SUBMITTED')
+                ProposalComment.objects.create(
+                    proposal=proposal, comment="Seeded", user_id=1, user_username="seeder")
+                allocation = make_allocation(
+                    department, cls.fiscal_year, project=project, account=cls.account,
+                    category=cls.category, is_locked=False)
+                make_expense(allocation, amount=Decimal('100.00'))
+                make_expense(allocation, amount=Decimal('50.00'), status='SUBMITTED')
+                make_journal_entry(department, date=date.today(), expense_category=cls.category)
+
+    def _kwargs(self, url_name, role):
+        """URL kwargs of detail routes, pointing at rows the general user may see."""
+        if url_name in ('export-job-detail', 'export-job-download'):
+            return {'job_id': self._export_job(role).pk}
+        project = Project.objects.filter(department=self.home).order_by('id').first()
+        expense = Expense.objects.filter(department=self.home).order_by('id').first()
+        return {
+            'project-detail': {'pk': project.pk},
+            'budget-proposals-detail': {'pk': project.budget_proposal_id},
+            'budget-proposal-export': {'proposal_id': project.budget_proposal_id},
+            'proposal-review-overview': {'proposal_id': project.budget_proposal_id},
+            'expense-detail': {'pk': expense.pk},
+            'expense-history-detail': {'pk': expense.pk},
+            'expense-modal-detail': {'pk': expense.pk},
+            'department-detail': {'pk': self.home.pk},
+        }.get(url_name)
+
+    def _export_job(self, role):
+        job, _ = ExportJob.objects.get_or_create(
+            requested_by_user_id=USER_IDS[role], export_type='LEDGER_CSV',
+            defaults={'requested_by_username': f"user{USER_IDS[role]}", 'requested_by_role': role})
+        return job
+
+    def measure(self, url_name, kwargs, role):
+        token = make_access_token(
+            role, department=self.home if role == 'GENERAL_USER' else None, user_id=USER_IDS[role])
+        url = reverse(url_name, kwargs=kwargs)
+        # Measure the uncached path
+        cache.clear()
+        report_cache().clear()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = self.client.get(
+                url, {'fiscal_year_id': self.fiscal_year.id}, HTTP_AUTHORIZATION=f"Bearer {token}")
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        return response.status_code, len(ctx.captured_queries), elapsed_ms
+
+    def measure_all(self):
+        results = {}
+        for url_name, kwarg_names in sorted(get_endpoints()):
+            if url_name in SKIPPED:
+                continue
+            for role in ROLES:
+                kwargs = self._kwargs(url_name, role) if kwarg_names else None
+                if kwarg_names and kwargs is None:
+                    self.fail(f"No URL kwargs for '{url_name}'; add them to the endpoint budget harness.")
+                results[url_name, role] = self.measure(url_name, kwargs, role)
+        return results
+
+    def test_endpoints_stay_within_budget(self):
+        budgets = load_budgets()
+        small = self.measure_all()
+        self.seed(self.LARGE_SCALE - self.SMALL_SCALE)
+        large = self.measure_all()
+
+        if RECORD_BUDGETS:
+            self.record(budgets, large)
+            return
+
+        for (url_name, role), (status_code, queries, elapsed_ms) in large.items():
+            with self.subTest(endpoint=url_name, role=role):
+                self.assertLess(status_code, 500, f"{url_name} failed for {role}")
+                budget = budgets['endpoints'].get(url_name)
+                self.assertIsNotNone(
+                    budget, f"No budget for '{url_name}'; record one with BMS_RECORD_ENDPOINT_BUDGETS=1.")
+                small_queries = small[url_name, role][1]
+                if url_name not in budgets['grows']:
+                    self.assertEqual(
+                        queries, small_queries,
+                        f"{url_name} ({role}): {small_queries} queries with {self.SMALL_SCALE} units of "
+                        f"data, {queries} with {self.LARGE_SCALE}; query count must not grow with the data.")
+                self.assertLessEqual(queries, budget['queries'], f"{url_name} ({role}) query budget")
+                self.assertLessEqual(
+                    elapsed_ms, budget['ms'] * LATENCY_FACTOR, f"{url_name} ({role}) latency budget")
+
+    def record(self, budgets, measured):
+        endpoints = {}
+        for (url_name, _), (_, queries, elapsed_ms) in measured.items():
+            current = endpoints.setdefault(url_name, {'queries': 0, 'ms': 0})
+            current['queries'] = max(current['queries'], queries + QUERY_HEADROOM)
+            ms = max(MIN_LATENCY_MS, int(elapsed_ms * LATENCY_HEADROOM / 50 + 1) * 50)
+            current['ms'] = max(current['ms'], ms)
+        budgets['endpoints'] = dict(sorted(endpoints.items()))
+        BUDGETS_FILE.write_text(json.dumps(budgets, indent=2) + '\n')
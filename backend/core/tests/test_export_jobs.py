@@ -0,0 +1,129 @@
+import io
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+import openpyxl
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..export_jobs import claim_next_job, process_pending_jobs
+from ..models import ExportJob
+from .factories import (
+    make_allocation, make_category, make_current_fiscal_year, make_department,
+    make_expense, make_journal_entry, make_user
+)
+
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='bms-export-tests-')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ExportJobTestCase(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.department = make_department()
+        self.category = make_category(name="Hardware", level=1)
+        make_journal_entry(
+            self.department, amount=Decimal('1234.50'), expense_category=self.category,
+            date=date(2025, 3, 4))
+        make_journal_entry(make_department(), amount=Decimal('99.00'))
+
+    def _enqueue(self, user, export_type, parameters):
+        self.client.force_authenticate(user=user)
+        response = self.client.post(
+            reverse('export-jobs'), {'export_type': export_type, 'parameters': parameters},
+            format='json')
+        return response
+
+    def _download(self, job_id):
+        response = self.client.get(reverse('export-job-download', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content)
+
+    def test_ledger_job_matches_synchronous_export(self):
+        user = make_user('GENERAL_USER', department=self.department)
+        response = self._enqueue(user, 'LEDGER_CSV', {'category': 'Hardware'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['id']
+        self.assertEqual(response.data['status'], 'QUEUED')
+        self.assertIsNone(response.data['download_url'])
+
+        call_command('process_export_jobs', '--once', stdout=io.StringIO())
+
+        poll = self.client.get(reverse('export-job-detail', args=[job_id])).data
+        self.assertEqual(poll['status'], 'COMPLETED')
+        self.assertEqual(poll['row_count'], 1)
+        content = self._download(job_id)
+
+        synchronous = self.client.get(reverse('ledger-export'), {'category': 'Hardware'})
+        self.assertEqual(content, b''.join(synchronous.streaming_content))
+
+    def test_variance_job_matches_synchronous_export(self):
+        fiscal_year = make_current_fiscal_year()
+        allocation = make_allocation(
+            self.department, fiscal_year, amount=Decimal('1000.00'), category=self.category)
+        make_expense(allocation, amount=Decimal('200.00'))
+        user = make_user('FINANCE_HEAD')
+
+        job_id = self._enqueue(
+            user, 'BUDGET_VARIANCE_XLSX', {'fiscal_year_id': fiscal_year.id}).data['id']
+        self.assertEqual(process_pending_jobs(), 1)
+
+        def rows(content):
+            sheet = openpyxl.load_workbook(io.BytesIO(content)).active
+            return list(sheet.iter_rows(values_only=True))
+
+        synchronous = self.client.get(
+            reverse('budget-variance-export'), {'fiscal_year_id': fiscal_year.id})
+        expected = rows(b''.join(synchronous.streaming_content))
+        self.assertEqual(rows(self._download(job_id)), expected)
+        self.assertEqual(expected[3], ("Hardware", 1000, 200, 800))
+        self.assertEqual(ExportJob.objects.get(id=job_id).filename,
+                         f"budget_variance_report_{fiscal_year.name}.xlsx")
+
+    def test_invalid_parameters_are_rejected(self):
+        user = make_user('FINANCE_HEAD')
+        self.assertEqual(
+            self._enqueue(user, 'BUDGET_VARIANCE_XLSX', {}).status_code,
+            status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self._enqueue(user, 'BUDGET_VARIANCE_XLSX', {'fiscal_year_id': 999999}).status_code,
+            status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self._enqueue(user, 'PDF', {}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_jobs_are_private_and_download_waits_for_completion(self):
+        job_id = self._enqueue(make_user('FINANCE_HEAD', user_id=1), 'LEDGER_CSV', {}).data['id']
+
+        response = self.client.get(reverse('export-job-download', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD', user_id=2))
+        response = self.client.get(reverse('export-job-detail', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('export-jobs')).data, [])
+
+    def test_claiming_hands_each_job_out_once(self):
+        user = make_user('FINANCE_HEAD')
+        first = self._enqueue(user, 'LEDGER_CSV', {}).data['id']
+        second = self._enqueue(user, 'LEDGER_CSV', {}).data['id']
+
+        self.assertEqual(claim_next_job().id, first)
+        self.assertEqual(claim_next_job().id, second)
+        self.assertIsNone(claim_next_job())
+
+        # A job left RUNNING by a dead worker is picked up again once stale
+        ExportJob.objects.filter(id=first).update(
+            started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(claim_next_job().id, first)
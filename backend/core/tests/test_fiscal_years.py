@@ -0,0 +1,50 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+
+from ..fiscal_years import active_fiscal_year, invalidate_active_fiscal_year
+from .factories import make_current_fiscal_year
+
+
+@override_settings(ACTIVE_FISCAL_YEAR_CACHE_SECONDS=60)
+class ActiveFiscalYearTestCase(TestCase):
+    def setUp(self):
+        invalidate_active_fiscal_year()
+        self.addCleanup(invalidate_active_fiscal_year)
+        self.fiscal_year = make_current_fiscal_year()
+
+    def test_memoized_per_process(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(active_fiscal_year(), self.fiscal_year)
+            self.assertEqual(active_fiscal_year(), self.fiscal_year)
+
+    def test_saving_a_fiscal_year_invalidates(self):
+        active_fiscal_year()
+        self.fiscal_year.is_active = False
+        self.fiscal_year.save()
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(active_fiscal_year())
+
+    def test_date_rollover_and_timeout_refresh(self):
+        active_fiscal_year()
+        now = timezone.now()
+        for later in (now + timedelta(days=1), now + timedelta(seconds=61)):
+            invalidate_active_fiscal_year()
+            active_fiscal_year()
+            with mock.patch('core.fiscal_years.timezone.now', return_value=later):
+                with self.assertNumQueries(1):
+                    active_fiscal_year()
+
+    @override_settings(ACTIVE_FISCAL_YEAR_CACHE_SECONDS=0)
+    def test_memoized_per_request(self):
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(1):
+            self.assertEqual(active_fiscal_year(request), self.fiscal_year)
+            # The DRF request shares the memo of the HttpRequest it wraps
+            self.assertEqual(active_fiscal_year(Request(request)), self.fiscal_year)
+        with self.assertNumQueries(1):
+            active_fiscal_year(RequestFactory().get('/'))
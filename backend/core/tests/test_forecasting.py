@@ -0,0 +1,123 @@
+import io
+import time
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..fiscal_years import invalidate_active_fiscal_year
+from ..forecasting import forecast_fiscal_year, forecast_series, select_model
+from ..models import Expense, FiscalYear, Forecast
+from .benchmarks import benchmark, logger
+from .factories import make_allocation, make_department
+
+
+SEASONAL_PATTERN = np.array([10, 12, 15, 11, 9, 20, 25, 22, 14, 13, 30, 40], dtype=float) * 1000
+
+
+class ForecastModelTestCase(TestCase):
+    def test_repeating_seasons_select_seasonal_naive(self):
+        algorithm, forecast = forecast_series(np.tile(SEASONAL_PATTERN, 4), 12)
+        self.assertEqual(algorithm, 'SEASONAL_NAIVE')
+        np.testing.assert_allclose(forecast, SEASONAL_PATTERN)
+
+    def test_straight_line_selects_linear_trend(self):
+        algorithm, forecast = forecast_series(1000 + 50 * np.arange(36), 3)
+        self.assertEqual(algorithm, 'LINEAR_TREND')
+        np.testing.assert_allclose(forecast, [2800, 2850, 2900])
+
+    def test_trending_seasons_select_holt_winters(self):
+        history = np.tile(SEASONAL_PATTERN, 6) + 400 * np.arange(72)
+        self.assertEqual(select_model(history)[0], 'HOLT_WINTERS')
+
+    def test_short_and_empty_histories(self):
+        self.assertEqual(forecast_series([], 4)[0], 'EXPONENTIAL_SMOOTHING')
+        np.testing.assert_array_equal(forecast_series([], 4)[1], np.zeros(4))
+        algorithm, forecast = forecast_series([500.0, 700.0], 2)
+        self.assertEqual(algorithm, 'EXPONENTIAL_SMOOTHING')
+        self.assertTrue((forecast > 0).all())
+        # Forecast spend is never negative
+        self.assertTrue((forecast_series(5000 - 300 * np.arange(24), 12)[1] >= 0).all())
+
+
+class ForecastFiscalYearTestCase(TestCase):
+    def setUp(self):
+        invalidate_active_fiscal_year()
+        self.addCleanup(invalidate_active_fiscal_year)
+        self.fiscal_year = FiscalYear.objects.create(
+            name="FY2025", start_date=date(2025, 1, 1), end_date=date(2025, 12, 31))
+        past = FiscalYear.objects.create(
+            name="FY2023", start_date=date(2023, 1, 1), end_date=date(2023, 12, 31))
+        self.allocation = make_allocation(make_department(), past)
+        # Two years of history repeating the same seasons, then 2025 so far
+        for year in (2023, 2024):
+            self.spend(year, SEASONAL_PATTERN)
+        self.spend(2025, SEASONAL_PATTERN[:6] + 1000)
+
+    def spend(self, year, amounts):
+        Expense.objects.bulk_create([
+            Expense(
+                transaction_id=f"TXN-FC-{year}-{month}", budget_allocation=self.allocation,
+                project=self.allocation.project, department=self.allocation.department,
+                account=self.allocation.account, category=self.allocation.category,
+                amount=Decimal(f"{amount:.2f}"), date=date(year, month, 15), vendor="Vendor",
+                description="Seeded", status='APPROVED', submitted_by_user_id=1)
+            for month, amount in enumerate(amounts, start=1)
+        ])
+
+    def test_actuals_then_forecast_cumulative_points(self):
+        with CaptureQueriesContext(connection) as ctx:
+            forecast = forecast_fiscal_year(self.fiscal_year, date(2025, 7, 10))
+        sql = [q['sql'] for q in ctx.captured_queries]
+        # One grouped history query, one insert for all twelve points
+        self.assertEqual(len([q for q in sql if '"core_expense"' in q]), 1)
+        self.assertEqual(len([q for q in sql if q.startswith('INSERT INTO "core_forecastdatapoint"')]), 1)
+
+        points = list(forecast.data_points.order_by('month'))
+        self.assertEqual([p.month for p in points], list(range(1, 13)))
+        self.assertEqual(points[0].month_name, "January")
+        monthly = np.diff([0] + [float(p.forecasted_value) for p in points])
+        np.testing.assert_allclose(monthly[:6], SEASONAL_PATTERN[:6] + 1000)
+        self.assertIn(forecast.algorithm_used, dict(Forecast.ALGORITHM_CHOICES))
+        self.assertTrue((monthly[6:] > 0).all())
+
+    def test_regeneration_replaces_the_forecast(self):
+        forecast_fiscal_year(self.fiscal_year, date(2025, 7, 10))
+        forecast_fiscal_year(self.fiscal_year, date(2025, 8, 10))
+        self.assertEqual(Forecast.objects.filter(fiscal_year=self.fiscal_year).count(), 1)
+
+    def test_past_fiscal_year_is_all_actuals(self):
+        forecast = forecast_fiscal_year(
+            FiscalYear.objects.get(name="FY2023"), date(2025, 7, 10))
+        self.assertEqual(forecast.data_points.get(month=12).forecasted_value,
+                         Decimal(f"{SEASONAL_PATTERN.sum():.2f}"))
+
+    def test_command_forecasts_the_active_fiscal_year(self):
+        FiscalYear.objects.filter(pk=self.fiscal_year.pk).update(
+            start_date=date(date.today().year, 1, 1), end_date=date(date.today().year, 12, 31))
+        call_command('generate_forecasts', stdout=io.StringIO())
+        self.assertEqual(Forecast.objects.get().fiscal_year_id, self.fiscal_year.id)
+        self.assertEqual(Forecast.objects.get().data_points.count(), 12)
+
+
+@benchmark
+class ForecastingBenchmark(TestCase):
+    YEARS = 50
+
+    def test_model_selection_over_decades_of_history(self):
+        rng = np.random.default_rng(0)
+        history = (np.tile(SEASONAL_PATTERN, self.YEARS) + 200 * np.arange(12 * self.YEARS)
+                   + rng.normal(0, 2000, 12 * self.YEARS))
+
+        started = time.perf_counter()
+        algorithm, forecast = forecast_series(history, 12)
+        elapsed = time.perf_counter() - started
+
+        logger.info("Selected %s over %d years of monthly history in %.0f ms",
+                    algorithm, self.YEARS, elapsed * 1000)
+        self.assertEqual(len(forecast), 12)
+        self.assertLess(elapsed, 0.5)
@@ -0,0 +1,81 @@
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from ..models import JournalEntry, JournalEntryLine
+from .factories import (
+    make_account, make_allocation, make_category, make_current_fiscal_year, make_department,
+    make_expense, make_journal_entry, make_user
+)
+
+
+class LedgerClassificationTestCase(APITestCase):
+    def setUp(self):
+        self.department = make_department()
+        self.hardware = make_category(name="Hardware", classification='CAPEX')
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+
+    def classification(self, line):
+        line.refresh_from_db()
+        return line.classification, line.sub_category
+
+    def test_lines_take_their_category_or_their_entry_classification(self):
+        entry = make_journal_entry(self.department, expense_category=self.hardware)
+        debit = entry.lines.get(transaction_type='DEBIT')
+        credit = entry.lines.get(transaction_type='CREDIT')
+        self.assertEqual(self.classification(debit), ('CAPEX', "Hardware"))
+        # The credit side carries no category and takes the debit side's
+        self.assertEqual(self.classification(credit), ('CAPEX', "Hardware"))
+
+        for category, expected in (('EXPENSES', 'OPEX'), ('ASSETS', 'CAPEX'), ('PROJECTS', 'N/A')):
+            with self.subTest(category=category):
+                entry = make_journal_entry(self.department, category=category)
+                line = entry.lines.get(transaction_type='DEBIT')
+                line.expense_category = None
+                line.save()
+                self.assertEqual(self.classification(line), (expected, "General"))
+
+    def test_posted_expenses_and_category_changes_are_classified(self):
+        make_account(code='1010', name="Cash")
+        allocation = make_allocation(make_department(), make_current_fiscal_year(), category=self.hardware)
+        expense = make_expense(allocation)
+        credit = JournalEntryLine.objects.get(
+            journal_entry__source_id=expense.id, transaction_type='CREDIT')
+        self.assertEqual(self.classification(credit), ('CAPEX', "Hardware"))
+
+        self.hardware.name = "Computer Hardware"
+        self.hardware.classification = 'OPEX'
+        self.hardware.save()
+        self.assertEqual(self.classification(credit), ('OPEX', "Computer Hardware"))
+
+    def test_backfill_command(self):
+        entry = make_journal_entry(self.department, expense_category=self.hardware)
+        JournalEntry.objects.update(classification='N/A', sub_category="General")
+        JournalEntryLine.objects.update(classification='N/A', sub_category="General")
+
+        call_command('backfill_ledger_classification', stdout=io.StringIO())
+
+        entry.refresh_from_db()
+        self.assertEqual((entry.classification, entry.sub_category), ('CAPEX', "Hardware"))
+        self.assertEqual(
+            set(entry.lines.values_list('classification', 'sub_category')), {('CAPEX', "Hardware")})
+
+    def test_ledger_filters_and_reads_without_the_category_join(self):
+        make_journal_entry(self.department, expense_category=self.hardware)
+        make_journal_entry(self.department, expense_category=make_category(name="Travel", classification='OPEX'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('ledger-view'), {'category': 'capex'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(row['category'], row['sub_category']) for row in response.data['results']],
+                         [('CAPEX', "Hardware")])
+        self.assertFalse(any('"core_expensecategory"' in q['sql'] for q in ctx.captured_queries))
+
+        response = self.client.get(reverse('ledger-view'), {'search': 'trav'})
+        self.assertEqual([row['sub_category'] for row in response.data['results']], ["Travel"])
+        self.assertEqual(Decimal(response.data['results'][0]['amount']), Decimal('100.00'))
@@ -0,0 +1,99 @@
+import csv
+import io
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import JournalEntry, JournalEntryLine
+from .benchmarks import benchmark, logger
+from .factories import make_account, make_category, make_department, make_journal_entry, make_user
+
+
+class LedgerExportTestCase(APITestCase):
+    def setUp(self):
+        self.department = make_department()
+        self.category = make_category(name="Hardware")
+        self.entry = make_journal_entry(
+            self.department, amount=Decimal('1234.50'), expense_category=self.category,
+            date=date(2025, 3, 4))
+        # Entry from another department, hidden from general users
+        make_journal_entry(make_department(), amount=Decimal('99.00'))
+
+    def _export(self, user, **params):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('ledger-export'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_export_streams_csv_rows(self):
+        rows = self._export(make_user('FINANCE_HEAD'))
+
+        self.assertEqual(rows[0], ['Reference ID', 'Date', 'Category',
+                                   'Description', 'Account', 'Amount (PHP)'])
+        # Only lines carrying an expense category are part of the ledger
+        self.assertEqual(len(rows), 3)
+        self.assertIn(
+            [self.entry.entry_id, '2025-03-04', 'EXPENSES', 'Debit line',
+             self.entry.lines.get(transaction_type='DEBIT').account.name, '1,234.50'],
+            rows)
+
+    def test_export_applies_data_isolation(self):
+        rows = self._export(make_user('GENERAL_USER', department=self.department))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][0], self.entry.entry_id)
+
+
+@benchmark
+class LedgerExportBenchmark(APITestCase):
+    """Exports 1M synthetic ledger lines and checks that memory stays flat."""
+
+    LINES = 1_000_000
+    LINES_PER_ENTRY = 1000
+    MAX_PEAK_BYTES = 64 * 1024 * 1024
+
+    @classmethod
+    def setUpTestData(cls):
+        department = make_department()
+        account = make_account()
+        category = make_category()
+        entries = JournalEntry.objects.bulk_create([
+            JournalEntry(
+                entry_id=f"JE-BENCH-{n:06d}", category='EXPENSES', description="Benchmark",
+                date=date(2025, 1 + n % 12, 1), total_amount=Decimal('0'), status='POSTED',
+                department=department, created_by_user_id=1)
+            for n in range(cls.LINES // cls.LINES_PER_ENTRY)
+        ])
+        for entry in entries:
+            JournalEntryLine.objects.bulk_create([
+                JournalEntryLine(
+                    journal_entry=entry, account=account, expense_category=category,
+                    description=f"Synthetic line {n}", transaction_type='DEBIT',
+                    journal_transaction_type='OPERATIONAL_EXPENDITURE', amount=Decimal('10.00'))
+                for n in range(cls.LINES_PER_ENTRY)
+            ], batch_size=cls.LINES_PER_ENTRY)
+
+    def test_export_one_million_lines(self):
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = self.client.get(reverse('ledger-export'))
+        rows = 0
+        for chunk in response.streaming_content:
+            rows += chunk.count(b'\n')
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        logger.info("Ledger export: %d rows in %.1fs, peak %.1f MiB", rows - 1, elapsed, peak / 1024 / 1024)
+        self.assertEqual(rows, self.LINES + 1)
+        self.assertLess(peak, self.MAX_PEAK_BYTES)
@@ -0,0 +1,114 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Q
+from django.test import TestCase
+
+from ..ledger import classify_journal_entries, ledger_lines_queryset
+from ..models import JournalEntry, JournalEntryLine
+from ..search import date_range
+from .benchmarks import benchmark, logger
+from .factories import make_account, make_category, make_department, make_journal_entry
+
+
+def legacy_search_q(search):
+    """The ledger search before search_text: icontains across the joined tables."""
+    return (
+        Q(journal_entry__entry_id__icontains=search) |
+        Q(journal_entry__date__icontains=search) |
+        Q(journal_entry__description__icontains=search) |
+        Q(description__icontains=search) |
+        Q(expense_category__name__icontains=search) |
+        Q(account__name__icontains=search) |
+        Q(account__code__icontains=search)
+    )
+
+
+class DateRangeTestCase(TestCase):
+    def test_date_shaped_terms(self):
+        self.assertEqual(date_range("2025"), (date(2025, 1, 1), date(2025, 12, 31)))
+        self.assertEqual(date_range("2024-02"), (date(2024, 2, 1), date(2024, 2, 29)))
+        self.assertEqual(date_range(" 2025-03-04 "), (date(2025, 3, 4), date(2025, 3, 4)))
+        for term in ("2025-13", "2025-02-30", "Travel", "25-03", "20250304"):
+            with self.subTest(term=term):
+                self.assertIsNone(date_range(term))
+
+
+class LedgerSearchTestCase(TestCase):
+    def setUp(self):
+        self.account = make_account(code='5120', name="Office Supplies")
+        self.entry = make_journal_entry(
+            make_department(), date=date(2025, 3, 4), description="Quarterly restock",
+            debit_account=self.account, expense_category=make_category(name="Stationery"))
+        line = self.entry.lines.get(transaction_type='DEBIT')
+        line.description = "Toner cartridges"
+        line.save()
+        make_journal_entry(make_department(), date=date(2024, 7, 1), description="Other")
+
+    def search(self, term):
+        return set(ledger_lines_queryset({'search': term}).values_list('journal_entry_id', flat=True))
+
+    def test_matches_every_searched_field_case_insensitively(self):
+        for term in (self.entry.entry_id.lower(), "RESTOCK", "toner", "stationery",
+                     "office supplies", "5120"):
+            with self.subTest(term=term):
+                self.assertEqual(self.search(term), {self.entry.id})
+
+    def test_date_terms_match_the_covered_range(self):
+        self.assertEqual(self.search("2025-03-04"), {self.entry.id})
+        self.assertEqual(self.search("2025-3"), {self.entry.id})
+        self.assertEqual(self.search("2025"), {self.entry.id})
+        self.assertEqual(self.search("2025-04"), set())
+
+    def test_renaming_an_account_reindexes_its_lines(self):
+        self.account.name = "Printing Supplies"
+        self.account.save()
+
+        self.assertEqual(self.search("printing"), {self.entry.id})
+        self.assertEqual(self.search("office"), set())
+
+
+@benchmark
+class LedgerSearchBenchmark(TestCase):
+    """Times ledger searches over 200k seeded lines, before and after search_text."""
+
+    LINES = 200_000
+    LINES_PER_ENTRY = 100
+    TERMS = ("hardware", "JE-BENCH-0001", "2025-03", "no such text")
+
+    @classmethod
+    def setUpTestData(cls):
+        department = make_department()
+        accounts = [make_account() for _ in range(20)]
+        categories = [make_category(name=name) for name in ("Hardware", "Travel", "Utilities")]
+        entries = JournalEntry.objects.bulk_create([
+            JournalEntry(
+                entry_id=f"JE-BENCH-{n:05d}", category='EXPENSES', description=f"Benchmark entry {n}",
+                date=date(2025, 1 + n % 12, 1 + n % 28), total_amount=Decimal('0'), status='POSTED',
+                department=department, created_by_user_id=1)
+            for n in range(cls.LINES // cls.LINES_PER_ENTRY)
+        ])
+        JournalEntryLine.objects.bulk_create([
+            JournalEntryLine(
+                journal_entry=entry, account=accounts[n % len(accounts)],
+                expense_category=categories[n % len(categories)],
+                description=f"Synthetic line {n}", transaction_type='DEBIT',
+                journal_transaction_type='OPERATIONAL_EXPENDITURE', amount=Decimal('10.00'))
+            for entry in entries for n in range(cls.LINES_PER_ENTRY)
+        ], batch_size=5000)
+        classify_journal_entries()
+
+    def timed(self, queryset):
+        started = time.perf_counter()
+        count = queryset.count()
+        return count, time.perf_counter() - started
+
+    def test_search_before_and_after(self):
+        base = ledger_lines_queryset({})
+        for term in self.TERMS:
+            before, before_elapsed = self.timed(base.filter(legacy_search_q(term)))
+            after, after_elapsed = self.timed(ledger_lines_queryset({'search': term}))
+            logger.info("Ledger search %r: %d rows in %.0f ms before, %d rows in %.0f ms after",
+                        term, before, before_elapsed * 1000, after, after_elapsed * 1000)
+            self.assertEqual(after, before)
@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from ..models import Expense, JournalEntryLine
+from ..pagination import ExpensePagination
+from .factories import (
+    make_allocation, make_category, make_current_fiscal_year, make_department, make_expense,
+    make_journal_entry, make_user
+)
+
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+        self.department = make_department()
+        allocation = make_allocation(self.department, make_current_fiscal_year())
+        today = date.today()
+        # Three expenses per date, so the id tie-break decides the order within a date
+        for n in range(12):
+            make_expense(allocation, amount=Decimal('10.00'), status='SUBMITTED',
+                         date=today - timedelta(days=n // 3))
+        self.expected = list(Expense.objects.order_by('-date', 'id').values_list('id', flat=True))
+
+    def walk(self, url, params, key='id'):
+        """Follows the next links from the first page; returns every row and the responses."""
+        response = self.client.get(url, params)
+        pages = [response]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            pages.append(response)
+        return [row[key] for page in pages for row in page.data['results']], pages
+
+    def test_cursor_walk_returns_every_row_once_in_order(self):
+        ids, pages = self.walk(reverse('expense-list'), {'page_size': 5})
+
+        self.assertEqual(ids, self.expected)
+        self.assertEqual([len(page.data['results']) for page in pages], [5, 5, 2])
+        self.assertEqual({page.data['count'] for page in pages}, {12})
+        self.assertEqual(pages[0].data['page_size'], 5)
+        self.assertIsNone(pages[0].data['previous'])
+
+        previous = self.client.get(pages[2].data['previous'])
+        self.assertEqual([row['id'] for row in previous.data['results']], self.expected[5:10])
+        first = self.client.get(previous.data['previous'])
+        self.assertEqual([row['id'] for row in first.data['results']], self.expected[:5])
+        self.assertIsNone(first.data['previous'])
+
+    def test_deep_pages_use_no_offset(self):
+        _, pages = self.walk(reverse('expense-list'), {'page_size': 5})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(pages[1].data['next'])
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'OFFSET' in q['sql']])
+
+    def test_page_numbers_still_work(self):
+        response = self.client.get(reverse('expense-list'), {'page': 2, 'page_size': 5})
+
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected[5:10])
+        self.assertEqual(response.data['count'], 12)
+        self.assertIn('page=3', response.data['next'])
+
+    def test_count_can_be_skipped(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('expense-list'), {'count': 'none'})
+        self.assertIsNone(response.data['count'])
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('expense-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_values(self):
+        pagination = ExpensePagination()
+        for position in (["foo", 1], ["2025-01-01", "bar"], [None, 1], ["2025-01-01", 2 ** 70],
+                         [["2025-01-01"], 1]):
+            with self.subTest(position=position):
+                cursor = pagination.encode_cursor(position, reverse=False)
+                response = self.client.get(reverse('expense-list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_ledger_walk_breaks_ties_on_entry_and_line(self):
+        category = make_category()
+        for n in range(4):
+            make_journal_entry(self.department, date=date(2025, 3, 1 + n % 2), expense_category=category)
+        # Two ledger lines per entry
+        JournalEntryLine.objects.update(expense_category=category)
+        expected = list(JournalEntryLine.objects.order_by(
+            '-journal_entry__date', 'journal_entry__entry_id', 'id'
+        ).values_list('journal_entry__entry_id', flat=True))
+
+        entry_ids, _ = self.walk(reverse('ledger-view'), {'page_size': 3}, key='reference_id')
+
+        self.assertEqual(entry_ids, expected)
+        self.assertEqual(len(entry_ids), 8)
@@ -0,0 +1,176 @@
+import importlib
+import io
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import AccountType, Expense, JournalEntry, JournalEntryLine
+from ..posting import post_expense, post_expenses
+from ..sequences import assign_expense_transaction_ids
+from .benchmarks import benchmark, logger
+from .factories import (
+    make_account, make_allocation, make_current_fiscal_year, make_department,
+    make_expense, make_journal_entry
+)
+
+
+class ExpensePostingTestCase(TestCase):
+    def setUp(self):
+        asset = AccountType.objects.get_or_create(name="Asset")[0]
+        liability = AccountType.objects.get_or_create(name="Liability")[0]
+        self.cash = make_account(code='1010', name="Cash", account_type=asset)
+        self.payable = make_account(code='2010', name="Accounts Payable", account_type=liability)
+        self.allocation = make_allocation(make_department(), make_current_fiscal_year())
+
+    def test_approval_posts_one_balanced_linked_entry(self):
+        expense = make_expense(self.allocation, amount=Decimal('750.00'), status='SUBMITTED')
+        self.assertFalse(JournalEntry.objects.exists())
+
+        expense.status = 'APPROVED'
+        expense.save()
+        expense.save()
+
+        entry = JournalEntry.objects.get()
+        self.assertEqual((entry.source_type, entry.source_id), ('EXPENSE', expense.id))
+        lines = {line.transaction_type: line for line in entry.lines.all()}
+        self.assertEqual(lines['DEBIT'].account_id, expense.account_id)
+        self.assertEqual(lines['CREDIT'].account_id, self.cash.id)
+        self.assertEqual(lines['DEBIT'].amount, lines['CREDIT'].amount)
+        self.assertEqual(Expense.objects.get(id=expense.id).posting_date, expense.date)
+
+    def test_large_expenses_are_credited_to_payables(self):
+        expense = make_expense(self.allocation, amount=Decimal('60000.00'))
+
+        entry = JournalEntry.objects.get(source_type='EXPENSE', source_id=expense.id)
+        self.assertEqual(entry.lines.get(transaction_type='CREDIT').account_id, self.payable.id)
+
+    def test_posting_cost_does_not_depend_on_ledger_size(self):
+        def queries_to_post():
+            expense = make_expense(self.allocation, status='SUBMITTED')
+            with CaptureQueriesContext(connection) as ctx:
+                post_expense(expense)
+            return len(ctx.captured_queries)
+
+        queries_to_post()  # warms the credit account cache
+        baseline = queries_to_post()
+        for _ in range(20):
+            make_journal_entry(debit_account=self.cash, credit_account=self.payable)
+        self.assertEqual(queries_to_post(), baseline)
+
+        # Cache hit: no Account lookups while posting
+        expense = make_expense(self.allocation, status='SUBMITTED')
+        with CaptureQueriesContext(connection) as ctx:
+            post_expense(expense)
+        self.assertFalse(any('"core_account"' in q['sql'] for q in ctx.captured_queries))
+
+    def test_account_changes_invalidate_the_cached_credit_account(self):
+        make_expense(self.allocation, amount=Decimal('10.00'))
+        self.cash.code = '1010-OLD'
+        self.cash.save()
+        new_cash = make_account(code='1010', name="New Cash")
+
+        expense = make_expense(self.allocation, amount=Decimal('10.00'))
+
+        entry = JournalEntry.objects.get(source_id=expense.id)
+        self.assertEqual(entry.lines.get(transaction_type='CREDIT').account_id, new_cash.id)
+
+    def test_missing_credit_account_writes_nothing(self):
+        self.cash.delete()
+        self.payable.delete()
+
+        expense = make_expense(self.allocation)
+
+        self.assertFalse(JournalEntry.objects.exists())
+        self.assertIsNone(Expense.objects.get(id=expense.id).posting_date)
+
+    def test_backfill_links_existing_expense_entries(self):
+        expense = make_expense(self.allocation)
+        JournalEntry.objects.update(source_type=None, source_id=None)
+        make_journal_entry(description="Manual entry (Ref: unrelated)")
+
+        migration = importlib.import_module('core.migrations.0012_journalentry_source')
+        migration.link_expense_entries(apps, None)
+
+        self.assertEqual(
+            list(JournalEntry.objects.filter(source_type='EXPENSE').values_list('source_id', flat=True)),
+            [expense.id])
+
+
+def approved_expenses(allocation, count, amount=Decimal('25.00')):
+    """Approved expenses inserted with bulk_create, i.e. without the posting signal."""
+    return Expense.objects.bulk_create(assign_expense_transaction_ids([
+        Expense(
+            budget_allocation=allocation, project=allocation.project,
+            department=allocation.department, account=allocation.account,
+            category=allocation.category, amount=amount, date=date(2025, 5, 1),
+            vendor="Vendor", description=f"Imported {n}", status='APPROVED',
+            submitted_by_user_id=1, submitted_by_username="importer")
+        for n in range(count)
+    ]))
+
+
+class BatchPostingTestCase(TestCase):
+    def setUp(self):
+        make_account(code='1010', name="Cash",
+                     account_type=AccountType.objects.get_or_create(name="Asset")[0])
+        self.allocation = make_allocation(make_department(), make_current_fiscal_year())
+
+    def test_batch_query_count_does_not_grow_with_batch_size(self):
+        def queries_to_post(count):
+            expenses = approved_expenses(self.allocation, count)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(len(post_expenses(expenses)), count)
+            # bulk_create may split INSERTs to fit the backend's parameter limit
+            return len([q for q in ctx.captured_queries if not q['sql'].startswith('INSERT')])
+
+        queries_to_post(1)  # warms the credit account cache
+        self.assertEqual(queries_to_post(2), queries_to_post(200))
+
+        self.assertEqual(JournalEntryLine.objects.count(), 2 * 203)
+        entry_ids = sorted(JournalEntry.objects.values_list('entry_id', flat=True))
+        self.assertEqual(entry_ids, [f"JE-2025-{n:05d}" for n in range(1, 204)])
+
+    def test_batch_skips_posted_duplicate_and_unapproved_expenses(self):
+        expenses = approved_expenses(self.allocation, 3)
+        post_expenses(expenses[:1])
+        expenses[2].status = 'SUBMITTED'
+
+        entries = post_expenses(expenses + [expenses[1]])
+
+        self.assertEqual([entry.source_id for entry in entries], [expenses[1].id])
+        self.assertEqual(expenses[1].posting_date, expenses[1].date)
+        self.assertIsNone(Expense.objects.get(id=expenses[2].id).posting_date)
+
+    def test_command_posts_unposted_approved_expenses(self):
+        approved_expenses(self.allocation, 5)
+
+        call_command('post_approved_expenses', '--batch-size', '2', stdout=io.StringIO())
+
+        self.assertEqual(JournalEntry.objects.filter(source_type='EXPENSE').count(), 5)
+        self.assertFalse(Expense.objects.filter(posting_date__isnull=True).exists())
+
+
+@benchmark
+class BatchPostingBenchmark(TestCase):
+    EXPENSES = 10_000
+
+    def test_post_ten_thousand_expenses(self):
+        make_account(code='1010', name="Cash",
+                     account_type=AccountType.objects.get_or_create(name="Asset")[0])
+        allocation = make_allocation(make_department(), make_current_fiscal_year())
+        expenses = approved_expenses(allocation, self.EXPENSES)
+
+        started = time.perf_counter()
+        entries = post_expenses(expenses)
+        elapsed = time.perf_counter() - started
+
+        logger.info("Posted %d expenses in %.2fs", len(entries), elapsed)
+        self.assertEqual(len(entries), self.EXPENSES)
+        self.assertEqual(JournalEntryLine.objects.count(), 2 * self.EXPENSES)
+        self.assertLess(elapsed, 30)
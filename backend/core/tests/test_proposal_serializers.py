@@ -0,0 +1,90 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from ..models import BudgetProposal, BudgetProposalItem, ProposalComment, ProposalHistory
+from ..rollups import annotate_proposal_summaries
+from ..serializers_budget import BudgetProposalDetailSerializer, BudgetProposalListSerializer
+from .factories import (
+    make_account, make_category, make_current_fiscal_year, make_department, make_project, make_user
+)
+
+
+class ProposalSerializerTestCase(APITestCase):
+    def setUp(self):
+        self.fiscal_year = make_current_fiscal_year()
+        self.department = make_department()
+        self.account = make_account()
+        self.category = make_category(classification='CAPEX')
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+
+    def make_proposal(self, costs=('100.00', '250.50'), reviewed=False):
+        proposal = make_project(self.department, self.fiscal_year).budget_proposal
+        for n, cost in enumerate(costs):
+            BudgetProposalItem.objects.create(
+                proposal=proposal, category=self.category if n == 0 else make_category(),
+                cost_element=f"Item {n}", description="Item", estimated_cost=Decimal(cost),
+                account=self.account)
+        if reviewed:
+            history = ProposalHistory.objects.create(
+                proposal=proposal, action='APPROVED', action_by_name="Reviewer", new_status='APPROVED')
+            ProposalComment.objects.create(proposal=proposal, comment="Before", user_id=1, user_username="Reviewer")
+            for offset, text in ((2, "Later"), (1, "First after review")):
+                comment = ProposalComment.objects.create(
+                    proposal=proposal, comment=text, user_id=1, user_username="Reviewer")
+                ProposalComment.objects.filter(pk=comment.pk).update(
+                    created_at=history.action_at + timedelta(minutes=offset))
+            ProposalComment.objects.filter(comment="Before").update(
+                created_at=history.action_at - timedelta(minutes=1))
+        return proposal
+
+    def test_annotated_values_match_per_row_queries(self):
+        proposals = [self.make_proposal(reviewed=True), self.make_proposal(costs=()), self.make_proposal()]
+        annotated = annotate_proposal_summaries(
+            BudgetProposal.objects.filter(pk__in=[p.pk for p in proposals]).prefetch_related('comments')
+        ).order_by('pk')
+        plain = BudgetProposal.objects.filter(pk__in=[p.pk for p in proposals]).order_by('pk')
+
+        for serializer_class in (BudgetProposalListSerializer, BudgetProposalDetailSerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertEqual(serializer_class(annotated, many=True).data,
+                                 serializer_class(plain, many=True).data)
+
+        detail = BudgetProposalDetailSerializer(annotated[0]).data
+        self.assertEqual(detail['latest_review_comment']['comment'], "First after review")
+        self.assertEqual(Decimal(detail['total_cost']), Decimal('350.50'))
+        self.assertEqual(detail['category'], 'CAPEX')
+
+    def test_list_page_costs_a_fixed_number_of_queries(self):
+        url = reverse('budget-proposals-list')
+
+        def list_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        self.make_proposal(reviewed=True)
+        one_row = list_queries()
+        for _ in range(4):
+            self.make_proposal(reviewed=True)
+        self.assertEqual(list_queries(), one_row)
+
+    def test_review_response_reflects_the_review(self):
+        proposal = self.make_proposal()
+        proposal.status = 'SUBMITTED'
+        proposal.save()
+        proposal.project.delete()
+
+        response = self.client.post(
+            reverse('budget-proposals-review', args=[proposal.pk]),
+            {'status': 'REJECTED', 'comment': "Too expensive"}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'REJECTED')
+        self.assertIn("Too expensive", [c['comment'] for c in response.data['comments']])
+        self.assertIsNotNone(response.data['last_reviewed_at'])
@@ -0,0 +1,170 @@
+"""
+EXPLAIN checks for the hot dashboard, ledger and variance queries.
+
+A few fiscal years of allocations, expenses and journal entries are seeded and
+analyzed, then each query's plan must read every large table through an index
+(one of the composite/partial indexes declared in core/models.py) instead of a
+full table scan. PostgreSQL would pick sequential scans on a dataset this small
+regardless of indexes, so seqscans are disabled there to check that the indexes
+are usable at all.
+"""
+import re
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+
+from ..ledger import ledger_lines_queryset
+from ..models import Account, BudgetAllocation, Expense, FiscalYear
+from ..pagination import ExpensePagination
+from ..rollups import annotate_account_accomplishment, approved_spent_subquery
+from .factories import (
+    make_account, make_allocation, make_category, make_current_fiscal_year, make_department,
+    make_journal_entry
+)
+
+
+STATUSES = ['APPROVED', 'SUBMITTED', 'REJECTED', 'DRAFT']
+
+# SQLite: "SCAN core_expense" (no USING ...) is a full table scan
+SQLITE_TABLE_SCAN = re.compile(r'\bSCAN (core_\w+)\s*$', re.MULTILINE)
+
+
+class QueryPlanTestCase(TestCase):
+    LARGE_TABLES = ('core_expense', 'core_budgetallocation', 'core_journalentry', 'core_journalentryline')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fiscal_year = make_current_fiscal_year()
+        fiscal_years = [cls.fiscal_year] + [
+            FiscalYear.objects.create(name=f"FY{year}", start_date=date(year, 1, 1), end_date=date(year, 12, 31))
+            for year in range(cls.fiscal_year.start_date.year - 4, cls.fiscal_year.start_date.year)
+        ]
+        cls.departments = [make_department() for _ in range(5)]
+        allocations = [
+            make_allocation(department, fiscal_year)
+            for fiscal_year in fiscal_years for department in cls.departments for _ in range(4)
+        ]
+        Expense.objects.bulk_create([
+            Expense(
+                transaction_id=f"TXN-PLAN-{n:05d}", budget_allocation=allocation,
+                project=allocation.project, department=allocation.department,
+                account=allocation.account, category=allocation.category, amount=Decimal('10.00'),
+                date=date(allocation.fiscal_year.start_date.year, 1 + n % 12, 1),
+                vendor="Vendor", description="Seeded", status=STATUSES[n % len(STATUSES)],
+                submitted_by_user_id=1)
+            for n, allocation in ((n, allocations[n % len(allocations)]) for n in range(3000))
+        ])
+        debit, credit, category = make_account(), make_account(), make_category()
+        for n in range(200):
+            make_journal_entry(
+                cls.departments[n % 5], date=date(fiscal_years[n % 5].start_date.year, 1 + n % 12, 1),
+                debit_account=debit, credit_account=credit, expense_category=category)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def plan(self, queryset):
+        return queryset.explain()
+
+    def assertIndexScan(self, queryset, *index_names):
+        """No full scan of a large table, and at least one of index_names is used."""
+        plan = self.plan(queryset)
+        if connection.vendor == 'postgresql':
+            scanned = re.findall(r'Seq Scan on (\w+)', plan)
+        else:
+            scanned = SQLITE_TABLE_SCAN.findall(plan)
+        self.assertFalse(
+            [table for table in scanned if table in self.LARGE_TABLES],
+            f"Full table scan in plan:\n{plan}")
+        if index_names:
+            self.assertTrue(
+                any(name in plan for name in index_names),
+                f"None of {index_names} used by plan:\n{plan}")
+
+    # --- Dashboard ---
+
+    def test_department_monthly_actuals(self):
+        start, end = self.fiscal_year.start_date, self.fiscal_year.end_date
+        self.assertIndexScan(
+            Expense.objects.filter(
+                department=self.departments[0], status='APPROVED',
+                budget_allocation__fiscal_year=self.fiscal_year,
+                date__gte=start, date__lte=end
+            ).values('amount'),
+            'expense_approved_dept_idx', 'expense_status_dept_idx')
+
+    def test_budget_summary_for_general_user(self):
+        self.assertIndexScan(
+            Expense.objects.filter(
+                status='APPROVED', budget_allocation__fiscal_year=self.fiscal_year,
+                department_id=self.departments[0].id
+            ).values('amount'),
+            'expense_approved_dept_idx', 'expense_status_dept_idx')
+        self.assertIndexScan(
+            BudgetAllocation.objects.filter(
+                fiscal_year=self.fiscal_year, is_active=True, department_id=self.departments[0].id
+            ).values('amount'),
+            'alloc_active_fy_dept_cat_idx')
+
+    def test_last_month_actual_spend(self):
+        year = self.fiscal_year.start_date.year
+        self.assertIndexScan(
+            Expense.objects.filter(status='APPROVED', date__year=year, date__month=3).values('amount'),
+            'expense_approved_date_idx')
+
+    def test_allocation_spent_subquery(self):
+        self.assertIndexScan(
+            BudgetAllocation.objects.filter(fiscal_year=self.fiscal_year, is_active=True)
+            .annotate(spent=approved_spent_subquery()).values('id', 'spent'),
+            'expense_approved_alloc_idx')
+
+    # --- Ledger ---
+
+    def test_ledger_listing(self):
+        self.assertIndexScan(ledger_lines_queryset({}), 'journalentry_date_idx', 'jeline_categorized_idx')
+
+    def test_ledger_for_general_user(self):
+        self.assertIndexScan(
+            ledger_lines_queryset({}, 'GENERAL_USER', self.departments[0].id),
+            'journalentry_dept_date_idx')
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', "The trigram index only exists on PostgreSQL.")
+    def test_ledger_search(self):
+        self.assertIndexScan(ledger_lines_queryset({'search': 'seeded'}), 'jeline_search_trgm_idx')
+
+    # --- Keyset pagination ---
+
+    def test_expense_keyset_page(self):
+        pagination = ExpensePagination()
+        position = [self.fiscal_year.start_date.isoformat(), 1500]
+        self.assertIndexScan(
+            Expense.objects.order_by(*pagination.ordering).filter(pagination.after(position))[:6],
+            'expense_date_id_idx')
+
+    # --- Account setup ---
+
+    def test_account_accomplishment(self):
+        self.assertIndexScan(
+            annotate_account_accomplishment(Account.objects.all(), self.fiscal_year)
+            .values('id', 'fiscal_year_accomplished', 'fiscal_year_accomplishment_date'),
+            'alloc_account_fy_created_idx')
+
+    # --- Variance report ---
+
+    def test_variance_budget_and_actual_totals(self):
+        self.assertIndexScan(
+            BudgetAllocation.objects.filter(fiscal_year=self.fiscal_year, is_active=True)
+            .values('category_id').annotate(total=Sum('amount')).order_by(),
+            'alloc_active_fy_cat_idx', 'alloc_active_fy_dept_cat_idx')
+        self.assertIndexScan(
+            Expense.objects.filter(status='APPROVED', budget_allocation__fiscal_year=self.fiscal_year)
+            .values('category_id').annotate(total=Sum('amount')).order_by())
@@ -0,0 +1,68 @@
+from datetime import date
+from decimal import Decimal
+
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from ..models import FiscalYear
+from ..report_cache import report_cache
+from .factories import (
+    make_allocation, make_current_fiscal_year, make_department, make_expense, make_project,
+    make_user
+)
+
+
+class ReportCacheTestCase(APITestCase):
+    def setUp(self):
+        report_cache().clear()
+        self.fiscal_year = make_current_fiscal_year()
+        self.department = make_department()
+        self.allocation = make_allocation(self.department, self.fiscal_year, amount=Decimal('50000.00'))
+        make_expense(self.allocation, amount=Decimal('5000.00'))
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+
+    def summary(self):
+        return self.client.get(reverse('dashboard-budget-summary')).data
+
+    def test_repeated_reads_are_served_from_cache(self):
+        first = self.summary()
+        # Only the active fiscal year lookup that picks the generation
+        with self.assertNumQueries(1):
+            self.assertEqual(self.summary(), first)
+
+    def test_expense_and_allocation_changes_invalidate(self):
+        self.assertEqual(Decimal(self.summary()['total_spent']), Decimal('5000.00'))
+
+        expense = make_expense(self.allocation, amount=Decimal('700.00'), status='SUBMITTED')
+        self.assertEqual(Decimal(self.summary()['total_spent']), Decimal('5000.00'))
+        expense.status = 'APPROVED'
+        expense.save()
+        self.assertEqual(Decimal(self.summary()['total_spent']), Decimal('5700.00'))
+
+        self.allocation.amount = Decimal('60000.00')
+        self.allocation.save()
+        self.assertEqual(Decimal(self.summary()['total_budget']), Decimal('60000.00'))
+
+    def test_keys_are_scoped_by_role_and_department(self):
+        other_department = make_department()
+        make_expense(make_allocation(other_department, self.fiscal_year), amount=Decimal('1000.00'))
+
+        self.assertEqual(Decimal(self.summary()['total_spent']), Decimal('6000.00'))
+        self.client.force_authenticate(user=make_user('GENERAL_USER', department=self.department))
+        self.assertEqual(Decimal(self.summary()['total_spent']), Decimal('5000.00'))
+        self.client.force_authenticate(user=make_user('GENERAL_USER', department=other_department))
+        self.assertEqual(Decimal(self.summary()['total_spent']), Decimal('1000.00'))
+
+    def test_other_fiscal_years_keep_their_entries(self):
+        past_year = self.fiscal_year.start_date.year - 1
+        past = FiscalYear.objects.create(
+            name=f"FY{past_year}", start_date=date(past_year, 1, 1), end_date=date(past_year, 12, 31))
+        project = make_project(self.department, past)
+        url = reverse('dashboard-overall-monthly-flow')
+        params = {'fiscal_year_id': self.fiscal_year.id}
+        first = self.client.get(url, params).data
+
+        make_allocation(self.department, past, project=project,
+                        account=self.allocation.account, category=self.allocation.category)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, params).data, first)
@@ -0,0 +1,184 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..rollups import department_budget_rollup, iter_months
+from .factories import (
+    make_allocation, make_current_fiscal_year, make_department, make_expense, make_user
+)
+
+
+class DepartmentRollupTestCase(APITestCase):
+    def setUp(self):
+        self.fiscal_year = make_current_fiscal_year()
+        self.departments = []
+        for _ in range(3):
+            self._add_department()
+
+    def _add_department(self):
+        dept = make_department()
+        allocation = make_allocation(dept, self.fiscal_year, amount=Decimal('120000.00'))
+        make_expense(allocation, amount=Decimal('3000.00'))
+        make_expense(allocation, amount=Decimal('500.00'), status='SUBMITTED')
+        self.departments.append(dept)
+        return dept
+
+    def _query_count(self, user):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard-department-status'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+
+    def test_rollup_totals_per_department(self):
+        rollup = department_budget_rollup(
+            self.fiscal_year, department_ids=[d.id for d in self.departments])
+
+        self.assertEqual(len(rollup), 3)
+        for dept in self.departments:
+            self.assertEqual(rollup[dept.id]['budget'], Decimal('120000.00'))
+            self.assertEqual(rollup[dept.id]['spent'], Decimal('3000.00'))
+
+    def test_department_without_allocations_is_zero(self):
+        empty = make_department()
+        rollup = department_budget_rollup(self.fiscal_year, department_ids=[empty.id])
+        self.assertEqual(rollup[empty.id], {'budget': Decimal('0.00'), 'spent': Decimal('0.00')})
+
+    def test_get_budget_summary_uses_rollup(self):
+        summary = self.departments[0].get_budget_summary(self.fiscal_year)
+        self.assertEqual(summary['total_budget'], Decimal('120000.00'))
+        self.assertEqual(summary['total_spent'], Decimal('3000.00'))
+        self.assertEqual(summary['remaining'], Decimal('117000.00'))
+
+    def test_department_status_query_count_is_constant(self):
+        user = make_user('FINANCE_HEAD')
+
+        baseline, response = self._query_count(user)
+        self.assertEqual(len(response.data), 3)
+
+        for _ in range(7):
+            self._add_department()
+
+        grown, response = self._query_count(user)
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(baseline, grown)
+
+    def test_general_user_sees_only_own_department(self):
+        dept = self.departments[1]
+        user = make_user('GENERAL_USER', department=dept)
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get(reverse('dashboard-department-status'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['department_id'], dept.id)
+        self.assertEqual(Decimal(str(response.data[0]['budget'])), Decimal('120000.00'))
+        self.assertEqual(Decimal(str(response.data[0]['spent'])), Decimal('3000.00'))
+
+
+class ProjectStatusListTestCase(APITestCase):
+    def setUp(self):
+        self.fiscal_year = make_current_fiscal_year()
+        self.department = make_department()
+        self.user = make_user('FINANCE_HEAD')
+        for _ in range(6):
+            self._add_allocation()
+
+    def _add_allocation(self):
+        allocation = make_allocation(self.department, self.fiscal_year, amount=Decimal('10000.00'))
+        make_expense(allocation, amount=Decimal('2500.00'))
+        make_expense(allocation, amount=Decimal('1000.00'), status='SUBMITTED')
+        return allocation
+
+    def _get_page(self):
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('project-table'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+
+    def test_spent_is_annotated_per_allocation(self):
+        _, response = self._get_page()
+
+        self.assertEqual(response.data['count'], 6)
+        self.assertEqual(len(response.data['results']), 5)
+        row = response.data['results'][0]
+        self.assertEqual(Decimal(row['spent']), Decimal('2500.00'))
+        self.assertEqual(Decimal(row['remaining']), Decimal('7500.00'))
+        self.assertEqual(row['progress'], 25.0)
+
+    def test_query_count_is_constant(self):
+        baseline, _ = self._get_page()
+
+        for _ in range(10):
+            self._add_allocation()
+
+        grown, response = self._get_page()
+        self.assertEqual(response.data['count'], 16)
+        self.assertEqual(baseline, grown)
+
+
+class MonthlyBudgetActualTestCase(APITestCase):
+    def setUp(self):
+        self.department = make_department()
+        self.user = make_user('FINANCE_HEAD')
+        # Fiscal year that crosses a calendar year (July to June)
+        self.fiscal_year = make_current_fiscal_year(
+            name="FY-CROSS", start_date=date(2025, 7, 1), end_date=date(2026, 6, 30))
+        self.allocation = make_allocation(
+            self.department, self.fiscal_year, amount=Decimal('120000.00'))
+        make_expense(self.allocation, amount=Decimal('1000.00'), date=date(2025, 7, 10))
+        make_expense(self.allocation, amount=Decimal('500.00'), date=date(2025, 7, 20))
+        make_expense(self.allocation, amount=Decimal('2000.00'), date=date(2026, 2, 5))
+        make_expense(self.allocation, amount=Decimal('9999.00'), date=date(2026, 2, 6), status='SUBMITTED')
+
+    def test_iter_months_crosses_calendar_year(self):
+        months = list(iter_months(date(2025, 11, 15), date(2026, 2, 1)))
+        self.assertEqual(months, [(2025, 11), (2025, 12), (2026, 1), (2026, 2)])
+
+    def test_overall_flow_follows_fiscal_year_months(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(
+            reverse('dashboard-overall-monthly-flow'), {'fiscal_year_id': self.fiscal_year.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 12)
+        self.assertEqual([row['month'] for row in response.data][:7], [7, 8, 9, 10, 11, 12, 1])
+        actual = {row['month']: Decimal(row['actual']) for row in response.data}
+        self.assertEqual(actual[7], Decimal('1500.00'))
+        self.assertEqual(actual[2], Decimal('2000.00'))
+        self.assertEqual(Decimal(response.data[0]['budget']), Decimal('10000.00'))
+
+    def test_department_monthly_data_is_one_query(self):
+        self.client.force_authenticate(user=self.user)
+        params = {'department_id': self.department.id, 'fiscal_year_id': self.fiscal_year.id}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('monthly-budget-actual-list'), params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 12)
+        # department + fiscal year lookups, budget total and one bucketed actuals query
+        self.assertEqual(len(ctx.captured_queries), 4)
+
+    def test_project_distribution_buckets_project_months(self):
+        project = self.allocation.project
+        project.start_date = date(2025, 7, 1)
+        project.end_date = date(2028, 6, 30)
+        project.save()
+
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                reverse('monthly-budget-actual-project-distribution'), {'project_id': project.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 36)
+        self.assertEqual(Decimal(response.data[0]['actual']), Decimal('1500.00'))
+        # project lookup, allocation lookup and one bucketed actuals query
+        self.assertEqual(len(ctx.captured_queries), 3)
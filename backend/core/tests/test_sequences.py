@@ -0,0 +1,127 @@
+import threading
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from ..models import DocumentSequence, Expense, JournalEntry
+from ..sequences import (
+    assign_expense_transaction_ids, assign_journal_entry_ids, expense_transaction_ids, reserve
+)
+from .factories import make_allocation, make_current_fiscal_year, make_department, make_expense
+
+
+def new_entry(**kwargs):
+    fields = dict(category='EXPENSES', description="Sequence test", date=date(2025, 6, 1),
+                  total_amount=Decimal('0'), created_by_user_id=1)
+    fields.update(kwargs)
+    return JournalEntry(**fields)
+
+
+class DocumentSequenceTestCase(TestCase):
+    def test_new_series_continues_from_existing_entries(self):
+        JournalEntry.objects.bulk_create([
+            new_entry(entry_id='JE-2025-00041'),
+            new_entry(entry_id='JE-2025-00007'),
+            new_entry(entry_id='JE-2024-00090', date=date(2024, 6, 1)),
+        ])
+
+        entry = new_entry()
+        entry.save()
+        self.assertEqual(entry.entry_id, 'JE-2025-00042')
+
+        other_year = new_entry(date=date(2024, 1, 1))
+        other_year.save()
+        self.assertEqual(other_year.entry_id, 'JE-2024-00091')
+
+    def test_batch_reservation_for_bulk_inserts(self):
+        entries = [new_entry() for _ in range(3)] + [new_entry(date=date(2026, 1, 5))]
+
+        JournalEntry.objects.bulk_create(assign_journal_entry_ids(entries))
+
+        self.assertEqual(
+            sorted(JournalEntry.objects.values_list('entry_id', flat=True)),
+            ['JE-2025-00001', 'JE-2025-00002', 'JE-2025-00003', 'JE-2026-00001'])
+        self.assertEqual(DocumentSequence.objects.get(name='JE-2025').last_value, 3)
+
+    def test_rolled_back_reservation_leaves_no_gap(self):
+        reserve('TEST', 5)
+        try:
+            with transaction.atomic():
+                self.assertEqual(reserve('TEST'), 6)
+                raise RuntimeError("rollback")
+        except RuntimeError:
+            pass
+        self.assertEqual(reserve('TEST'), 6)
+
+
+class ExpenseTransactionIdTestCase(APITestCase):
+    def setUp(self):
+        self.allocation = make_allocation(make_department(), make_current_fiscal_year())
+        self.prefix = f"TXN-{timezone.now():%Y%m%d}-"
+
+    def test_series_continues_from_existing_expenses_and_widens(self):
+        make_expense(self.allocation, transaction_id=f"{self.prefix}9998")
+
+        self.assertEqual(make_expense(self.allocation).transaction_id, f"{self.prefix}9999")
+        self.assertEqual(make_expense(self.allocation).transaction_id, f"{self.prefix}10000")
+        self.assertEqual(expense_transaction_ids(2), [f"{self.prefix}10001", f"{self.prefix}10002"])
+
+    def test_bulk_import_reserves_one_block(self):
+        expenses = [
+            Expense(budget_allocation=self.allocation, project=self.allocation.project,
+                    department=self.allocation.department, account=self.allocation.account,
+                    category=self.allocation.category, amount=Decimal('10.00'),
+                    date=date.today(), vendor="Vendor", description=f"Imported {n}",
+                    submitted_by_user_id=1, submitted_by_username="importer")
+            for n in range(3)
+        ]
+
+        Expense.objects.bulk_create(assign_expense_transaction_ids(expenses))
+
+        self.assertEqual(
+            sorted(Expense.objects.values_list('transaction_id', flat=True)),
+            [f"{self.prefix}{n:04d}" for n in range(1, 4)])
+
+
+# SQLite's shared-cache test database fails concurrent writers with "table is
+# locked" instead of waiting, so this runs against PostgreSQL only.
+@skipUnlessDBFeature('has_select_for_update')
+class DocumentSequenceConcurrencyTestCase(TransactionTestCase):
+    WORKERS = 8
+    ENTRIES_PER_WORKER = 25
+
+    def test_parallel_writers_never_collide(self):
+        errors = []
+        transaction_ids = []
+        barrier = threading.Barrier(self.WORKERS)
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.ENTRIES_PER_WORKER):
+                    with transaction.atomic():
+                        new_entry().save()
+                    transaction_ids.extend(expense_transaction_ids(2))
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        total = self.WORKERS * self.ENTRIES_PER_WORKER
+        entry_ids = list(JournalEntry.objects.values_list('entry_id', flat=True))
+        self.assertEqual(len(entry_ids), total)
+        # Unique and gap-free
+        self.assertEqual(
+            sorted(entry_ids), [f'JE-2025-{n:05d}' for n in range(1, total + 1)])
+        self.assertEqual(len(set(transaction_ids)), total * 2)
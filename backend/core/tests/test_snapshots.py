@@ -0,0 +1,179 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import BudgetActualSnapshot
+from ..snapshots import apply_deltas, new_deltas, rebuild_snapshots
+from .factories import (
+    make_allocation, make_category, make_current_fiscal_year, make_department,
+    make_expense, make_user
+)
+
+
+def snapshot_state():
+    """Snapshot rows as comparable tuples, ignoring empty cells."""
+    return sorted(
+        (row.fiscal_year_id, row.department_id, row.category_id, row.project_id,
+         row.month or date.min, row.budget_amount, row.actual_amount)
+        for row in BudgetActualSnapshot.objects.all()
+        if row.budget_amount or row.actual_amount
+    )
+
+
+class BudgetActualSnapshotTestCase(APITestCase):
+    def setUp(self):
+        self.fiscal_year = make_current_fiscal_year()
+        self.department = make_department()
+        self.allocation = make_allocation(
+            self.department, self.fiscal_year, amount=Decimal('50000.00'))
+
+    def assertMatchesRebuild(self):
+        incremental = snapshot_state()
+        rebuild_snapshots()
+        self.assertEqual(incremental, snapshot_state())
+
+    def test_allocation_creates_budget_cell(self):
+        cell = BudgetActualSnapshot.objects.get(month__isnull=True)
+        self.assertEqual(cell.budget_amount, Decimal('50000.00'))
+        self.assertEqual(cell.project_id, self.allocation.project_id)
+
+    def test_expense_lifecycle_is_applied_incrementally(self):
+        expense = make_expense(self.allocation, amount=Decimal('1200.00'), status='SUBMITTED')
+        self.assertFalse(BudgetActualSnapshot.objects.filter(actual_amount__gt=0).exists())
+
+        expense.status = 'APPROVED'
+        expense.save()
+        self.assertMatchesRebuild()
+
+        expense.amount = Decimal('1500.00')
+        expense.date = date(self.fiscal_year.start_date.year, 2, 14)
+        expense.save()
+        self.assertMatchesRebuild()
+        cell = BudgetActualSnapshot.objects.get(month=date(self.fiscal_year.start_date.year, 2, 1))
+        self.assertEqual(cell.actual_amount, Decimal('1500.00'))
+
+        expense.delete()
+        self.assertFalse(BudgetActualSnapshot.objects.filter(actual_amount__gt=0).exists())
+
+    def test_allocation_changes_move_budget_and_actuals(self):
+        make_expense(self.allocation, amount=Decimal('700.00'))
+
+        self.allocation.amount = Decimal('40000.00')
+        self.allocation.save()
+        self.assertMatchesRebuild()
+
+        self.allocation.category = make_category()
+        self.allocation.save()
+        self.assertMatchesRebuild()
+
+        self.allocation.is_active = False
+        self.allocation.save()
+        self.assertEqual(snapshot_state(), [])
+
+    def test_deltas_touch_cells_in_key_order(self):
+        key = (self.fiscal_year.id, self.department.id, self.allocation.category_id,
+               self.allocation.project_id)
+        months = [date(2025, 3, 1), None, date(2025, 1, 1)]
+        deltas = new_deltas()
+        for month in months:
+            deltas[key + (month,)][0] += Decimal('1.00')
+
+        manager = BudgetActualSnapshot.objects
+        with mock.patch.object(manager, 'get_or_create', wraps=manager.get_or_create) as get_or_create:
+            apply_deltas(deltas)
+
+        touched = [call.kwargs['month'] for call in get_or_create.call_args_list]
+        self.assertEqual(touched, [None, date(2025, 1, 1), date(2025, 3, 1)])
+
+    def test_rebuild_command(self):
+        make_expense(self.allocation, amount=Decimal('900.00'))
+        expected = snapshot_state()
+        BudgetActualSnapshot.objects.all().delete()
+
+        call_command('rebuild_budget_snapshots', stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(snapshot_state(), expected)
+
+    def test_dashboards_read_snapshot_totals(self):
+        make_expense(self.allocation, amount=Decimal('5000.00'))
+        make_expense(self.allocation, amount=Decimal('800.00'), status='SUBMITTED')
+        other_dept = make_department()
+        other = make_allocation(other_dept, self.fiscal_year, amount=Decimal('10000.00'))
+        make_expense(other, amount=Decimal('1000.00'))
+
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+        summary = self.client.get(reverse('dashboard-budget-summary')).data
+        self.assertEqual(Decimal(summary['total_budget']), Decimal('60000.00'))
+        self.assertEqual(Decimal(summary['total_spent']), Decimal('6000.00'))
+
+        categories = self.client.get(reverse('dashboard-category-budget-status')).data
+        spent = {row['category_id']: Decimal(str(row['spent'])) for row in categories}
+        self.assertEqual(spent[self.allocation.category_id], Decimal('5000.00'))
+        self.assertEqual(spent[other.category_id], Decimal('1000.00'))
+
+        self.client.force_authenticate(user=make_user('GENERAL_USER', department=self.department))
+        summary = self.client.get(reverse('dashboard-budget-summary')).data
+        self.assertEqual(Decimal(summary['total_budget']), Decimal('50000.00'))
+        self.assertEqual(Decimal(summary['total_spent']), Decimal('5000.00'))
+
+        response = self.client.get(reverse('expense-tracking-summary'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(response.data['budget_remaining']), Decimal('45000.00'))
+        self.assertEqual(Decimal(response.data['total_expenses_this_month']), Decimal('5000.00'))
+
+    def test_this_month_excludes_other_months(self):
+        today = timezone.now().date()
+        make_expense(self.allocation, amount=Decimal('300.00'))
+        if today.month > 1:
+            make_expense(self.allocation, amount=Decimal('999.00'), date=today.replace(month=1, day=1))
+
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+        response = self.client.get(reverse('expense-tracking-summary'))
+
+        self.assertEqual(Decimal(response.data['total_expenses_this_month']), Decimal('300.00'))
+
+    def test_tracking_summary_counts_spend_on_deactivated_allocations(self):
+        make_expense(self.allocation, amount=Decimal('400.00'))
+        retired = make_allocation(self.department, self.fiscal_year, amount=Decimal('2000.00'))
+        make_expense(retired, amount=Decimal('600.00'))
+        retired.is_active = False
+        retired.save()
+
+        self.client.force_authenticate(user=make_user('GENERAL_USER', department=self.department))
+        response = self.client.get(reverse('expense-tracking-summary'))
+
+        # The retired allocation's budget is gone, but its spend still counts
+        self.assertEqual(Decimal(response.data['budget_remaining']), Decimal('49000.00'))
+        self.assertEqual(Decimal(response.data['total_expenses_this_month']), Decimal('1000.00'))
+
+    def test_category_status_counts_spend_by_expense_category(self):
+        # An external expense can carry a category other than its allocation's
+        other_category = make_category()
+        make_allocation(self.department, self.fiscal_year, amount=Decimal('3000.00'),
+                        category=other_category)
+        make_expense(self.allocation, amount=Decimal('250.00'), category=other_category)
+        make_expense(self.allocation, amount=Decimal('100.00'))
+        retired = make_allocation(self.department, self.fiscal_year, amount=Decimal('2000.00'),
+                                  category=self.allocation.category)
+        make_expense(retired, amount=Decimal('600.00'))
+        retired.is_active = False
+        retired.save()
+
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+        rows = self.client.get(reverse('dashboard-category-budget-status')).data
+        status_by_category = {
+            row['category_id']: (Decimal(str(row['budget'])), Decimal(str(row['spent'])))
+            for row in rows
+        }
+
+        # The retired allocation's budget is gone, but its spend still counts
+        self.assertEqual(status_by_category[self.allocation.category_id],
+                         (Decimal('50000.00'), Decimal('700.00')))
+        self.assertEqual(status_by_category[other_category.id],
+                         (Decimal('3000.00'), Decimal('250.00')))
@@ -0,0 +1,194 @@
+import random
+import threading
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import BudgetAllocation, BudgetTransfer, JournalEntry
+from ..snapshots import rebuild_snapshots
+from ..transfers import TransferError, transfer_budget
+from .factories import (
+    make_allocation, make_category, make_current_fiscal_year, make_department, make_expense,
+    make_project, make_user
+)
+from .test_snapshots import snapshot_state
+
+
+def amounts(*allocations):
+    stored = dict(BudgetAllocation.objects.values_list('id', 'amount'))
+    return [stored[allocation.id] for allocation in allocations]
+
+
+def leg(source, destination, amount):
+    return {'source_allocation_id': source.id, 'destination_allocation_id': destination.id,
+            'amount': Decimal(amount)}
+
+
+class BudgetTransferTestCase(APITestCase):
+    def setUp(self):
+        self.fiscal_year = make_current_fiscal_year()
+        self.department = make_department()
+        self.a = make_allocation(self.department, self.fiscal_year, amount=Decimal('1000.00'))
+        self.b = make_allocation(self.department, self.fiscal_year, amount=Decimal('500.00'))
+        self.c = make_allocation(self.department, self.fiscal_year, amount=Decimal('200.00'))
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD', user_id=7))
+
+    def test_batch_moves_every_leg_and_links_journal_entries(self):
+        response = self.client.post(reverse('budget-transfer-batch'), {
+            'reason': "Quarterly rebalance",
+            'legs': [
+                {'source_allocation_id': self.a.id, 'destination_allocation_id': self.b.id, 'amount': '300.00'},
+                {'source_allocation_id': self.b.id, 'destination_allocation_id': self.c.id, 'amount': '600.00'},
+            ],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(amounts(self.a, self.b, self.c),
+                         [Decimal('700.00'), Decimal('200.00'), Decimal('800.00')])
+        transfer_ids = [row['id'] for row in response.data]
+        entries = JournalEntry.objects.filter(source_type='BUDGET_TRANSFER').order_by('source_id')
+        self.assertEqual([entry.source_id for entry in entries], sorted(transfer_ids))
+        for entry in entries:
+            lines = {line.transaction_type: line for line in entry.lines.all()}
+            self.assertEqual(lines['DEBIT'].amount, lines['CREDIT'].amount)
+
+        incremental = snapshot_state()
+        rebuild_snapshots()
+        self.assertEqual(incremental, snapshot_state())
+
+    def test_overdrawn_leg_rolls_back_the_whole_batch(self):
+        make_expense(self.a, amount=Decimal('900.00'))
+
+        with self.assertRaisesMessage(TransferError, "Available: 100.00, Requested: 150.00"):
+            transfer_budget([leg(self.a, self.b, '50.00'), leg(self.a, self.c, '100.00')],
+                            make_user('FINANCE_HEAD'), "Too much")
+
+        self.assertEqual(amounts(self.a, self.b, self.c),
+                         [Decimal('1000.00'), Decimal('500.00'), Decimal('200.00')])
+        self.assertFalse(BudgetTransfer.objects.exists())
+        self.assertFalse(JournalEntry.objects.filter(source_type='BUDGET_TRANSFER').exists())
+
+    def test_transfer_within_a_shared_snapshot_cell(self):
+        twin = make_allocation(self.department, self.fiscal_year, amount=Decimal('100.00'),
+                               project=self.a.project, category=self.a.category)
+
+        with CaptureQueriesContext(connection) as ctx:
+            transfer_budget([leg(self.a, twin, '250.00')], make_user('FINANCE_HEAD'), "Merge")
+
+        self.assertEqual(amounts(self.a, twin), [Decimal('750.00'), Decimal('350.00')])
+        # Both allocations feed the same budget cell, so the net change is zero and it is not touched
+        self.assertFalse([q for q in ctx.captured_queries if 'core_budgetactualsnapshot' in q['sql']])
+        incremental = snapshot_state()
+        rebuild_snapshots()
+        self.assertEqual(incremental, snapshot_state())
+
+    def test_rejects_unknown_allocations_and_self_transfers(self):
+        response = self.client.post(reverse('budget-transfer-batch'), {
+            'reason': "Bad",
+            'legs': [{'source_allocation_id': self.a.id, 'destination_allocation_id': 999999, 'amount': '1.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("not found: 999999", response.data['error'])
+
+        response = self.client.post(reverse('budget-transfer-batch'), {
+            'reason': "Bad",
+            'legs': [{'source_allocation_id': self.a.id, 'destination_allocation_id': self.a.id, 'amount': '1.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+# SQLite's shared-cache test database fails concurrent writers with "table is
+# locked" instead of waiting, so this runs against PostgreSQL only.
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentTransferTestCase(TransactionTestCase):
+    WORKERS = 8
+    TRANSFERS_PER_WORKER = 25
+
+    def run_workers(self, transfer):
+        """Runs transfer(rng) TRANSFERS_PER_WORKER times on each of WORKERS threads; returns errors."""
+        errors = []
+        barrier = threading.Barrier(self.WORKERS)
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                barrier.wait()
+                for _ in range(self.TRANSFERS_PER_WORKER):
+                    transfer(rng)
+            except Exception as e:  # pragma: no cover - reported by the caller
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_transfers_crossing_shared_snapshot_cells_do_not_deadlock(self):
+        fiscal_year = make_current_fiscal_year()
+        department = make_department()
+        user = make_user('FINANCE_HEAD')
+        # Two snapshot cells X and Y with two allocations each, created so that
+        # x1 < y1 but y2 < x2: in allocation order the two pairs reach X and Y in
+        # opposite orders.
+        cells = {
+            name: {'project': make_project(department, fiscal_year), 'category': make_category()}
+            for name in ('X', 'Y')
+        }
+        x1, y1, y2, x2 = [
+            make_allocation(department, fiscal_year, amount=Decimal('1000.00'), **cells[name])
+            for name in ('X', 'Y', 'Y', 'X')
+        ]
+
+        def transfer(rng):
+            source, destination = rng.sample(rng.choice([(x1, y1), (y2, x2)]), 2)
+            try:
+                transfer_budget([leg(source, destination, '5.00')], user, "Stress")
+            except TransferError:
+                pass
+
+        self.assertEqual(self.run_workers(transfer), [])
+        self.assertEqual(sum(amounts(x1, y1, y2, x2)), Decimal('4000.00'))
+        incremental = snapshot_state()
+        rebuild_snapshots()
+        self.assertEqual(incremental, snapshot_state())
+
+    def test_parallel_transfers_conserve_budget_without_deadlocks(self):
+        fiscal_year = make_current_fiscal_year()
+        department = make_department()
+        allocations = [make_allocation(department, fiscal_year, amount=Decimal('1000.00'))
+                       for _ in range(3)]
+        user = make_user('FINANCE_HEAD')
+        refused = []
+        attempted = []
+
+        def transfer(rng):
+            # Pairs in both directions, and multi-leg batches over all three
+            first, second, third = rng.sample(allocations, 3)
+            legs = [leg(first, second, rng.choice(['10.00', '75.00', '400.00']))]
+            if rng.random() < 0.5:
+                legs.append(leg(second, third, '20.00'))
+            attempted.append(len(legs))
+            try:
+                transfer_budget(legs, user, "Stress")
+            except TransferError:
+                refused.append(legs)
+
+        errors = self.run_workers(transfer)
+        self.assertEqual(errors, [])
+        final = amounts(*allocations)
+        self.assertEqual(sum(final), Decimal('3000.00'))
+        self.assertTrue(all(amount >= 0 for amount in final))
+        self.assertEqual(
+            BudgetTransfer.objects.count() + sum(len(legs) for legs in refused), sum(attempted))
+        self.assertEqual(
+            JournalEntry.objects.filter(source_type='BUDGET_TRANSFER').count(),
+            BudgetTransfer.objects.count())
@@ -0,0 +1,84 @@
+import io
+from decimal import Decimal
+
+import openpyxl
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .factories import (
+    make_allocation, make_category, make_current_fiscal_year, make_department,
+    make_expense, make_user
+)
+
+
+class BudgetVarianceReportTestCase(APITestCase):
+    def setUp(self):
+        self.fiscal_year = make_current_fiscal_year()
+        self.department = make_department()
+        self.other_department = make_department()
+
+        self.root = make_category(name="Operations", level=1, classification='OPEX')
+        self.child = make_category(name="Utilities", level=2, parent_category=self.root)
+        self.leaf_a = make_category(name="Power", level=3, parent_category=self.child)
+        self.leaf_b = make_category(name="Water", level=3, parent_category=self.child)
+
+        alloc_a = make_allocation(
+            self.department, self.fiscal_year, amount=Decimal('1000.00'), category=self.leaf_a)
+        alloc_b = make_allocation(
+            self.other_department, self.fiscal_year, amount=Decimal('500.00'), category=self.leaf_b)
+        make_expense(alloc_a, amount=Decimal('200.00'))
+        make_expense(alloc_b, amount=Decimal('50.00'))
+
+    def _get(self, user, **params):
+        self.client.force_authenticate(user=user)
+        params['fiscal_year_id'] = self.fiscal_year.id
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('budget-variance-report'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response.data
+
+    def test_totals_roll_up_the_tree(self):
+        _, data = self._get(make_user('FINANCE_HEAD'))
+
+        self.assertEqual(len(data), 1)
+        root = data[0]
+        self.assertEqual(root['category'], "Operations")
+        self.assertEqual(root['budget'], Decimal('1500.00'))
+        self.assertEqual(root['actual'], Decimal('250.00'))
+        self.assertEqual(root['available'], Decimal('1250.00'))
+        leaves = root['children'][0]['children']
+        self.assertEqual([leaf['code'] for leaf in leaves], [self.leaf_a.code, self.leaf_b.code])
+
+    def test_general_user_only_sees_own_department(self):
+        _, data = self._get(make_user('GENERAL_USER', department=self.department))
+
+        self.assertEqual(data[0]['budget'], Decimal('1000.00'))
+        self.assertEqual(data[0]['actual'], Decimal('200.00'))
+
+    def test_query_count_does_not_grow_with_categories(self):
+        user = make_user('FINANCE_HEAD')
+        baseline, _ = self._get(user)
+
+        for _ in range(5):
+            root = make_category(level=1)
+            child = make_category(level=2, parent_category=root)
+            make_category(level=3, parent_category=child)
+
+        grown, data = self._get(user)
+        self.assertEqual(len(data), 6)
+        self.assertEqual(baseline, grown)
+
+    def test_excel_export_uses_same_totals(self):
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+        response = self.client.get(
+            reverse('budget-variance-export'), {'fiscal_year_id': self.fiscal_year.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content)
+        sheet = openpyxl.load_workbook(io.BytesIO(content)).active
+        rows = list(sheet.iter_rows(min_row=4, values_only=True))
+        self.assertEqual(rows[0], ("Operations", 1500, 250, 1250))
+        self.assertEqual(rows[2][0].strip(), "Power")
@@ -0,0 +1,93 @@
+import io
+import tracemalloc
+from decimal import Decimal
+
+import openpyxl
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import BudgetProposalItem
+from .factories import (
+    make_account, make_current_fiscal_year, make_department, make_project, make_user
+)
+
+
+class ProposalExcelExportTestCase(APITestCase):
+    def setUp(self):
+        self.fiscal_year = make_current_fiscal_year()
+        self.department = make_department()
+        self.account = make_account(name="Office Supplies")
+        self.proposals = [self._make_proposal(self.department, items=3) for _ in range(3)]
+        self.foreign = self._make_proposal(make_department(), items=1)
+
+    def _make_proposal(self, department, items):
+        proposal = make_project(department, self.fiscal_year).budget_proposal
+        BudgetProposalItem.objects.bulk_create([
+            BudgetProposalItem(
+                proposal=proposal, cost_element=f"CE-{n}", description=f"Item {n}",
+                estimated_cost=Decimal('100.50'), account=self.account, notes="")
+            for n in range(items)
+        ])
+        return proposal
+
+    def _workbook(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content)
+        return openpyxl.load_workbook(io.BytesIO(content))
+
+    def test_single_export_layout_and_named_styles(self):
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+        proposal = self.proposals[0]
+        response = self.client.get(reverse('budget-proposal-export', args=[proposal.id]))
+
+        sheet = self._workbook(response).active
+        self.assertEqual(sheet.title, "Budget Proposal")
+        self.assertEqual(sheet['A1'].value, "Title")
+        self.assertEqual(sheet['B1'].value, proposal.title)
+        self.assertEqual(sheet['A1'].style, 'bms_bold')
+        self.assertTrue(sheet['A1'].font.b)
+        self.assertEqual(sheet['A11'].value, "Account")
+        self.assertEqual(sheet['C12'].style, 'bms_bold')
+        self.assertEqual(sheet['C16'].value, "Total")
+        self.assertAlmostEqual(sheet['D16'].value, 301.5)
+
+    def test_bulk_export_writes_one_sheet_per_proposal(self):
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+        ids = ','.join(str(p.id) for p in self.proposals + [self.foreign])
+        response = self.client.get(reverse('budget-proposal-bulk-export'), {'ids': ids})
+
+        workbook = self._workbook(response)
+        self.assertEqual(len(workbook.sheetnames), 4)
+        self.assertTrue(workbook.sheetnames[0].startswith(f"{self.proposals[0].id} - "))
+        self.assertTrue(all(len(name) <= 31 for name in workbook.sheetnames))
+
+    def test_bulk_export_applies_data_isolation(self):
+        self.client.force_authenticate(user=make_user('GENERAL_USER', department=self.department))
+        ids = ','.join(str(p.id) for p in self.proposals + [self.foreign])
+        response = self.client.get(reverse('budget-proposal-bulk-export'), {'ids': ids})
+
+        self.assertEqual(len(self._workbook(response).sheetnames), 3)
+
+    def test_bulk_export_validates_ids(self):
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+        url = reverse('budget-proposal-bulk-export')
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'ids': 'a,b'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'ids': '999999'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_export_memory_is_bounded(self):
+        proposals = [self._make_proposal(self.department, items=200) for _ in range(40)]
+        self.client.force_authenticate(user=make_user('FINANCE_HEAD'))
+        ids = ','.join(str(p.id) for p in proposals)
+
+        tracemalloc.start()
+        response = self.client.get(reverse('budget-proposal-bulk-export'), {'ids': ids})
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(size, 0)
+        self.assertLess(peak, 32 * 1024 * 1024)
@@ -0,0 +1,174 @@
+"""
+Moving budget between allocations.
+
+Every transfer locks the allocations it touches in primary key order (see
+balances.lock_allocations), so two transfers over the same pair in opposite
+directions queue up instead of deadlocking. Amounts are applied with F()
+updates on the locked rows and the source balance is checked under the lock,
+so parallel transfers and expense approvals can neither lose updates nor
+overdraw an allocation. The snapshot cells are updated in one batch in cell key
+order, so transfers between different allocations that share cells do not
+deadlock either.
+
+transfer_budget() moves several source/destination legs atomically, recording
+an approved BudgetTransfer and a linked journal entry per leg.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import ledger, report_cache, snapshots
+from .balances import available_amount, lock_allocations
+from .models import BudgetAllocation, BudgetTransfer, JournalEntry, JournalEntryLine
+from .sequences import assign_journal_entry_ids
+
+
+TRANSFER_LEGS_MAX = 100
+
+
+class TransferError(Exception):
+    """A transfer that cannot be applied; nothing was written."""
+
+
+def move_allocation_amounts(changes):
+    """
+    Applies {allocation_id: signed_amount} to the allocations' budgets in one
+    transaction. Raises TransferError if an allocation is missing or a decrease
+    exceeds what is left of it. Returns the locked allocations keyed by ID.
+    """
+    with transaction.atomic():
+        locked = lock_allocations(changes)
+        missing = set(changes) - set(locked)
+        if missing:
+            raise TransferError(f"Budget allocation(s) not found: {', '.join(map(str, sorted(missing)))}.")
+
+        for allocation_id in sorted(changes):
+            allocation = locked[allocation_id]
+            amount = changes[allocation_id]
+            available = available_amount(allocation)
+            if amount < 0 and -amount > available:
+                raise TransferError(
+                    f"Insufficient funds in allocation {allocation_id}. "
+                    f"Available: {available:,.2f}, Requested: {-amount:,.2f}")
+
+        now = timezone.now()
+        moved = []
+        for allocation_id in sorted(changes):
+            amount = changes[allocation_id]
+            if not amount:
+                continue
+            allocation = locked[allocation_id]
+            BudgetAllocation.objects.filter(pk=allocation_id).update(
+                amount=F('amount') + amount, updated_at=now)
+            allocation.amount += amount
+            moved.append((allocation, amount))
+
+        # update() skips the allocation signals. Applying every snapshot delta at
+        # once touches the shared cells in key order, whatever the allocation order.
+        snapshots.allocation_amounts_changed(moved)
+        report_cache.fiscal_years_changed({allocation.fiscal_year_id for allocation, _ in moved})
+    return locked
+
+
+def _transfer_entry(transfer, user, date):
+    return JournalEntry(
+        date=date,
+        category='PROJECTS',
+        description=f"Budget Transfer: {transfer.reason}",
+        total_amount=transfer.amount,
+        status='POSTED',
+        department_id=transfer.source_allocation.department_id,
+        source_type='BUDGET_TRANSFER',
+        source_id=transfer.pk,
+        created_by_user_id=user.id,
+        created_by_username=getattr(user, 'username', 'N/A')
+    )
+
+
+def _transfer_lines(transfer, je):
+    source = transfer.source_allocation
+    destination = transfer.destination_allocation
+    return [
+        # CREDIT the source (money decreasing)
+        JournalEntryLine(
+            journal_entry=je,
+            account_id=source.account_id,
+            expense_category_id=source.category_id,
+            description=f"Transfer out of allocation {source.id}",
+            transaction_type='CREDIT',
+            journal_transaction_type='TRANSFER',
+            amount=transfer.amount
+        ),
+        # DEBIT the destination (money increasing)
+        JournalEntryLine(
+            journal_entry=je,
+            account_id=destination.account_id,
+            expense_category_id=destination.category_id,
+            description=f"Transfer into allocation {destination.id}",
+            transaction_type='DEBIT',
+            journal_transaction_type='TRANSFER',
+            amount=transfer.amount
+        ),
+    ]
+
+
+def transfer_budget(legs, user, reason, date=None):
+    """
+    Moves budget for every leg ({'source_allocation_id', 'destination_allocation_id',
+    'amount'}) in one transaction; either all legs are applied or none is.
+    Funds are checked on each allocation's net change across the legs.
+    Returns the created BudgetTransfer rows in leg order.
+    """
+    if not legs:
+        raise TransferError("At least one transfer leg is required.")
+    if len(legs) > TRANSFER_LEGS_MAX:
+        raise TransferError(f"A transfer can have at most {TRANSFER_LEGS_MAX} legs.")
+
+    changes = defaultdict(lambda: Decimal('0.00'))
+    for leg in legs:
+        if leg['source_allocation_id'] == leg['destination_allocation_id']:
+            raise TransferError("A transfer leg cannot move budget to its own source allocation.")
+        if leg['amount'] <= 0:
+            raise TransferError("Transfer amounts must be positive.")
+        changes[leg['source_allocation_id']] -= leg['amount']
+        changes[leg['destination_allocation_id']] += leg['amount']
+
+    date = date or timezone.now().date()
+    now = timezone.now()
+    with transaction.atomic():
+        allocations = move_allocation_amounts(dict(changes))
+        inactive = sorted(pk for pk, allocation in allocations.items() if not allocation.is_active)
+        if inactive:
+            raise TransferError(f"Budget allocation(s) are not active: {', '.join(map(str, inactive))}.")
+
+        transfers = BudgetTransfer.objects.bulk_create([
+            BudgetTransfer(
+                fiscal_year_id=allocations[leg['source_allocation_id']].fiscal_year_id,
+                source_allocation=allocations[leg['source_allocation_id']],
+                destination_allocation=allocations[leg['destination_allocation_id']],
+                transferred_by_user_id=user.id,
+                transferred_by_username=getattr(user, 'username', None),
+                amount=leg['amount'],
+                reason=reason,
+                status='APPROVED',
+                approved_by_user_id=user.id,
+                approved_by_username=getattr(user, 'username', None),
+                approval_date=now
+            )
+            for leg in legs
+        ])
+
+        entries = JournalEntry.objects.bulk_create(assign_journal_entry_ids(
+            [_transfer_entry(t, user, date) for t in transfers]))
+        lines = []
+        for t, je in zip(transfers, entries):
+            lines.extend(_transfer_lines(t, je))
+        JournalEntryLine.objects.bulk_create(lines)
+        # bulk_create skips the JournalEntry and JournalEntryLine signals
+        ledger.classify_journal_entries(entry.pk for entry in entries)
+        report_cache.journal_entries_changed([date])
+
+    return transfers
@@ -2,8 +2,8 @@ from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework.routers import DefaultRouter
 from .views_utils import get_server_time
-from .views_budget import AccountDropdownView, AccountSetupListView, BudgetAdjustmentView, BudgetProposalSummaryView, BudgetVarianceReportView, FiscalYearDropdownView, JournalEntryCreateView, JournalEntryListView, LedgerExportView, ProposalHistoryView, LedgerViewList, ProposalReviewBudgetOverview, export_budget_proposal_excel, export_budget_variance_excel, journal_choices, DepartmentDropdownView, AccountTypeDropdownView
-from . import views_expense, views_dashboard
+from .views_budget import AccountDropdownView, AccountSetupListView, BudgetAdjustmentView, BudgetProposalSummaryView, BudgetTransferBatchView, BudgetVarianceReportView, FiscalYearDropdownView, JournalEntryCreateView, JournalEntryListView, LedgerExportView, ProposalHistoryView, LedgerViewList, ProposalReviewBudgetOverview, export_budget_proposal_excel, export_budget_proposals_bulk_excel, export_budget_variance_excel, journal_choices, DepartmentDropdownView, AccountTypeDropdownView
+from . import views_expense, views_dashboard, views_exports
 from .views_dashboard import (
     DepartmentBudgetView, MonthlyBudgetActualViewSet, TopCategoryBudgetAllocationView,
     get_all_projects, get_dashboard_budget_summary, get_department_budget_status, get_forecast_accuracy,
@@ -62,6 +62,8 @@ urlpatterns = [
          ProposalHistoryView.as_view(), name='proposal-history'),
     path('budget-proposals/<int:proposal_id>/export/',
          export_budget_proposal_excel, name='budget-proposal-export'),
+    path('budget-proposals/export/',
+         export_budget_proposals_bulk_excel, name='budget-proposal-bulk-export'),
     path('budget-proposals/<int:proposal_id>/review-overview/',
          ProposalReviewBudgetOverview.as_view(), name='proposal-review-overview'),
    
@@ -70,11 +72,19 @@ urlpatterns = [
          name='journal-entry-list'),
     path('budget-adjustments/', BudgetAdjustmentView.as_view(),
          name='budget-adjustment-create'),
+    path('budget-transfers/batch/', BudgetTransferBatchView.as_view(),
+         name='budget-transfer-batch'),
 
     # --- Ledger Endpoints ---
     path('ledger/', LedgerViewList.as_view(), name='ledger-view'),
     path('ledger/export/', LedgerExportView.as_view(), name='ledger-export'),
 
+    # --- Background Export Jobs ---
+    path('exports/', views_exports.export_jobs, name='export-jobs'),
+    path('exports/<int:job_id>/', views_exports.export_job_detail, name='export-job-detail'),
+    path('exports/<int:job_id>/download/', views_exports.export_job_download,
+         name='export-job-download'),
+
     # --- Report Endpoints ---
     path('reports/budget-variance/', BudgetVarianceReportView.as_view(),
          name='budget-variance-report'),
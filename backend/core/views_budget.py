@@ -1,14 +1,10 @@
-import csv
 import json
 from decimal import Decimal
 
 import requests
-import openpyxl
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, PatternFill
 
 from django.db import transaction
-from django.db.models import Sum, Q, DecimalField
+from django.db.models import Sum, Q
 from django.db.models.functions import Coalesce
 from django.http import HttpResponse
 from django.utils import timezone
@@ -25,18 +21,30 @@ from drf_spectacular.utils import (
 )
 
 from .models import (
-    Account, AccountType, BudgetProposal, Department, ExpenseCategory,
+    Account, AccountType, BudgetProposal, Department,
     FiscalYear, BudgetAllocation, Expense, JournalEntry, JournalEntryLine,
     ProposalComment, ProposalHistory, UserActivityLog, Project
 )
 from .permissions import CanSubmitForApproval, IsTrustedService, IsBMSFinanceHead, IsBMSUser, IsBMSAdmin
-from .pagination import FiveResultsSetPagination, SixResultsSetPagination, StandardResultsSetPagination
+from .pagination import (
+    FiveResultsSetPagination, JournalEntryPagination, LedgerPagination, SixResultsSetPagination,
+    StandardResultsSetPagination
+)
+from .exports import (
+    LEDGER_EXPORT_HEADER, build_variance_workbook, iter_ledger_rows, new_workbook, sheet_title,
+    streaming_csv_response, write_proposal_sheet, xlsx_response
+)
+from .ledger import ledger_lines_queryset
+from .rollups import annotate_account_accomplishment, annotate_proposal_summaries, category_variance_tree
 from .serializers import FiscalYearSerializer
+from .transfers import TransferError, move_allocation_amounts, transfer_budget
 from .serializers_budget import (
     AccountDropdownSerializer,
     AccountSetupSerializer,
     AccountTypeDropdownSerializer,
     BudgetAdjustmentSerializer,
+    BudgetTransferBatchSerializer,
+    BudgetTransferSerializer,
     BudgetProposalListSerializer,
     BudgetProposalMessageSerializer,
     ProposalCommentCreateSerializer,
@@ -168,7 +176,8 @@ class ProposalHistoryView(generics.ListAPIView):
         qs = ProposalHistory.objects.select_related(
             'proposal__department'
         ).prefetch_related(
-            'proposal__items__account__account_type'  # Add prefetch for better performance
+            'proposal__items__account__account_type',  # Add prefetch for better performance
+            'proposal__items__category'
         ).all()
 
         # Search by ticket ID or proposal title
@@ -222,8 +231,7 @@ class AccountSetupListView(generics.ListAPIView):
     # queryset defined in get_queryset to ensure it's dynamic if needed
 
     def get_queryset(self):
-        qs = Account.objects.select_related(
-            'account_type').prefetch_related('allocations')
+        qs = Account.objects.select_related('account_type')
         search = self.request.query_params.get('search')
         # Changed from 'type' to avoid clash with built-in
         acc_type_name = self.request.query_params.get('type')
@@ -248,7 +256,8 @@ class AccountSetupListView(generics.ListAPIView):
             fiscal_year = FiscalYear.objects.get(id=fiscal_year_id)
         except FiscalYear.DoesNotExist:
             return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
-        queryset = self.filter_queryset(self.get_queryset())
+        queryset = annotate_account_accomplishment(
+            self.filter_queryset(self.get_queryset()), fiscal_year)
         page = self.paginate_queryset(queryset)
         # Pass request to context
         serializer_context = {'request': request, 'fiscal_year': fiscal_year}
@@ -286,69 +295,15 @@ class FiscalYearDropdownView(generics.ListAPIView):
 )
 class LedgerViewList(generics.ListAPIView):
     serializer_class = LedgerViewSerializer
-    pagination_class = FiveResultsSetPagination
+    pagination_class = LedgerPagination
     permission_classes = [IsBMSUser]  # Changed from IsAuthenticated
 
     def get_queryset(self):
-        queryset = JournalEntryLine.objects.select_related(
-            'journal_entry',
-            'account',
-            'journal_entry__department',
-            'expense_category'
-        )
-
-        queryset = queryset.filter(expense_category__isnull=False)
-
-        # --- DATA ISOLATION LOGIC ---
         user = self.request.user
-        user_roles = getattr(user, 'roles', {})
-        bms_role = user_roles.get('bms')
-
-        if bms_role == 'GENERAL_USER':
-            department_id = getattr(user, 'department_id', None)
-            if department_id:
-                # Filter lines where the parent Journal Entry belongs to the user's department
-                queryset = queryset.filter(
-                    journal_entry__department_id=department_id)
-            else:
-                return JournalEntryLine.objects.none()
-
-        search = self.request.query_params.get('search')
-        category = self.request.query_params.get('category')
-        transaction_type = self.request.query_params.get('transaction_type')
-        department_filter = self.request.query_params.get(
-            'department_id') or self.request.query_params.get('department')
-
-        if search:
-            queryset = queryset.filter(
-                Q(journal_entry__entry_id__icontains=search) |
-                Q(journal_entry__date__icontains=search) |
-                Q(journal_entry__description__icontains=search) |
-                Q(description__icontains=search) |
-                Q(expense_category__name__icontains=search) |
-                Q(account__name__icontains=search) |
-                Q(account__code__icontains=search)
-            )
-
-        if category:
-            if category.upper() in ['CAPEX', 'OPEX']:
-                queryset = queryset.filter(
-                    expense_category__classification__iexact=category
-                )
-            else:
-                queryset = queryset.filter(
-                    expense_category__name__icontains=category
-                )
-
-        if transaction_type:
-            queryset = queryset.filter(
-                journal_transaction_type__iexact=transaction_type)
-
-        if department_filter:
-            queryset = queryset.filter(
-                journal_entry__department_id=department_filter)
-
-        return queryset.order_by('-journal_entry__date', 'journal_entry__entry_id')
+        return ledger_lines_queryset(
+            self.request.query_params,
+            bms_role=getattr(user, 'roles', {}).get('bms'),
+            department_id=getattr(user, 'department_id', None))
 
 
 @extend_schema(
@@ -374,30 +329,15 @@ class LedgerExportView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # This logic reuses the get_queryset from LedgerViewList for consistency
-        list_view = LedgerViewList()
-        list_view.request = request  # Mock the request for the view
-        queryset = list_view.get_queryset()
-
-        response = HttpResponse(
-            content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; filename="ledger_export.csv"'
-
-        writer = csv.writer(response)
-        # UPDATED: Match the new table columns
-        writer.writerow(['Reference ID', 'Date', 'Category',
-                        'Description', 'Account', 'Amount (PHP)'])
-
-        for line in queryset:
-            writer.writerow([
-                line.journal_entry.entry_id,
-                line.journal_entry.date.strftime('%Y-%m-%d'),
-                line.journal_entry.category,
-                line.description.replace('\n', ' ').strip(),
-                line.account.name,
-                "{:,.2f}".format(line.amount)
-            ])
-        return response
+        # Same filters and data isolation as LedgerViewList
+        queryset = ledger_lines_queryset(
+            request.query_params,
+            bms_role=getattr(request.user, 'roles', {}).get('bms'),
+            department_id=getattr(request.user, 'department_id', None))
+
+        # Stream the rows so memory stays flat for full-year exports
+        return streaming_csv_response(
+            'ledger_export.csv', LEDGER_EXPORT_HEADER, iter_ledger_rows(queryset))
 
 # Views of the Journal Entry page
 
@@ -415,14 +355,14 @@ class LedgerExportView(APIView):
 )
 class JournalEntryListView(generics.ListAPIView):
     serializer_class = JournalEntryListSerializer
-    pagination_class = FiveResultsSetPagination
+    pagination_class = JournalEntryPagination
     # CHANGED: From IsAuthenticated to IsBMSUser
     permission_classes = [IsBMSUser]
     search_fields = ['entry_id', 'description', 'lines__account__name']
 
     def get_queryset(self):
         qs = JournalEntry.objects.prefetch_related(
-            'lines__account', 'lines__expense_category', 'department'
+            'lines__account', 'department'
         ).all()
 
         # --- MODIFICATION START: Data Isolation ---
@@ -450,7 +390,8 @@ class JournalEntryListView(generics.ListAPIView):
         if category:
             if category.upper() in ['CAPEX', 'OPEX']:
                 qs = qs.filter(
-                    lines__expense_category__classification__iexact=category).distinct()
+                    lines__expense_category__isnull=False,
+                    lines__classification=category.upper()).distinct()
             else:
                 qs = qs.filter(category__iexact=category)
 
@@ -574,15 +515,22 @@ class BudgetProposalUIViewSet(viewsets.ReadOnlyModelViewSet):
     ]
     filterset_fields = ['status']
 
+    def proposals(self):
+        """Proposals with the totals and latest-review fields the serializers read."""
+        queryset = annotate_proposal_summaries(
+            BudgetProposal.objects.filter(is_deleted=False).select_related('department', 'fiscal_year'))
+        if self.action != 'list':
+            # The detail serializer nests the items and comments
+            queryset = queryset.prefetch_related('items__account__account_type', 'comments')
+        return queryset
+
     def get_queryset(self):
         """
         Dynamically filters the queryset based on user role for data isolation.
         """
         user = self.request.user
         # Base query
-        base_queryset = BudgetProposal.objects.filter(is_deleted=False).select_related(
-            'department', 'fiscal_year'
-        ).prefetch_related('items__account__account_type', 'comments', 'items__category')
+        base_queryset = self.proposals()
 
         user_roles = getattr(user, 'roles', {})
         bms_role = user_roles.get('bms')
@@ -757,6 +705,8 @@ class BudgetProposalUIViewSet(viewsets.ReadOnlyModelViewSet):
                 proposal.sync_status = 'FAILED'
                 proposal.save(update_fields=['sync_status'])
 
+        # Reload so the annotations and prefetched comments include this review
+        proposal = self.proposals().get(pk=proposal.pk)
         output_serializer = BudgetProposalDetailSerializer(
             proposal, context={'request': request})
         return Response(output_serializer.data, status=status.HTTP_200_OK)
@@ -1113,86 +1063,96 @@ def export_budget_proposal_excel(request, proposal_id):
         print(f"Error logging export activity: {e}")
     # --- END: Optional User Activity Logging ---
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Budget Proposal"
+    # Write-only workbook: rows are flushed as they are written
+    wb = new_workbook()
+    write_proposal_sheet(wb, proposal)
 
-    # Header section
-    header_labels = [
-        "Title", "Project Summary", "Project Description",
-        "Performance Start", "Performance End", "Performance Notes",
-        "Department", "Submitted By", "Status"
-    ]
-    header_values = [
-        proposal.title,
-        proposal.project_summary,
-        proposal.project_description,
-        proposal.performance_start_date.strftime("%Y-%m-%d"),
-        proposal.performance_end_date.strftime("%Y-%m-%d"),
-        getattr(proposal, 'performance_notes', ''),
-        proposal.department.name,
-        proposal.submitted_by_name or "N/A",
-        proposal.status
-    ]
-    for i, (label, value) in enumerate(zip(header_labels, header_values), start=1):
-        ws.append([label, value])
-        ws.cell(row=i, column=1).font = Font(
-            bold=True)  # Bold the header label
-
-    ws.append([])  # Blank row
-
-    # able Header
-    table_header = ["Account", "Cost Element",
-                    "Description", "Estimated Cost", "Notes"]
-    ws.append(table_header)
-    table_header_row = ws.max_row
-    for col in range(1, len(table_header) + 1):
-        ws.cell(row=table_header_row, column=col).font = Font(bold=True)
-
-    # Line Items
-    total_cost = 0
-    for item in proposal.items.all():
-        ws.append([
-            item.account.name if item.account else "N/A",
-            item.cost_element,
-            item.description,
-            float(item.estimated_cost),
-            item.notes or ""
-        ])
-        total_cost += item.estimated_cost
-
-    # Total Row
-    ws.append([])
-    total_row = ws.max_row + 1
-    ws.append(["", "", "Total", float(total_cost)])
-
-    # Bold "Total", "Estimated Cost" header, and the summed value
-    ws.cell(row=table_header_row, column=4).font = Font(
-        bold=True)  # "Estimated Cost" header
-    ws.cell(row=table_header_row, column=5).font = Font(
-        bold=True)  # "Notes" header
-    ws.cell(row=total_row, column=3).font = Font(
-        bold=True)         # "Total" label
-    ws.cell(row=total_row, column=4).font = Font(
-        bold=True)         # summed value
-
-    # Bold all "Description" column cells (header and values)
-    for row in range(table_header_row, ws.max_row + 1):
-        ws.cell(row=row, column=3).font = Font(bold=True)
-
-    # Auto size columns
-    for col in ws.columns:
-        max_length = max(len(str(cell.value)) for cell in col)
-        ws.column_dimensions[get_column_letter(
-            col[0].column)].width = max(max_length + 2, 12)
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    filename = f"budget_proposal_{proposal.id}.xlsx"
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    wb.save(response)
-
-    return response
+    return xlsx_response(wb, f"budget_proposal_{proposal.id}.xlsx")
+
+
+BULK_PROPOSAL_EXPORT_MAX = 200
+
+
+@extend_schema(
+    tags=["Budget Proposal Export"],
+    summary="Export several budget proposals to one Excel workbook",
+    description=(
+        "Exports the given proposals into a single XLSX file with one sheet per proposal. "
+        f"Accepts up to {BULK_PROPOSAL_EXPORT_MAX} comma-separated IDs. "
+        "General users can only export proposals of their own department."
+    ),
+    parameters=[
+        OpenApiParameter(name="ids", required=True, type=str,
+                         description="Comma-separated proposal IDs, e.g. 1,2,3")
+    ],
+    responses={
+        200: OpenApiResponse(description="XLSX file with one sheet per proposal"),
+        400: OpenApiResponse(description="Missing or invalid ids"),
+        404: OpenApiResponse(description="None of the proposals were found"),
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsBMSUser])
+def export_budget_proposals_bulk_excel(request):
+    raw_ids = request.query_params.get('ids', '')
+    try:
+        proposal_ids = list(dict.fromkeys(
+            int(value) for value in raw_ids.split(',') if value.strip()))
+    except ValueError:
+        return Response({"error": "ids must be a comma-separated list of integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not proposal_ids:
+        return Response({"error": "ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(proposal_ids) > BULK_PROPOSAL_EXPORT_MAX:
+        return Response(
+            {"error": f"A maximum of {BULK_PROPOSAL_EXPORT_MAX} proposals can be exported at once."},
+            status=status.HTTP_400_BAD_REQUEST)
+
+    proposals = BudgetProposal.objects.filter(
+        id__in=proposal_ids, is_deleted=False)
+
+    # DATA ISOLATION
+    user = request.user
+    bms_role = getattr(user, 'roles', {}).get('bms')
+    if bms_role == 'GENERAL_USER':
+        department_id = getattr(user, 'department_id', None)
+        if department_id:
+            proposals = proposals.filter(department_id=department_id)
+        else:
+            proposals = proposals.none()
+
+    proposals = proposals.select_related('department').prefetch_related(
+        'items__account').order_by('id')
+
+    # Proposals are loaded in small chunks and written sheet by sheet, so only one
+    # chunk of proposals is held in memory while the workbook spools to disk.
+    wb = new_workbook()
+    used_titles = set()
+    exported_ids = []
+    for proposal in proposals.iterator(chunk_size=20):
+        write_proposal_sheet(
+            wb, proposal, title=sheet_title(f"{proposal.id} - {proposal.title}", used_titles))
+        exported_ids.append(proposal.id)
+
+    if not exported_ids:
+        return Response({"error": "No proposals found."}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        UserActivityLog.objects.create(
+            user_id=request.user.id,  # From JWT
+            user_username=getattr(request.user, 'username', 'N/A'),  # From JWT
+            log_type='EXPORT',
+            action=f'Exported {len(exported_ids)} budget proposals to Excel',
+            status='SUCCESS',
+            details={
+                'proposal_ids': exported_ids,
+                'export_format': 'xlsx'
+            }
+        )
+    except Exception as e:
+        print(f"Error logging export activity: {e}")
+
+    return xlsx_response(wb, "budget_proposals_export.xlsx")
 
 
 # MODIFICATION START
@@ -1304,73 +1264,24 @@ class BudgetVarianceReportView(APIView):
             print(f"Error logging report generation activity: {e}")
         # --- END: Optional User Activity Logging ---
 
-        top_categories = ExpenseCategory.objects.filter(
-            level=1, is_active=True)
-
-        def aggregate_node(category):
-            # 1. Budget Calculation
-            budget_qs = BudgetAllocation.objects.filter(
-                category=category, fiscal_year=fiscal_year, is_active=True
-            )
-            # Apply Dept Filter
-            if filter_dept_id:
-                budget_qs = budget_qs.filter(department_id=filter_dept_id)
-
-            budget = budget_qs.aggregate(total=Coalesce(
-                Sum('amount'), 0, output_field=DecimalField()))['total']
-
-            # 2. Actual Calculation
-            actual_qs = Expense.objects.filter(
-                category=category,
-                budget_allocation__fiscal_year=fiscal_year,
-                status='APPROVED'
-            )
+        # Whole category tree with its budget/actual sums in three queries
+        tree = category_variance_tree(
+            fiscal_year, department_id=filter_dept_id, month=month)
 
-            # Apply Dept Filter
-            if filter_dept_id:
-                actual_qs = actual_qs.filter(department_id=filter_dept_id)
-
-            if month:
-                actual_qs = actual_qs.filter(date__month=month)
-
-            actual = actual_qs.aggregate(total=Coalesce(
-                Sum('amount'), 0, output_field=DecimalField()))['total']
-
-            available = budget - actual
-            children = []
-
-            for child in category.subcategories.all():
-                children.append(aggregate_node(child))
-
-            # Aggregate child totals if exists
-            if children:
-                child_budget = sum(c['budget'] for c in children)
-                child_actual = sum(c['actual'] for c in children)
-                child_available = child_budget - child_actual
-                return {
-                    "category": category.name,
-                    "code": category.code,
-                    "level": category.level,
-                    "classification": category.classification,  # Ensure field exists
-                    "budget": round(child_budget, 2),
-                    "actual": round(child_actual, 2),
-                    "available": round(child_available, 2),
-                    "children": children
-                }
-            else:
-                return {
-                    "category": category.name,
-                    "code": category.code,
-                    "level": category.level,
-                    "classification": category.classification,  # Ensure field exists
-                    "budget": round(budget, 2),
-                    "actual": round(actual, 2),
-                    "available": round(available, 2),
-                    "children": []
-                }
-        # Builds nested dictionariers, each representing top level expense categories, and its full budget/actual/available breakdown (and subcategories)
-        # aggregate_node(cat) - recursive function that computes budget, actual, and available amounts for given category (and all its children if any)
-        result = [aggregate_node(cat) for cat in top_categories]
+        def format_node(node):
+            category = node['category']
+            return {
+                "category": category.name,
+                "code": category.code,
+                "level": category.level,
+                "classification": category.classification,  # Ensure field exists
+                "budget": round(node['budget'], 2),
+                "actual": round(node['actual'], 2),
+                "available": round(node['available'], 2),
+                "children": [format_node(child) for child in node['children']]
+            }
+        # Builds nested dictionaries, each representing top level expense categories, and its full budget/actual/available breakdown (and subcategories)
+        result = [format_node(node) for node in tree]
         return Response(result)
 
 
@@ -1462,116 +1373,8 @@ def export_budget_variance_excel(request):
     except FiscalYear.DoesNotExist:
         return Response({"error": "Fiscal Year not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    # Re-use the logic from BudgetVarianceReportView to get the data
-    top_categories = ExpenseCategory.objects.filter(level=1, is_active=True)
-
-    def aggregate_node(category):
-        # Budget (whole year, not filtered by month)
-        budget = BudgetAllocation.objects.filter(
-            category=category, fiscal_year=fiscal_year, is_active=True
-        ).aggregate(total=Coalesce(Sum('amount'), 0, output_field=DecimalField()))['total']
-
-        # FIXED: Apply month filter to actual expenses (same as display endpoint)
-        actual_qs = Expense.objects.filter(
-            category=category,
-            budget_allocation__fiscal_year=fiscal_year,
-            status='APPROVED'
-        )
-
-        # Apply month filter if provided
-        if month:
-            actual_qs = actual_qs.filter(date__month=month)
-
-        actual = actual_qs.aggregate(
-            total=Coalesce(Sum('amount'), 0, output_field=DecimalField())
-        )['total']
-
-        children_data = [aggregate_node(child)
-                         for child in category.subcategories.all()]
-
-        if children_data:
-            child_budget = sum(c['budget'] for c in children_data)
-            child_actual = sum(c['actual'] for c in children_data)
-            return {
-                "name": category.name,
-                "budget": child_budget,
-                "actual": child_actual,
-                "available": child_budget - child_actual,
-                "children": children_data
-            }
-        else:
-            return {
-                "name": category.name,
-                "budget": budget,
-                "actual": actual,
-                "available": budget - actual,
-                "children": []
-            }
-
-    report_data = [aggregate_node(cat) for cat in top_categories]
-
-    # --- Excel Generation ---
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Budget Variance Report"
-
-    # IMPROVED: Add month info to title if filtering
-    if month:
-        ws.append(
-            [f"Budget Variance Report - {fiscal_year.name} (Month: {month})"])
-    else:
-        ws.append([f"Budget Variance Report - {fiscal_year.name} (Full Year)"])
-    ws.merge_cells('A1:D1')
-    ws.cell(row=1, column=1).font = Font(bold=True, size=12)
-    ws.append([])  # Blank row
-
-    header = ["Category", "Budget", "Actual", "Available"]
-    ws.append(header)
-    for col in range(1, len(header) + 1):
-        ws.cell(row=3, column=col).font = Font(bold=True)
-        # IMPROVED: Add currency number format
-        if col > 1:  # Budget, Actual, Available columns
-            ws.cell(row=3, column=col).number_format = '#,##0.00'
-
-    def write_rows(data, indent=0, start_row=4):
-        current_row = start_row
-        for item in data:
-            ws.append([
-                f"{' ' * indent * 4}{item['name']}",
-                item['budget'],
-                item['actual'],
-                item['available']
-            ])
-            # Apply currency format
-            for col in range(2, 5):  # Columns B, C, D
-                ws.cell(row=current_row, column=col).number_format = '#,##0.00'
-
-            current_row += 1
-            if item.get('children'):
-                current_row = write_rows(
-                    item['children'], indent + 1, current_row)[1]
-        return current_row, current_row
-
-    write_rows(report_data)
-
-    # Auto-size columns
-    ws.column_dimensions['A'].width = 30
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 15
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-    # IMPROVED: Include month in filename
-    if month:
-        filename = f"budget_variance_report_{fiscal_year.name}_month{month}.xlsx"
-    else:
-        filename = f"budget_variance_report_{fiscal_year.name}.xlsx"
-
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    wb.save(response)
-    return response
+    workbook, filename = build_variance_workbook(fiscal_year, month)
+    return xlsx_response(workbook, filename)
 
 
 @extend_schema(
@@ -1598,16 +1401,17 @@ class BudgetAdjustmentView(generics.CreateAPIView):
 
         with transaction.atomic():
             # 1. Update Allocations (Real Impact)
+            # Locked in ID order with the source's balance re-checked under the lock
+            # (see core/transfers.py), so concurrent adjustments cannot deadlock or overdraw.
+            changes = {}
             if source_alloc:
-                source_alloc.amount -= amount  # Reduce source
-                if source_alloc.amount < 0:
-                    raise serializers.ValidationError(
-                        "Source allocation cannot go negative")
-                source_alloc.save()
-
+                changes[source_alloc.id] = -amount  # Reduce source
             if dest_alloc:
-                dest_alloc.amount += amount  # Increase destination
-                dest_alloc.save()
+                changes[dest_alloc.id] = changes.get(dest_alloc.id, 0) + amount  # Increase destination
+            try:
+                move_allocation_amounts(changes)
+            except TransferError as e:
+                raise serializers.ValidationError(str(e))
 
             # 2. Create Journal Entry (Audit)
             je = JournalEntry.objects.create(
@@ -1652,3 +1456,29 @@ class BudgetAdjustmentView(generics.CreateAPIView):
         self.perform_create(serializer)
         response_serializer = JournalEntryListSerializer(self.created_instance)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+
+
+@extend_schema(
+    tags=["Budget Adjustment Page"],
+    summary="Transfer budget between several allocations at once",
+    description=(
+        "Moves budget for every source/destination leg in one transaction: either all legs are "
+        "applied or none is. Funds are checked on each allocation's net change. Each leg is "
+        "recorded as an approved BudgetTransfer with a linked journal entry."),
+    request=BudgetTransferBatchSerializer,
+    responses={201: BudgetTransferSerializer(many=True)}
+)
+class BudgetTransferBatchView(generics.CreateAPIView):
+    permission_classes = [IsBMSFinanceHead]
+    serializer_class = BudgetTransferBatchSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            transfers = transfer_budget(
+                data['legs'], request.user, data['reason'], date=data.get('date'))
+        except TransferError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(BudgetTransferSerializer(transfers, many=True).data, status=status.HTTP_201_CREATED)
@@ -10,6 +10,12 @@ from django.db.models import Subquery, OuterRef, Q
 from core.permissions import IsBMSUser
 from core.pagination import ProjectStatusPagination, StandardResultsSetPagination
 from .models import Department, ExpenseCategory, FiscalYear, BudgetAllocation, Expense, Forecast, Project
+from .fiscal_years import active_fiscal_year
+from .report_cache import cached_report
+from .rollups import (
+    annotate_allocation_spent, budget_actual_totals, category_budget_rollup,
+    department_budget_rollup, monthly_budget_vs_actual
+)
 from .serializers import DepartmentBudgetSerializer
 from .serializers_dashboard import CategoryAllocationSerializer, CategoryBudgetStatusSerializer, DashboardBudgetSummarySerializer, DepartmentBudgetStatusSerializer, ForecastAccuracySerializer, ProjectStatusSerializer, SimpleProjectSerializer, ProjectDetailSerializer
 from rest_framework.permissions import IsAuthenticated
@@ -22,7 +28,7 @@ from django.utils import timezone
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 from .serializers_dashboard import ForecastSerializer
-from django.views.decorators.cache import cache_page
+from django.utils.decorators import method_decorator
 
 
 class DepartmentBudgetView(views.APIView):
@@ -63,6 +69,7 @@ class DepartmentBudgetView(views.APIView):
             )
         ]
     )
+    @method_decorator(cached_report('department-budgets'))
     def get(self, request):
         fiscal_year_id = request.query_params.get('fiscal_year_id')
 
@@ -77,7 +84,7 @@ class DepartmentBudgetView(views.APIView):
         # Get all departments with active allocations via projects & proposals
         departments = Department.objects.filter(
             is_active=True,
-            budgetproposal__project__budget__is_active=True,
+            budgetproposal__project__allocations__is_active=True,
             budgetproposal__fiscal_year=fiscal_year
         ).distinct()
 
@@ -161,6 +168,7 @@ def get_period_divisor(period):
 )
 @api_view(['GET'])
 @permission_classes([IsBMSUser])
+@cached_report('dashboard-budget-summary', fiscal_year_param=None)
 def get_dashboard_budget_summary(request):
     # MODIFICATION START
     user = request.user
@@ -168,11 +176,7 @@ def get_dashboard_budget_summary(request):
     bms_role = user_roles.get('bms')
 
     today = timezone.now().date()
-    fiscal_year = FiscalYear.objects.filter(
-        start_date__lte=today,
-        end_date__gte=today,
-        is_active=True
-    ).first()
+    fiscal_year = active_fiscal_year(request)
 
     if not fiscal_year:
         return Response({"detail": "No active fiscal year found."}, status=404)
@@ -196,23 +200,22 @@ def get_dashboard_budget_summary(request):
         start_date_filter = fiscal_year.start_date
         end_date_filter = fiscal_year.end_date
 
-    # Base allocations
-    allocations_qs = BudgetAllocation.objects.filter(
-        is_active=True,
-        fiscal_year=fiscal_year
-    )
-
     # Data Isolation
+    department_ids = None
     if bms_role == 'GENERAL_USER':
         department_id = getattr(user, 'department_id', None)
-        if department_id:
-            allocations_qs = allocations_qs.filter(department_id=department_id)
-        else:
-            allocations_qs = BudgetAllocation.objects.none()
+        department_ids = [department_id] if department_id else []
+
+    # Budget and period spend come from the pre-aggregated snapshot cells
+    totals = budget_actual_totals(
+        fiscal_year,
+        department_ids=department_ids,
+        start_date=start_date_filter,
+        end_date=end_date_filter
+    )
 
     # 1. Total Yearly Budget (Base)
-    total_yearly_budget = allocations_qs.aggregate(
-        total=Sum('amount'))['total'] or Decimal('0.00')
+    total_yearly_budget = totals['budget']
 
     # 2. Divisor for Period
     divisor = get_period_divisor(period)
@@ -221,12 +224,7 @@ def get_dashboard_budget_summary(request):
     total_budget_for_period = total_yearly_budget / divisor
 
     # 4. Calculate Actual Spent (In this specific timeframe)
-    # Note: We filter expenses by the calculated date range
-    total_spent_for_period = Expense.objects.filter(
-        budget_allocation__in=allocations_qs,
-        status='APPROVED',
-        date__range=[start_date_filter, end_date_filter]
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+    total_spent_for_period = totals['spent']
 
     # 5. Remaining
     remaining_budget = total_budget_for_period - total_spent_for_period
@@ -280,6 +278,7 @@ class MonthlyBudgetActualViewSet(viewsets.ViewSet):
             )
         ]
     )
+    @method_decorator(cached_report('monthly-budget-actual'))
     def list(self, request):
         """
         Get monthly budget vs actual data for a specific department and fiscal year.
@@ -347,63 +346,20 @@ class MonthlyBudgetActualViewSet(viewsets.ViewSet):
         This method distributes the annual budget across months based on fiscal year
         duration and retrieves actual expenses by month
         """
-        result = []
-
-        # Get start and end months within this fiscal year
-        start_month = fiscal_year.start_date.month
-        start_year = fiscal_year.start_date.year
-        end_month = fiscal_year.end_date.month
-        end_year = fiscal_year.end_date.year
-
-        # Calculate total months in fiscal year
-        total_months = (end_year - start_year) * 12 + \
-            (end_month - start_month) + 1
-
-        # If total months is zero (invalid fiscal year), return empty result
-        if total_months <= 0:
-            return result
-
-        # Distribute budget evenly across months (simple approach)
-        monthly_budget = total_budget / total_months
-
-        # For each month in the fiscal year
-        current_year = start_year
-        current_month = start_month
-
-        for _ in range(total_months):
-            # Base query for expenses in this month
-            expense_query = Expense.objects.filter(
-                department=department,
-                status='APPROVED',
-                date__year=current_year,
-                date__month=current_month,
-                budget_allocation__fiscal_year=fiscal_year
-            )
-
-            # Apply project filter if specified
-            if project_id:
-                expense_query = expense_query.filter(project_id=project_id)
-
-            # Get actual expenses for this month
-            actual_expenses = expense_query.aggregate(
-                total=Sum('amount'))['total'] or 0
-
-            # Add to result
-            result.append({
-                'month': current_month,
-                'month_name': calendar.month_name[current_month],
-                'budget': monthly_budget,
-                'actual': actual_expenses
-            })
+        expense_query = Expense.objects.filter(
+            department=department,
+            status='APPROVED',
+            budget_allocation__fiscal_year=fiscal_year
+        )
 
-            # Move to next month
-            if current_month == 12:
-                current_month = 1
-                current_year += 1
-            else:
-                current_month += 1
+        # Apply project filter if specified
+        if project_id:
+            expense_query = expense_query.filter(project_id=project_id)
 
-        return result
+        # One month-bucketed query for the whole fiscal year
+        return monthly_budget_vs_actual(
+            expense_query, fiscal_year.start_date, fiscal_year.end_date, total_budget
+        )
 
     @extend_schema(
 
@@ -512,54 +468,15 @@ class MonthlyBudgetActualViewSet(viewsets.ViewSet):
         This distributes the budget according to project duration rather than 
         fiscal year, which is likely more accurate for project-specific views.
         """
-        result = []
-
-        # Get project start and end months
-        start_month = project.start_date.month
-        start_year = project.start_date.year
-        end_month = project.end_date.month
-        end_year = project.end_date.year
-
-        # Calculate total months in project
-        total_months = (end_year - start_year) * 12 + \
-            (end_month - start_month) + 1
-
-        # If total months is zero (invalid project dates), return empty result
-        if total_months <= 0:
-            return result
-
-        # Distribute budget evenly across months
-        monthly_budget = budget_allocation.amount / Decimal(total_months)
-
-        # For each month in the project
-        current_year = start_year
-        current_month = start_month
-
-        for _ in range(total_months):
-            # Get actual expenses for this month
-            actual_expenses = Expense.objects.filter(
-                project=project,
-                status='APPROVED',
-                date__year=current_year,
-                date__month=current_month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-
-            # Add to result
-            result.append({
-                'month': current_month,
-                'month_name': calendar.month_name[current_month],
-                'budget': monthly_budget,
-                'actual': actual_expenses
-            })
-
-            # Move to next month
-            if current_month == 12:
-                current_month = 1
-                current_year += 1
-            else:
-                current_month += 1
+        expense_query = Expense.objects.filter(
+            project=project,
+            status='APPROVED'
+        )
 
-        return result
+        # One month-bucketed query for the whole project duration
+        return monthly_budget_vs_actual(
+            expense_query, project.start_date, project.end_date, budget_allocation.amount
+        )
 
 
 @extend_schema(
@@ -571,7 +488,7 @@ class MonthlyBudgetActualViewSet(viewsets.ViewSet):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_all_projects(request):
-    projects = Project.objects.all()
+    projects = Project.objects.prefetch_related('fiscal_years')
     serializer = SimpleProjectSerializer(projects, many=True)
     return Response(serializer.data)
 
@@ -629,16 +546,12 @@ def get_all_projects(request):
 )
 @api_view(['GET'])
 @permission_classes([IsBMSUser])  # MODIFIED: Use specific BMS permission
+@cached_report('project-status-list', fiscal_year_param=None)
 def get_project_status_list(request):
     paginator = ProjectStatusPagination()
     user = request.user  # MODIFIED: Get user
-    today = timezone.now().date()
 
-    fiscal_year = FiscalYear.objects.filter(
-        start_date__lte=today,
-        end_date__gte=today,
-        is_active=True
-    ).first()
+    fiscal_year = active_fiscal_year(request)
 
     if not fiscal_year:
         return Response({"detail": "No active fiscal year found."}, status=404)
@@ -660,16 +573,17 @@ def get_project_status_list(request):
         else:
             allocations_qs = BudgetAllocation.objects.none()
 
-    project_data = []
+    # Spent is computed in the database so the paginator can slice the queryset
+    allocations_qs = annotate_allocation_spent(allocations_qs).order_by(
+        'department', 'account', 'id')
 
-    # MODIFIED: Use the filtered queryset
-    for alloc in allocations_qs:
-        expenses = Expense.objects.filter(
-            budget_allocation=alloc,
-            status='APPROVED'
-        )
+    # Apply pagination
+    page = paginator.paginate_queryset(allocations_qs, request)
+
+    project_data = []
 
-        spent = expenses.aggregate(total=Sum('amount'))['total'] or 0
+    for alloc in page:
+        spent = alloc.spent
         budget = alloc.amount
         remaining = budget - spent
         progress = (spent / budget * 100) if budget > 0 else 0
@@ -684,11 +598,8 @@ def get_project_status_list(request):
             "progress": round(progress, 2)
         })
 
-    # Apply pagination
-    page = paginator.paginate_queryset(project_data, request)
-
     # Serialize the paginated results
-    serializer = ProjectStatusSerializer(page, many=True)
+    serializer = ProjectStatusSerializer(project_data, many=True)
 
     # Return the paginated response
     return paginator.get_paginated_response(serializer.data)
@@ -711,17 +622,14 @@ def get_project_status_list(request):
 )
 @api_view(['GET'])
 @permission_classes([IsBMSUser])
+@cached_report('department-budget-status', fiscal_year_param=None)
 def get_department_budget_status(request):
     user = request.user
     user_roles = getattr(user, 'roles', {})
     bms_role = user_roles.get('bms')
     today = timezone.now().date()
 
-    fiscal_year = FiscalYear.objects.filter(
-        start_date__lte=today,
-        end_date__gte=today,
-        is_active=True
-    ).first()
+    fiscal_year = active_fiscal_year(request)
 
     if not fiscal_year:
         return Response({"detail": "No active fiscal year found."}, status=404)
@@ -754,27 +662,29 @@ def get_department_budget_status(request):
         else:
             departments_qs = Department.objects.none()
 
+    departments = list(departments_qs.only('id', 'name'))
+
+    # Budget and period spend for every department in two grouped queries
+    rollup = department_budget_rollup(
+        fiscal_year,
+        department_ids=[dept.id for dept in departments],
+        start_date=start_date_filter,
+        end_date=end_date_filter
+    )
+
     result = []
 
-    for dept in departments_qs:
-        allocations = BudgetAllocation.objects.filter(
-            is_active=True,
-            fiscal_year=fiscal_year,
-            department=dept 
-        )
+    for dept in departments:
+        totals = rollup[dept.id]
 
         # 1. Total Yearly Budget for Dept
-        yearly_budget = allocations.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
+        yearly_budget = totals['budget']
+
         # 2. Scaled Budget for Period
         period_budget = yearly_budget / divisor
 
         # 3. Spent in Period
-        period_spent = Expense.objects.filter(
-            status='APPROVED',
-            budget_allocation__in=allocations,
-            date__range=[start_date_filter, end_date_filter]
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        period_spent = totals['spent']
 
         percent_used = Decimal('0.0')
         if period_budget > 0:
@@ -811,20 +721,19 @@ class TopCategoryBudgetAllocationView(APIView):
         responses={200: CategoryAllocationSerializer(many=True)},
         tags=["Dashboard"]
     )
+    @method_decorator(cached_report('top-category-allocations', fiscal_year_param=None))
     def get(self, request):
         limit = int(request.query_params.get('limit', 3))
 
-        today = timezone.now().date()
-        active_fiscal_year = FiscalYear.objects.filter(
-            start_date__lte=today, end_date__gte=today, is_active=True).first()
+        fiscal_year = active_fiscal_year(request)
 
-        if not active_fiscal_year:
+        if not fiscal_year:
             return Response({"detail": "No active fiscal year for filtering top categories."}, status=status.HTTP_404_NOT_FOUND)
 
         category_allocations = ExpenseCategory.objects.annotate(
             total_allocated=Coalesce(
                 Sum('budget_allocations__amount', filter=Q(budget_allocations__is_active=True,
-                    budget_allocations__fiscal_year=active_fiscal_year)),  # Added fiscal year filter
+                    budget_allocations__fiscal_year=fiscal_year)),  # Added fiscal year filter
                 Decimal('0'), output_field=DecimalField()
             )
         ).filter(total_allocated__gt=0).order_by('-total_allocated')[:limit]
@@ -857,6 +766,7 @@ class TopCategoryBudgetAllocationView(APIView):
 )
 @api_view(['GET'])
 @permission_classes([IsBMSUser])  # Use specific BMS permission
+@cached_report('overall-monthly-budget-actual')
 def overall_monthly_budget_actual(request):
     fiscal_year_id = request.query_params.get('fiscal_year_id')
     user = request.user
@@ -867,9 +777,7 @@ def overall_monthly_budget_actual(request):
         except FiscalYear.DoesNotExist:
             return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
     else:
-        today = timezone.now().date()
-        fiscal_year = FiscalYear.objects.filter(
-            start_date__lte=today, end_date__gte=today, is_active=True).first()
+        fiscal_year = active_fiscal_year(request)
         if not fiscal_year:
             return Response({"detail": "No active fiscal year found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -900,25 +808,11 @@ def overall_monthly_budget_actual(request):
         total=Coalesce(Sum('amount'), Decimal('0')))['total']
     # --- MODIFICATION END ---
 
-    # Simple even distribution of budget across 12 months for the chart
-    monthly_budget = total_budget / 12
-
-    monthly_data = []
-    for month_num in range(1, 13):
-        # --- MODIFICATION START ---
-        # Filtered expense query base
-        actual_expenses = expense_query_base.filter(
-            date__year=fiscal_year.start_date.year,
-            date__month=month_num
-        ).aggregate(total=Coalesce(Sum('amount'), Decimal('0')))['total']
-        # --- MODIFICATION END ---
-
-        monthly_data.append({
-            'month': month_num,
-            'month_name': calendar.month_name[month_num],
-            'budget': monthly_budget,
-            'actual': actual_expenses
-        })
+    # Even distribution of budget across the fiscal year's months for the chart.
+    # The months follow the fiscal year, so a Jul-Jun year spans two calendar years.
+    monthly_data = monthly_budget_vs_actual(
+        expense_query_base, fiscal_year.start_date, fiscal_year.end_date, total_budget
+    )
 
     serializer = MonthlyBudgetActualSerializer(monthly_data, many=True)
     return Response(serializer.data)
@@ -948,6 +842,7 @@ def overall_monthly_budget_actual(request):
 )
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_report('category-budget-status')
 def get_category_budget_status(request):
     fiscal_year_id = request.query_params.get('fiscal_year_id')
 
@@ -957,29 +852,19 @@ def get_category_budget_status(request):
         except FiscalYear.DoesNotExist:
             return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
     else:
-        today = timezone.now().date()
-        fiscal_year = FiscalYear.objects.filter(
-            start_date__lte=today, end_date__gte=today, is_active=True).first()
+        fiscal_year = active_fiscal_year(request)
         if not fiscal_year:
             return Response({"detail": "No active fiscal year found."}, status=status.HTTP_404_NOT_FOUND)
 
-    categories = ExpenseCategory.objects.filter(is_active=True)
+    # Budget per category from the snapshot, spent per expense category from the expenses
+    rollup = category_budget_rollup(fiscal_year)
+
+    categories = ExpenseCategory.objects.filter(is_active=True, id__in=list(rollup))
     result = []
 
     for cat in categories:
-        # Get total budget allocated to this category for the fiscal year
-        budget = BudgetAllocation.objects.filter(
-            is_active=True,
-            fiscal_year=fiscal_year,
-            category=cat
-        ).aggregate(total=Coalesce(Sum('amount'), Decimal('0')))['total']
-
-        # Get total spent from this category for the fiscal year
-        spent = Expense.objects.filter(
-            status='APPROVED',
-            category=cat,
-            budget_allocation__fiscal_year=fiscal_year
-        ).aggregate(total=Coalesce(Sum('amount'), Decimal('0')))['total']
+        budget = rollup[cat.id]['budget']
+        spent = rollup[cat.id]['spent']
 
         # Only include categories that have a budget
         if budget > 0:
@@ -1057,7 +942,7 @@ Added Robustness: The function now includes checks to handle cases where there i
 )
 @api_view(['GET'])
 @permission_classes([IsBMSUser])  # Use specific BMS permission
-@cache_page(60 * 5)  # (cache for 300 seconds = 5 minutes)
+@cached_report('budget-forecast')
 def get_budget_forecast(request):
     """
     Retrieves a pre-calculated forecast from the database.
@@ -1081,16 +966,13 @@ def get_budget_forecast(request):
     user = request.user
 
     # Determine the fiscal year (either by ID or by finding the active one)
-    today = timezone.now().date()
     if fiscal_year_id:
         try:
             fiscal_year = FiscalYear.objects.get(id=fiscal_year_id)
         except FiscalYear.DoesNotExist:
             return Response({"error": "Fiscal year not found"}, status=status.HTTP_404_NOT_FOUND)
     else:
-        fiscal_year = FiscalYear.objects.filter(
-            start_date__lte=today, end_date__gte=today, is_active=True
-        ).first()
+        fiscal_year = active_fiscal_year(request)
         if not fiscal_year:
             return Response({"detail": "No active fiscal year found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -1,13 +1,16 @@
 from datetime import datetime, timedelta
-from decimal import Decimal
 from django.utils import timezone
 from rest_framework import generics, filters, viewsets
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample, OpenApiResponse
 from core.permissions import IsBMSFinanceHead, IsBMSUser, IsTrustedService
-from core.models import BudgetAllocation, Department, Expense, ExpenseCategory, FiscalYear
-from .serializers_expense import BudgetAllocationCreateSerializer, ExpenseCategoryDropdownSerializerV2, ExpenseCreateSerializer, ExpenseDetailForModalSerializer, ExpenseDetailSerializer, ExpenseHistorySerializer, ExpenseReviewSerializer, ExpenseTrackingSerializer, ExpenseTrackingSummarySerializer, ExpenseMessageSerializer
-from core.pagination import FiveResultsSetPagination, StandardResultsSetPagination
+from core.models import BudgetAllocation, Department, Expense, ExpenseCategory
+from .serializers_expense import BudgetAllocationCreateSerializer, ExpenseCategoryDropdownSerializerV2, ExpenseCreateSerializer, ExpenseDetailForModalSerializer, ExpenseDetailSerializer, ExpenseHistorySerializer, ExpenseReviewSerializer, ExpenseBulkReviewSerializer, ExpenseBulkReviewResponseSerializer, ExpenseTrackingSerializer, ExpenseTrackingSummarySerializer, ExpenseMessageSerializer
+from core.pagination import ExpensePagination, StandardResultsSetPagination
+from core.balances import available_amount, lock_allocation
+from core.expense_review import bulk_review_expenses, review_note
+from core.fiscal_years import active_fiscal_year
+from core.rollups import approved_expense_totals, budget_actual_totals
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework import generics, filters, viewsets, serializers
@@ -15,8 +18,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser,JSONParser
-from django.db.models import Sum, Q
-from django.db.models.functions import Coalesce
+from django.db.models import Q
 from core.service_authentication import APIKeyAuthentication
 from django.db import transaction 
 
@@ -38,7 +40,7 @@ def get_date_range_from_filter(filter_value):
 class ExpenseHistoryView(generics.ListAPIView):
     serializer_class = ExpenseTrackingSerializer
     permission_classes = [IsBMSUser]
-    pagination_class = FiveResultsSetPagination
+    pagination_class = ExpensePagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
 
     # MODIFICATION: Update search fields to match new serializer fields
@@ -191,7 +193,7 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     and marking expenses as accomplished.
     """
     permission_classes = [IsBMSUser]  # Allows Dept Heads to List/Create
-    pagination_class = FiveResultsSetPagination
+    pagination_class = ExpensePagination
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = [
         'description', 'vendor', 'transaction_id',
@@ -204,7 +206,8 @@ class ExpenseViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        base_queryset = Expense.objects.all()
+        base_queryset = Expense.objects.select_related(
+            'department', 'category__parent_category')
         user_roles = getattr(user, 'roles', {})
         bms_role = user_roles.get('bms')
 
@@ -284,9 +287,18 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         reviewer = request.user
 
         with transaction.atomic():
+            if new_status == 'APPROVED':
+                # The locked running balance serializes concurrent approvals
+                remaining = available_amount(lock_allocation(expense.budget_allocation_id))
+                if expense.amount > remaining:
+                    return Response(
+                        {"error": f"This expense of {expense.amount} would exceed the remaining budget of {remaining}."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
             expense.status = new_status
             if notes:
-                expense.notes = f"Review Note ({reviewer.username} on {timezone.now().strftime('%Y-%m-%d')}): {notes}\n---\n{expense.notes or ''}"
+                expense.notes = review_note(reviewer, notes, expense.notes)
 
             if new_status == 'APPROVED':
                 expense.approved_by_user_id = reviewer.id
@@ -299,6 +311,36 @@ class ExpenseViewSet(viewsets.ModelViewSet):
             expense, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_200_OK)
 
+    # --- ACTION: BULK REVIEW (Finance Head Only) ---
+    @extend_schema(
+        tags=['Expense Tracking Page Actions'],
+        summary="Review several expenses at once (Finance Manager)",
+        description=(
+            "Approves or rejects up to 500 submitted expenses in one request. Each ID gets its own "
+            "result; approvals that would exceed the remaining budget of their allocation are refused "
+            "individually while the rest go through."),
+        request=ExpenseBulkReviewSerializer,
+        responses={200: ExpenseBulkReviewResponseSerializer}
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-review', permission_classes=[IsBMSFinanceHead])
+    def bulk_review(self, request):
+        serializer = ExpenseBulkReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = bulk_review_expenses(
+            self.get_queryset(),
+            serializer.validated_data['ids'],
+            serializer.validated_data['status'],
+            request.user,
+            notes=serializer.validated_data.get('notes')
+        )
+        response_serializer = ExpenseBulkReviewResponseSerializer({
+            'reviewed': sum(1 for result in results if 'status' in result),
+            'failed': sum(1 for result in results if 'error' in result),
+            'results': results,
+        })
+        return Response(response_serializer.data, status=status.HTTP_200_OK)
+
     # --- ACTION: MARK ACCOMPLISHED (Finance Head Only) ---
     @extend_schema(
         tags=['Expense Tracking Page Actions'],
@@ -344,28 +386,15 @@ class ExpenseTrackingSummaryView(APIView):
         bms_role = user_roles.get('bms')
 
         today = timezone.now().date()
-        active_fiscal_year = FiscalYear.objects.filter(
-            start_date__lte=today, end_date__gte=today, is_active=True).first()
+        fiscal_year = active_fiscal_year(request)
 
-        if not active_fiscal_year:
+        if not fiscal_year:
             return Response({"error": "No active fiscal year found."}, status=status.HTTP_404_NOT_FOUND)
 
         # MODIFICATION: Global vs Department Summary
         if bms_role in ['ADMIN', 'FINANCE_HEAD']:
             # Global Summary
-            total_budget = BudgetAllocation.objects.filter(
-                fiscal_year=active_fiscal_year, is_active=True
-            ).aggregate(total=Coalesce(Sum('amount'), Decimal('0.0')))['total']
-
-            total_spent = Expense.objects.filter(
-                budget_allocation__fiscal_year=active_fiscal_year, status='APPROVED'
-            ).aggregate(total=Coalesce(Sum('amount'), Decimal('0.0')))['total']
-
-            total_expenses_this_month = Expense.objects.filter(
-                status='APPROVED',
-                date__year=today.year,
-                date__month=today.month
-            ).aggregate(total=Coalesce(Sum('amount'), Decimal('0.0')))['total']
+            department_id = None
         else:
             # Department Summary (Existing Logic)
             if not hasattr(user, 'department_id'):
@@ -373,20 +402,15 @@ class ExpenseTrackingSummaryView(APIView):
 
             department_id = user.department_id
 
-            total_budget = BudgetAllocation.objects.filter(
-                department_id=department_id, fiscal_year=active_fiscal_year, is_active=True
-            ).aggregate(total=Coalesce(Sum('amount'), Decimal('0.0')))['total']
-
-            total_spent = Expense.objects.filter(
-                department_id=department_id, budget_allocation__fiscal_year=active_fiscal_year, status='APPROVED'
-            ).aggregate(total=Coalesce(Sum('amount'), Decimal('0.0')))['total']
-
-            total_expenses_this_month = Expense.objects.filter(
-                department_id=department_id,
-                status='APPROVED',
-                date__year=today.year,
-                date__month=today.month
-            ).aggregate(total=Coalesce(Sum('amount'), Decimal('0.0')))['total']
+        # The budget comes from the snapshot cells (active allocations only). Spend is
+        # read from the expenses, so it still counts spend on deactivated allocations.
+        total_budget = budget_actual_totals(
+            fiscal_year,
+            department_ids=None if department_id is None else [department_id]
+        )['budget']
+        spend = approved_expense_totals(fiscal_year, today, department_id=department_id)
+        total_spent = spend['spent']
+        total_expenses_this_month = spend['this_month']
 
         budget_remaining = total_budget - total_spent
 
@@ -0,0 +1,94 @@
+from django.http import FileResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiResponse, extend_schema
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from .export_jobs import ExportParameterError, enqueue_export
+from .models import ExportJob, UserActivityLog
+from .permissions import IsBMSUser
+from .serializers_exports import ExportJobRequestSerializer, ExportJobSerializer
+
+
+def _user_jobs(user):
+    # Jobs are private to the user who requested them
+    return ExportJob.objects.filter(requested_by_user_id=user.id)
+
+
+@extend_schema(
+    tags=['Exports'],
+    summary="Queue a background export or list your recent exports",
+    description=(
+        "POST queues a LEDGER_CSV (ledger filters as parameters) or BUDGET_VARIANCE_XLSX "
+        "(fiscal_year_id, month) export and returns 202 with the job. Poll the job until it "
+        "is COMPLETED, then fetch download_url."),
+    request=ExportJobRequestSerializer,
+    responses={200: ExportJobSerializer(many=True), 202: ExportJobSerializer}
+)
+@api_view(['GET', 'POST'])
+@permission_classes([IsBMSUser])
+def export_jobs(request):
+    if request.method == 'GET':
+        jobs = _user_jobs(request.user)[:20]
+        return Response(ExportJobSerializer(jobs, many=True).data)
+
+    serializer = ExportJobRequestSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+        job = enqueue_export(
+            request.user,
+            serializer.validated_data['export_type'],
+            serializer.validated_data['parameters'])
+    except ExportParameterError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        UserActivityLog.objects.create(
+            user_id=request.user.id,  # From JWT
+            user_username=getattr(request.user, 'username', 'N/A'),  # From JWT
+            log_type='EXPORT',
+            action=f'Queued {job.get_export_type_display()} export',
+            status='IN_PROGRESS',
+            details={'export_job_id': job.id, 'parameters': job.parameters}
+        )
+    except Exception as e:
+        print(f"Error logging export activity: {e}")
+
+    return Response(ExportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@extend_schema(
+    tags=['Exports'],
+    summary="Poll a background export",
+    responses={200: ExportJobSerializer, 404: OpenApiResponse(description="Export not found")}
+)
+@api_view(['GET'])
+@permission_classes([IsBMSUser])
+def export_job_detail(request, job_id):
+    job = _user_jobs(request.user).filter(id=job_id).first()
+    if job is None:
+        return Response({"error": "Export not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(ExportJobSerializer(job).data)
+
+
+@extend_schema(
+    tags=['Exports'],
+    summary="Download a finished background export",
+    responses={
+        200: OpenApiResponse(description='Export file attachment', response=OpenApiTypes.BINARY),
+        404: OpenApiResponse(description="Export not found"),
+        409: OpenApiResponse(description="Export is not finished"),
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsBMSUser])
+def export_job_download(request, job_id):
+    job = _user_jobs(request.user).filter(id=job_id).first()
+    if job is None:
+        return Response({"error": "Export not found"}, status=status.HTTP_404_NOT_FOUND)
+    if job.status != 'COMPLETED' or not job.file:
+        return Response(
+            {"error": f"Export is not ready (status: {job.status})."},
+            status=status.HTTP_409_CONFLICT)
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename)
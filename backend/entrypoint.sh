@@ -17,6 +17,10 @@ echo "Generating budget_service forecast data..."
 python manage.py generate_forecasts
 # --- MODIFICATION END ---
 
+# Rebuild the dashboard budget vs actual snapshot table
+echo "Rebuilding budget_service dashboard snapshots..."
+python manage.py rebuild_budget_snapshots
+
 # Collect static files
 echo "Collecting static files for budget_service..."
 python manage.py collectstatic --no-input --clear